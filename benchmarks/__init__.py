@@ -0,0 +1,7 @@
+"""Benchmarks for toml-sort.
+
+Run them with ``python -m benchmarks run`` (or ``nox -s benchmark``),
+and compare two result files with ``python -m benchmarks compare``.
+``python -m benchmarks scaling`` fits how the cost of each entry point
+grows with the size of its input.
+"""
@@ -0,0 +1,124 @@
+"""Command line of the benchmarks."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from . import scaling, startup
+from .compare import DEFAULT_THRESHOLD, compare
+from .suite import CASES, metadata_of, run
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    line = f"{result['name']:<28} {result['time']['min'] * 1000:>8.1f}ms"
+    if result["peak_memory"] is not None:
+        line += f" {result['peak_memory'] / 1024:>8.0f}kB"
+    if "phases" in result:
+        line += "  " + ", ".join(
+            f"{name} {seconds * 1000:.1f}ms"
+            for name, seconds in result["phases"].items()
+        )
+    print(line, file=sys.stderr)
+
+
+def _write(results: Dict[str, Any], output: Optional[str]) -> None:
+    text = json.dumps(results, indent=2) + "\n"
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Run the benchmarks, or compare the results of two runs."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "-o", "--output", help="write the results to this JSON file"
+    )
+    run_parser.add_argument(
+        "-k",
+        "--filter",
+        help="only run cases whose name contains this",
+        default="",
+    )
+    run_parser.add_argument("--repeat", help="timed runs per case", type=int, default=5)
+    startup_parser = commands.add_parser(
+        "startup", help="time short command line runs in fresh interpreters"
+    )
+    startup_parser.add_argument(
+        "-o", "--output", help="write the results to this JSON file"
+    )
+    startup_parser.add_argument(
+        "-k",
+        "--filter",
+        help="only run cases whose name contains this",
+        default="",
+    )
+    startup_parser.add_argument(
+        "--repeat", help="timed runs per case", type=int, default=20
+    )
+    scaling_parser = commands.add_parser(
+        "scaling", help="fit how the cost of each entry point grows with its input"
+    )
+    scaling_parser.add_argument(
+        "-k",
+        "--filter",
+        help="only run cases whose name contains this",
+        default="",
+    )
+    compare_parser = commands.add_parser(
+        "compare", help="compare two result files, failing on regressions"
+    )
+    compare_parser.add_argument("base", help="results of the baseline")
+    compare_parser.add_argument("new", help="results to compare with it")
+    compare_parser.add_argument(
+        "--threshold",
+        help=f"slowdown factor counted as a regression (default: {DEFAULT_THRESHOLD})",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+    )
+    args = parser.parse_args(arguments)
+
+    if args.command == "run":
+        cases = [case for case in CASES if args.filter in case.name]
+        _write(run(cases, args.repeat, progress=_print_result), args.output)
+        return
+    if args.command == "startup":
+        startup_results = startup.run(args.repeat, args.filter)
+        for result in startup_results:
+            _print_result(result)
+        _write(metadata_of(startup_results, args.repeat), args.output)
+        return
+    if args.command == "scaling":
+        superlinear = []
+        for case in scaling.SCALING_CASES:
+            if args.filter not in case.name:
+                continue
+            growth = scaling.growth(case)
+            print(f"{case.name:<32} {growth:>6.2f} ({case.cost}, bound {case.bound})")
+            if growth > case.bound:
+                superlinear.append(case.name)
+        if superlinear:
+            print("\nSuperlinear:\n" + "\n".join(superlinear))
+            sys.exit(1)
+        return
+
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)
+    lines, regressions = compare(base, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compare two benchmark result files."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+# Results that got slower or bigger by more than this factor are regressions
+DEFAULT_THRESHOLD = 1.10
+
+
+def compare(
+    base: Dict[str, Any], new: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> Tuple[List[str], List[str]]:
+    """Report lines for the cases in both results, and the regressions.
+
+    Times are compared by their minimum, which is the least noisy
+    estimate of how long a case takes.
+    """
+    base_results = {result["name"]: result for result in base["results"]}
+    lines = [f"{'case':<28} {'time':>10} {'ratio':>7} {'memory':>10} {'ratio':>7}"]
+    regressions = []
+    for result in new["results"]:
+        old = base_results.get(result["name"])
+        if old is None:
+            continue
+        time_ratio = result["time"]["min"] / old["time"]["min"]
+        line = (
+            f"{result['name']:<28} {result['time']['min'] * 1000:>8.1f}ms"
+            f" {time_ratio:>6.2f}x"
+        )
+        if time_ratio > threshold:
+            regressions.append(f"{result['name']}: {time_ratio:.2f}x slower")
+        # Startup results have no memory measurement
+        if result["peak_memory"] is not None and old["peak_memory"] is not None:
+            memory_ratio = result["peak_memory"] / max(old["peak_memory"], 1)
+            line += f" {result['peak_memory'] / 1024:>8.0f}kB {memory_ratio:>6.2f}x"
+            if memory_ratio > threshold:
+                regressions.append(f"{result['name']}: {memory_ratio:.2f}x more memory")
+        lines.append(line)
+    return lines, regressions
@@ -0,0 +1,256 @@
+"""Fit how the cost of each entry point grows with the size of its input.
+
+Quadratic behavior hides in small inputs, so instead of timing one
+size, a scaling case runs an entry point at growing sizes and fits the
+exponent k of cost ~ size ** k by least squares on a log-log scale. A
+linear entry point has an exponent close to 1, and one that goes
+quadratic close to 2, whatever the speed of the machine.
+
+Two costs can be measured:
+
+- calls: Python and builtin function calls, counted with sys.setprofile.
+  The count is the same on every machine and under any load, which
+  allows a tight bound, but it misses work done inside one builtin
+  call, such as list.pop(0) moving the rest of a list.
+- seconds: the fastest of a few runs, in process time, with the garbage
+  collector off as in timeit. Noisier, so its bound is looser.
+
+The exponent is fitted against the size of the input, which is the size
+a case is run at unless the case measures it: the headers of nested
+tables name every table above them, so their text grows with the
+square of the depth.
+"""
+
+from __future__ import annotations
+
+import gc
+import math
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import tomlkit
+from tomlkit.items import Comment, Key, SingleKey, Trivia
+from tomlkit.toml_document import TOMLDocument
+
+from toml_sort import cli
+from toml_sort.tomlsort import SortConfiguration, TomlSort, TomlSorter, TomlSortKeys
+
+from .shapes import Shape, generate
+
+# Bounds on the fitted exponent, above any n log n term at these sizes
+CALLS_BOUND = 1.25
+SECONDS_BOUND = 1.3
+
+
+@dataclass(frozen=True)
+class Scaling:
+    """An entry point run on inputs of growing size."""
+
+    name: str
+    # Builds the input of a size, which run may consume
+    make: Callable[[int], Any]
+    run: Callable[[Any], object]
+    sizes: Tuple[int, ...]
+    cost: str = "calls"
+    # The size of an input, if not the size it was made at
+    size_of: Optional[Callable[[Any], int]] = None
+
+    @property
+    def bound(self) -> float:
+        """The largest exponent that does not count as superlinear."""
+        return CALLS_BOUND if self.cost == "calls" else SECONDS_BOUND
+
+
+def count_calls(function: Callable[[], object]) -> int:
+    """The number of function calls made by function()."""
+    calls = 0
+
+    def profile(_frame: Any, event: str, _arg: Any) -> None:
+        nonlocal calls
+        if event in ("call", "c_call"):
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        function()
+    finally:
+        sys.setprofile(None)
+    return calls
+
+
+def exponent(sizes: Sequence[int], costs: Sequence[float]) -> float:
+    """Least squares slope of log(cost) against log(size)."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(cost) for cost in costs]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def process_seconds(function: Callable[[], object]) -> float:
+    """The process time taken by function(), without garbage collection."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.process_time()
+        function()
+        return time.process_time() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def costs(case: Scaling, repeat: int = 3) -> List[Tuple[int, float]]:
+    """The input size and cost of case at each of its sizes."""
+    result: List[Tuple[int, float]] = []
+    for size in case.sizes:
+        value = case.make(size)
+        input_size = size if case.size_of is None else case.size_of(value)
+        if case.cost == "calls":
+            result.append((input_size, count_calls(lambda: case.run(value))))
+            continue
+        times = [process_seconds(lambda: case.run(value))]
+        for _ in range(repeat - 1):
+            value = case.make(size)
+            times.append(process_seconds(lambda: case.run(value)))
+        result.append((input_size, max(min(times), 1e-6)))
+    return result
+
+
+def growth(case: Scaling, repeat: int = 3) -> float:
+    """The fitted exponent of the cost of case."""
+    sizes, measured = zip(*costs(case, repeat))
+    return exponent(sizes, measured)
+
+
+def _key(name: str = "key") -> TomlSortKeys:
+    return TomlSortKeys(SingleKey(name))
+
+
+def _value(text: str) -> Any:
+    return tomlkit.parse(f"key = {text}\n")["key"]
+
+
+def _nested(size: int, opening: str, closing: str) -> str:
+    return opening * size + "1" + closing * size
+
+
+def _nested_pairs(size: int) -> str:
+    """Arrays nested size deep, with a second item at each level to sort."""
+    return "[" * size + "1" + "".join(f", {level}]" for level in range(size))
+
+
+def _sorted(text: str, **kwargs: Any) -> str:
+    return TomlSort(text, **kwargs).sorted()
+
+
+def _tables_only(text: str) -> str:
+    return _sorted(text, sort_config=SortConfiguration(table_keys=False))
+
+
+def _body(text: str) -> List[Tuple[Key, Any]]:
+    return tomlkit.parse(text).body
+
+
+def _header(size: int) -> List[Tuple[None, Comment]]:
+    return [(None, Comment(Trivia(comment=f"# line {i}"))) for i in range(size)]
+
+
+def _cli(text: str) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "input.toml")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        cli.cli(["--output", os.path.join(directory, "output.toml"), path])
+
+
+_SORTER = TomlSorter(
+    sort_config=SortConfiguration(inline_tables=True, inline_arrays=True)
+)
+
+SCALING_CASES = [
+    Scaling(
+        "sorted-tables",
+        lambda size: generate(Shape(tables=size, keys=2)),
+        _sorted,
+        (20, 40, 80, 160),
+    ),
+    Scaling(
+        "sorted-depth",
+        lambda size: generate(Shape(tables=2, keys=1, depth=size)),
+        _sorted,
+        (10, 20, 40, 80),
+        size_of=len,
+    ),
+    Scaling(
+        "sorted-tables-only",
+        lambda size: generate(Shape(tables=size, keys=2)),
+        _tables_only,
+        (100, 200, 400, 800),
+    ),
+    Scaling(
+        "sorted-aot-keys",
+        lambda size: generate(Shape(tables=1, keys=2, aot_size=size)),
+        lambda text: _sorted(
+            text, sort_config=SortConfiguration(table_keys=False, aot_sort_keys=["id"])
+        ),
+        (100, 200, 400, 800),
+    ),
+    Scaling(
+        "sort_array-wide",
+        lambda size: _value(str(list(range(size, 0, -1)))),
+        lambda array: _SORTER.sort_array(_key(), array),
+        (100, 200, 400, 800),
+    ),
+    Scaling(
+        "sort_array-nested",
+        lambda size: _value(_nested_pairs(size)),
+        lambda array: _SORTER.sort_array(_key(), array),
+        (10, 20, 40, 80),
+    ),
+    Scaling(
+        "sort_inline_table-wide",
+        lambda size: _value(
+            "{" + ", ".join(f"k{i} = {i}" for i in range(size, 0, -1)) + "}"
+        ),
+        lambda table: _SORTER.sort_inline_table(_key(), table),
+        (100, 200, 400, 800),
+    ),
+    Scaling(
+        "sort_inline_table-nested",
+        lambda size: _value(_nested(size, "{a = ", "}")),
+        lambda table: _SORTER.sort_inline_table(_key(), table),
+        (10, 20, 40, 80),
+    ),
+    Scaling(
+        "body_to_tomlsortitems-tables",
+        lambda size: _body(generate(Shape(tables=size, keys=2))),
+        _SORTER.body_to_tomlsortitems,
+        (20, 40, 80, 160),
+    ),
+    Scaling(
+        "body_to_tomlsortitems-depth",
+        lambda size: _body(generate(Shape(tables=2, keys=1, depth=size))),
+        _SORTER.body_to_tomlsortitems,
+        (10, 20, 40, 80),
+    ),
+    Scaling(
+        "cli",
+        lambda size: generate(Shape(tables=size, keys=2)),
+        _cli,
+        (200, 400, 800, 1600),
+    ),
+    Scaling(
+        "write_header_comment",
+        _header,
+        lambda body: _SORTER.write_header_comment(body, TOMLDocument()),
+        (5000, 10000, 20000, 40000),
+        cost="seconds",
+    ),
+]
@@ -0,0 +1,99 @@
+"""Synthetic TOML documents of a given shape.
+
+Each Shape field is a separate axis, so that a benchmark can grow one
+dimension of a document while keeping the others fixed. Documents are
+generated deterministically from a seed, with keys and tables in
+shuffled order so that sorting has work to do.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Dict, List
+
+from toml_sort.tomlsort import SortOverrideConfiguration
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Dimensions of a synthetic TOML document."""
+
+    # Top-level tables
+    tables: int = 50
+    # Key/value pairs in each table
+    keys: int = 10
+    # Levels of sub tables below each top-level table
+    depth: int = 0
+    # Length of an inline array in each table, 0 for none
+    array_length: int = 0
+    # Elements of an array of tables, 0 for none
+    aot_size: int = 0
+    # Fraction of keys and tables with a comment attached to them
+    comment_density: float = 0.0
+    # Sort configuration override patterns
+    overrides: int = 0
+    seed: int = 0
+
+
+def _key(index: int) -> str:
+    return f"key_{index:04d}"
+
+
+def _table_lines(
+    shape: Shape, header: str, rng: random.Random, array_offset: int
+) -> List[str]:
+    """The lines of one table: its header, keys and inline array."""
+    lines: List[str] = []
+    if rng.random() < shape.comment_density:
+        lines.append(f"# About {header}")
+    lines.append(header)
+    indexes = list(range(shape.keys))
+    rng.shuffle(indexes)
+    for index in indexes:
+        if rng.random() < shape.comment_density:
+            lines.append(f"# About {_key(index)}")
+        lines.append(f'{_key(index)} = "value {index}"')
+    if shape.array_length:
+        values = [
+            str(array_offset + value)
+            for value in rng.sample(range(shape.array_length * 2), shape.array_length)
+        ]
+        lines.append(f"array = [{', '.join(values)}]")
+    return lines
+
+
+def generate(shape: Shape) -> str:
+    """A TOML document of the given shape."""
+    rng = random.Random(shape.seed)
+    blocks: List[List[str]] = []
+    for table in range(shape.tables):
+        path = f"table_{table:04d}"
+        chain = [_table_lines(shape, f"[{path}]", rng, table)]
+        for level in range(1, shape.depth + 1):
+            path = f"{path}.level_{level}"
+            chain.append(_table_lines(shape, f"[{path}]", rng, table))
+        blocks.append([line for lines in chain for line in lines + [""]])
+    if shape.aot_size:
+        aot: List[str] = []
+        for element in range(shape.aot_size):
+            aot.extend(
+                _table_lines(shape, "[[elements]]", rng, element)
+                + [f"id = {element}", ""]
+            )
+        blocks.append(aot)
+    rng.shuffle(blocks)
+    root = [f'{_key(index)} = "root {index}"' for index in range(shape.keys)]
+    rng.shuffle(root)
+    lines = ["# Generated document", ""] + root + [""]
+    for block in blocks:
+        lines.extend(block)
+    return "\n".join(lines).strip() + "\n"
+
+
+def overrides(shape: Shape) -> Dict[str, SortOverrideConfiguration]:
+    """Override patterns for a shape, matching some of its tables."""
+    return {
+        f"table_{index:04d}*": SortOverrideConfiguration(first=[_key(index)])
+        for index in range(shape.overrides)
+    }
@@ -0,0 +1,86 @@
+"""Time short toml-sort runs, where starting up is most of the work.
+
+Each case runs the command line in a fresh interpreter, the way
+pre-commit runs it, on a one-file project without a pyproject.toml.
+The "python" case is the interpreter starting up on its own, which is
+the floor for every other case, and "import" is the import time of
+toml_sort.cli as reported by python -X importtime.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SORTED = '[project]\nname = "example"\n\n[tool.other]\nkey = "value"\n'
+UNSORTED = '[tool.other]\nkey = "value"\n\n[project]\nname = "example"\n'
+
+_CLI = "from toml_sort.cli import cli; cli()"
+
+CASES: List[Tuple[str, List[str]]] = [
+    ("python", ["-c", "pass"]),
+    ("version", ["-c", _CLI, "--version"]),
+    ("check-sorted", ["-c", _CLI, "--check", "sorted.toml"]),
+    ("check-unsorted", ["-c", _CLI, "--check", "unsorted.toml"]),
+    ("sort", ["-c", _CLI, "unsorted.toml"]),
+]
+
+
+def _timed(arguments: List[str], cwd: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *arguments],
+        cwd=cwd,
+        capture_output=True,
+        check=False,
+    )
+    return time.perf_counter() - start
+
+
+def import_time(cwd: str) -> float:
+    """Seconds spent importing toml_sort.cli, by python -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import toml_sort.cli"],
+        cwd=cwd,
+        capture_output=True,
+        encoding="utf-8",
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if fields[-1].strip() == "toml_sort.cli":
+            return int(fields[1]) / 1_000_000
+    raise RuntimeError("toml_sort.cli was not imported")
+
+
+def _summary(name: str, times: List[float]) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "time": {"min": min(times), "median": statistics.median(times)},
+        "peak_memory": None,
+    }
+
+
+def run(repeat: int = 20, filter_: str = "") -> List[Dict[str, Any]]:
+    """Time each case repeat times, in a temporary project directory."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, text in (("sorted.toml", SORTED), ("unsorted.toml", UNSORTED)):
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as file:
+                file.write(text)
+        cases: List[Tuple[str, Optional[List[str]]]] = [*CASES, ("import", None)]
+        for name, arguments in cases:
+            if filter_ not in name:
+                continue
+            if arguments is None:
+                times = [import_time(directory) for _ in range(repeat)]
+            else:
+                times = [_timed(arguments, directory) for _ in range(repeat)]
+            results.append(_summary(f"startup:{name}", times))
+    return results
@@ -0,0 +1,179 @@
+"""Time TomlSort on synthetic documents, and its phases on each."""
+
+from __future__ import annotations
+
+import dataclasses
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from importlib import metadata
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from unittest import mock
+
+import tomlkit
+
+from toml_sort import TomlSort, linesort
+from toml_sort.tomlsort import SortConfiguration
+
+from .shapes import Shape, generate, overrides
+
+# Functions timed as phases of a sort, by the name they are reported as.
+# Phases nest: sorted_children_table is also counted in the
+# toml_elements_sorted calls it is made from.
+PHASES: Dict[str, Any] = {
+    "sort_tables": (linesort, "sort_tables_with"),
+    "parse": (tomlkit, "parse"),
+    "body_to_tomlsortitems": (TomlSort, "body_to_tomlsortitems"),
+    "sorted_children_table": (TomlSort, "sorted_children_table"),
+    "toml_elements_sorted": (TomlSort, "toml_elements_sorted"),
+    "dump": (tomlkit, "dumps"),
+}
+
+
+@dataclass(frozen=True)
+class Case:
+    """A document shape and the configuration it is sorted with."""
+
+    name: str
+    shape: Shape
+    # Only sort tables, the default of the command line
+    tables_only: bool = False
+
+    def sort(self, text: str) -> str:
+        """Sort text the way this case is configured to."""
+        return TomlSort(
+            text,
+            sort_config=SortConfiguration(table_keys=not self.tables_only),
+            sort_config_overrides=overrides(self.shape),
+        ).sorted()
+
+
+def _cases() -> List[Case]:
+    """One case per value of each axis, grown from a common base shape."""
+    base = Shape()
+    axes: Dict[str, List[Any]] = {
+        "tables": [10, 300],
+        "keys": [1, 100],
+        "depth": [2, 8],
+        "array_length": [10, 200],
+        "aot_size": [10, 200],
+        "comment_density": [0.5],
+        "overrides": [10, 100],
+    }
+    cases = [Case("base", base), Case("base-tables-only", base, tables_only=True)]
+    for axis, values in axes.items():
+        for value in values:
+            shape = dataclasses.replace(base, **{axis: value})
+            cases.append(Case(f"{axis}={value}", shape))
+    cases.append(Case("tables=1000-tables-only", Shape(tables=1000), tables_only=True))
+    return cases
+
+
+CASES = _cases()
+
+
+@contextmanager
+def phase_timer(totals: Dict[str, float]) -> Iterator[None]:
+    """Add the time spent in each of PHASES to totals while active.
+
+    Only the outermost call of a recursive function is timed.
+    """
+
+    def timed(name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        depth = 0
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            nonlocal depth
+            if depth:
+                return function(*args, **kwargs)
+            depth += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                totals[name] = totals.get(name, 0.0) + time.perf_counter() - start
+                depth -= 1
+
+        return wrapper
+
+    with ExitStack() as stack:
+        for name, (owner, attribute) in PHASES.items():
+            stack.enter_context(
+                mock.patch.object(
+                    owner, attribute, timed(name, getattr(owner, attribute))
+                )
+            )
+        yield
+
+
+def measure(case: Case, repeat: int = 5) -> Dict[str, Any]:
+    """Time a case, and measure its phases and peak memory."""
+    text = generate(case.shape)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.sort(text)
+        times.append(time.perf_counter() - start)
+    phases: Dict[str, float] = {}
+    with phase_timer(phases):
+        case.sort(text)
+    tracemalloc.start()
+    try:
+        case.sort(text)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "name": case.name,
+        "shape": dataclasses.asdict(case.shape),
+        "tables_only": case.tables_only,
+        "size": len(text),
+        "time": {"min": min(times), "median": statistics.median(times)},
+        "phases": phases,
+        "peak_memory": peak,
+    }
+
+
+def _commit() -> Optional[str]:
+    """The git commit of the working tree, if it is a git checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            encoding="utf-8",
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def metadata_of(results: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """Results with what they were measured on, to be saved as JSON."""
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "toml_sort": metadata.version("toml-sort"),
+        "tomlkit": metadata.version("tomlkit"),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def run(
+    cases: List[Case],
+    repeat: int = 5,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Measure cases, returning results that can be saved as JSON."""
+    results = []
+    for case in cases:
+        result = measure(case, repeat)
+        if progress is not None:
+            progress(result)
+        results.append(result)
+    return metadata_of(results, repeat)
@@ -39,3 +39,9 @@ def coverage(session: nox.Session):
         "term-missing",
         "tests",
     )
+
+
+@NOX_SESSION
+def benchmark(session: nox.Session):
+    """Run the benchmarks, e.g. nox -s benchmark -- run -o results.json."""
+    session.run("python", "-m", "benchmarks", *(session.posargs or ["run"]))
@@ -0,0 +1,140 @@
+"""Test the toml_sort.aio module."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+from unittest import mock
+
+import pytest
+
+from toml_sort import TomlSorter
+from toml_sort.aio import (
+    FileResult,
+    async_check_file,
+    async_check_paths,
+    async_sort_file,
+    async_sort_paths,
+)
+from toml_sort.verify import SortVerifier, Violation
+
+SORTED = "[a]\nx = 1\n\n[b]\ny = 2\n"
+UNSORTED = "[b]\ny = 2\n\n[a]\nx = 1\n"
+
+
+class SlowSorter(TomlSorter):
+    """Sorter that records how many checks run at the same time."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+
+    def check(self, input_toml: str) -> Optional[Violation]:
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return super().check(input_toml)
+
+
+def write_files(tmp_path: Path, count: int) -> List[str]:
+    """Alternately sorted and unsorted files."""
+    paths = []
+    for index in range(count):
+        path = tmp_path / f"{index}.toml"
+        path.write_text(UNSORTED if index % 2 else SORTED, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+async def collect(results: object) -> List[FileResult]:
+    """All results of an async iterator."""
+    return [result async for result in results]  # type: ignore[attr-defined]
+
+
+def test_check_file(tmp_path: Path) -> None:
+    """Files are checked without being changed."""
+    sorted_path, unsorted_path = write_files(tmp_path, 2)
+    assert asyncio.run(async_check_file(sorted_path)) == FileResult(sorted_path)
+    result = asyncio.run(async_check_file(unsorted_path))
+    assert result.violation is not None
+    assert result.violation.line == 4
+    assert Path(unsorted_path).read_text(encoding="utf-8") == UNSORTED
+
+
+def test_sort_file(tmp_path: Path) -> None:
+    """Sorted text is returned, or written back in place."""
+    _, unsorted_path = write_files(tmp_path, 2)
+    result = asyncio.run(async_sort_file(unsorted_path))
+    assert result.sorted_toml == SORTED
+    assert Path(unsorted_path).read_text(encoding="utf-8") == UNSORTED
+    result = asyncio.run(async_sort_file(unsorted_path, in_place=True))
+    assert result.violation is not None
+    assert result.sorted_toml is None
+    assert Path(unsorted_path).read_text(encoding="utf-8") == SORTED
+
+
+def test_sort_file_sorts_once(tmp_path: Path) -> None:
+    """Unsorted files are not parsed to confirm the violation before sorting."""
+    _, unsorted_path = write_files(tmp_path, 2)
+    with mock.patch.object(SortVerifier, "verify", side_effect=AssertionError):
+        result = asyncio.run(async_sort_file(unsorted_path, in_place=True))
+    assert result.violation is not None
+    assert Path(unsorted_path).read_text(encoding="utf-8") == SORTED
+
+
+def test_paths_concurrency(tmp_path: Path) -> None:
+    """No more files than the concurrency are processed at once."""
+    paths = write_files(tmp_path, 12)
+    sorter = SlowSorter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = asyncio.run(
+            collect(async_check_paths(paths, sorter, 3, executor=executor))
+        )
+    assert sorted(result.path for result in results) == sorted(paths)
+    assert 1 < sorter.most_running <= 3
+    for result in results:
+        assert (result.violation is None) == result.path.endswith(
+            ("0.toml", "2.toml", "4.toml", "6.toml", "8.toml")
+        )
+
+
+def test_paths_in_place(tmp_path: Path) -> None:
+    """Every file ends up sorted, and errors are reported per file."""
+    paths = write_files(tmp_path, 4)
+    missing = str(tmp_path / "missing.toml")
+    results = asyncio.run(collect(async_sort_paths([*paths, missing], in_place=True)))
+    errors = {result.path: result.error for result in results}
+    assert isinstance(errors.pop(missing), FileNotFoundError)
+    assert set(errors.values()) == {None}
+    for path in paths:
+        assert Path(path).read_text(encoding="utf-8") == SORTED
+
+
+def test_paths_cancel(tmp_path: Path) -> None:
+    """Leaving the iteration early stops the files still in progress."""
+    paths = write_files(tmp_path, 20)
+    sorter = SlowSorter()
+
+    async def first() -> FileResult:
+        results = async_check_paths(paths, sorter, 2)
+        result = await results.__anext__()
+        await results.aclose()  # type: ignore[attr-defined]
+        return result
+
+    assert asyncio.run(first()).path in paths
+    assert sorter.running == 0
+
+
+def test_paths_invalid_concurrency() -> None:
+    """Concurrency must allow at least one file."""
+    with pytest.raises(ValueError):
+        asyncio.run(collect(async_check_paths([], concurrency=0)))
@@ -0,0 +1,70 @@
+"""Test the benchmarks package."""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import Dict
+
+import pytest
+import tomlkit
+
+from benchmarks import startup
+from benchmarks.compare import compare
+from benchmarks.shapes import Shape, generate
+from benchmarks.suite import CASES, Case, measure, phase_timer
+from toml_sort import TomlSort
+from toml_sort.tomlsort import SortConfiguration
+
+
+@pytest.mark.parametrize(
+    "shape",
+    [
+        Shape(tables=3, keys=2),
+        Shape(tables=2, depth=3),
+        Shape(tables=2, array_length=5),
+        Shape(tables=2, aot_size=3),
+        Shape(tables=2, comment_density=1.0),
+    ],
+)
+def test_generate_valid(shape: Shape) -> None:
+    """Generated documents are valid and deterministic."""
+    text = generate(shape)
+    tomlkit.parse(text)
+    assert generate(shape) == text
+    assert generate(dataclasses.replace(shape, seed=1)) != text
+
+
+def test_case_names_unique() -> None:
+    """Cases are told apart by name when results are compared."""
+    assert len({case.name for case in CASES}) == len(CASES)
+
+
+def test_phase_timer() -> None:
+    """Phases are timed while active, and restored afterwards."""
+    sorted_children_table = TomlSort.sorted_children_table
+    totals: Dict[str, float] = {}
+    with phase_timer(totals):
+        # Sorting arrays keeps the line engine from sorting the tables
+        TomlSort(
+            generate(Shape(tables=2, depth=2)),
+            sort_config=SortConfiguration(inline_arrays=True),
+        ).sorted()
+    assert TomlSort.sorted_children_table is sorted_children_table
+    assert {"parse", "sorted_children_table", "dump"} <= set(totals)
+
+
+def test_compare() -> None:
+    """Results slower than the threshold are regressions."""
+    result = measure(Case("small", Shape(tables=2, keys=2)), repeat=1)
+    slower = dict(result, time={"min": result["time"]["min"] * 2})
+    _, regressions = compare({"results": [result]}, {"results": [result]})
+    assert not regressions
+    _, regressions = compare({"results": [result]}, {"results": [slower]})
+    assert regressions == ["small: 2.00x slower"]
+
+
+def test_startup() -> None:
+    """Startup cases run the command line in a fresh interpreter."""
+    results = startup.run(repeat=1, filter_="version")
+    assert [result["name"] for result in results] == ["startup:version"]
+    assert results[0]["time"]["min"] > 0
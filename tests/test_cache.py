@@ -0,0 +1,118 @@
+"""Test the on-disk result cache."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from pathlib import Path
+
+from toml_sort.cache import ResultCache, config_fingerprint, content_hash
+from toml_sort.tomlsort import SortConfiguration, SortOverrideConfiguration
+
+SORTED = "[a]\nx = 1\n\n[b]\ny = 2\n"
+
+
+def _age(path: Path) -> None:
+    """Move a file's mtime into the past, out of the racy window."""
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+
+def test_config_fingerprint() -> None:
+    """Fingerprints change with any part of the configuration."""
+    default = config_fingerprint(SortConfiguration())
+    assert default == config_fingerprint(SortConfiguration())
+    assert default != config_fingerprint(SortConfiguration(table_keys=False))
+    assert default != config_fingerprint(
+        SortConfiguration(),
+        overrides={"a": SortOverrideConfiguration(table_keys=False)},
+    )
+
+
+def test_content_entries(tmp_path: Path) -> None:
+    """Recorded content is sorted, other content and configs are not."""
+    target = tmp_path / "file.toml"
+    target.write_text(SORTED)
+    cache = ResultCache(str(tmp_path / "cache"), "fingerprint")
+    assert not cache.is_sorted_content(SORTED)
+    cache.record_sorted(str(target), SORTED)
+    assert cache.is_sorted_content(SORTED)
+    assert not cache.is_sorted_content(SORTED + "z = 3\n")
+    assert not ResultCache(cache.directory, "other").is_sorted_content(SORTED)
+
+
+def test_stat_entries(tmp_path: Path) -> None:
+    """The stat fast path only holds while the file is untouched."""
+    target = tmp_path / "file.toml"
+    target.write_text(SORTED)
+    cache = ResultCache(str(tmp_path / "cache"), "fingerprint")
+
+    # Recently modified files are not trusted
+    cache.record_sorted(str(target), SORTED)
+    assert not cache.is_sorted_path(str(target))
+
+    _age(target)
+    cache.record_sorted(str(target), SORTED, os.stat(target))
+    assert cache.is_sorted_path(str(target))
+
+    target.write_text(SORTED + "z = 3\n")
+    _age(target)
+    assert not cache.is_sorted_path(str(target))
+
+
+def test_stat_entry_skipped_on_concurrent_edit(tmp_path: Path) -> None:
+    """A file edited after it was read is not recorded."""
+    target = tmp_path / "file.toml"
+    target.write_text(SORTED)
+    _age(target)
+    stat = os.stat(target)
+    target.write_text(SORTED + "z = 3\n")
+    _age(target)
+    cache = ResultCache(str(tmp_path / "cache"), "fingerprint")
+    cache.record_sorted(str(target), SORTED, stat)
+    assert not cache.is_sorted_path(str(target))
+
+
+def test_prune(tmp_path: Path) -> None:
+    """Pruning keeps the most recently used entries."""
+    target = tmp_path / "file.toml"
+    target.write_text(SORTED)
+    cache = ResultCache(str(tmp_path / "cache"), "fingerprint", max_entries=3)
+    contents = [f"x = {index}\n" for index in range(5)]
+    for index, content in enumerate(contents):
+        cache.record_sorted(str(target), content)
+        entry = cache._entry_path("content", content_hash(content))
+        os.utime(entry, ns=(index, index))
+    cache.prune()
+    assert len(os.listdir(cache.directory)) == 3
+    assert not cache.is_sorted_content(contents[0])
+    assert cache.is_sorted_content(contents[-1])
+
+
+def test_cli_cache(tmp_path: Path) -> None:
+    """Cached results give the same answers as uncached runs."""
+    cache_dir = str(tmp_path / "cache")
+    sorted_file = tmp_path / "sorted.toml"
+    sorted_file.write_text(SORTED)
+    unsorted_file = tmp_path / "unsorted.toml"
+    unsorted_file.write_text("[b]\ny = 2\n\n[a]\nx = 1\n")
+    command = ["toml-sort", "--check", "--cache-dir", cache_dir]
+    for _ in range(2):
+        result = subprocess.run(
+            command + [str(sorted_file), str(unsorted_file)],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        assert result.returncode == 1
+        assert str(unsorted_file) in result.stderr
+        assert str(sorted_file) not in result.stderr
+
+    result = subprocess.run(
+        ["toml-sort", "--in-place", "--cache-dir", cache_dir, str(unsorted_file)],
+        check=True,
+    )
+    assert unsorted_file.read_text() == SORTED
+    result = subprocess.run(
+        command + [str(sorted_file), str(unsorted_file)], check=False
+    )
+    assert result.returncode == 0
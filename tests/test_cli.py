@@ -3,17 +3,26 @@
 from __future__ import annotations
 
 import os
+import pstats
 import shutil
 import subprocess
+import sys
 from pathlib import Path
-from typing import Callable, List, NamedTuple, Optional
+from typing import Callable, Iterator, List, NamedTuple, Optional
 from unittest import mock
 
 import pytest
 
 from toml_sort import cli
 from toml_sort.cli import parse_sort_first
-from toml_sort.tomlsort import SortOverrideConfiguration
+from toml_sort.tomlsort import (
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+    TomlSorter,
+)
+from toml_sort.verify import SortVerifier
 
 PATH_EXAMPLES = "tests/examples"
 
@@ -187,14 +196,168 @@ def test_cli_args(
         ),
     ),
 )
-def test_multiple_files_check(paths, expected_exit_code):
+@pytest.mark.parametrize("memory_budget", [[], ["--memory-budget", "1"]])
+def test_multiple_files_check(paths, expected_exit_code, memory_budget):
     """Unsorted files should be checked."""
     paths_unsorted = [os.path.join(PATH_EXAMPLES, path) for path in paths]
-    result = capture(["toml-sort", "--check"] + paths_unsorted)
+    result = capture(["toml-sort", "--check"] + memory_budget + paths_unsorted)
     assert result.returncode == expected_exit_code, result.stderr
 
 
-def test_multiple_files_in_place(tmpdir):
+def test_check_reports_location():
+    """Check failures point at the first line that is out of place."""
+    path = os.path.join(PATH_EXAMPLES, "from-toml-lang.toml")
+    result = capture(["toml-sort", "--check", path])
+    assert result.returncode == 1
+    assert (
+        f"  - {path}:11:1: table 'database' should come before 'owner'" in result.stderr
+    )
+
+
+def test_sort_aot_keys():
+    """--sort-aot-keys orders the tables of arrays of tables."""
+    text = "[[p]]\nname = 'b'\n\n[[p]]\nname = 'a'\nv = 2\n\n[[p]]\nname = 'a'\nv = 1\n"
+    result = capture(["toml-sort", "--sort-aot-keys", "name, v"], stdin=text)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == (
+        "[[p]]\nname = 'a'\nv = 1\n\n[[p]]\nname = 'a'\nv = 2\n\n[[p]]\nname = 'b'\n"
+    )
+    result = capture(["toml-sort", "--check", "--sort-aot-keys", "name", "-"], text)
+    assert result.returncode == 1
+    assert "table of 'p' should come before the one at line 1" in result.stderr
+
+
+def test_profile(tmp_path):
+    """--profile writes a profile and summarizes it on stderr."""
+    path = os.path.join(PATH_EXAMPLES, "from-toml-lang.toml")
+    profile_path = tmp_path / "sort.prof"
+    expected = capture(["toml-sort", path])
+    result = capture(["toml-sort", "--profile", str(profile_path), path])
+    assert result.stdout == expected.stdout
+    assert result.returncode == 0
+    assert result.stderr.startswith("profile: ")
+    assert "  parse " in result.stderr
+    assert pstats.Stats(str(profile_path)).total_calls > 0
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [["--version"], ["--check", "sorted.toml"]],
+)
+def test_startup_imports(arguments, tmp_path):
+    """Short runs do not import tomlkit or other heavy modules."""
+    (tmp_path / "sorted.toml").write_text("[a]\nx = 1\n\n[b]\ny = 2\n")
+    # A pyproject.toml that does not configure toml-sort is not parsed
+    (tmp_path / "pyproject.toml").write_text('[project]\nname = "example"\n')
+    script = (
+        "import sys\n"
+        "from toml_sort.cli import cli\n"
+        "try:\n"
+        f"    cli({arguments!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "heavy = ('tomlkit', 'concurrent.futures', 'cProfile', 'hashlib')\n"
+        "print(sorted(name for name in sys.modules if name.startswith(heavy)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        capture_output=True,
+        encoding="utf-8",
+        check=True,
+    )
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+@pytest.mark.parametrize("jobs", ["2", "auto"])
+def test_multiple_files_check_jobs(jobs):
+    """Parallel check output matches a serial run."""
+    paths = [
+        os.path.join(PATH_EXAMPLES, path)
+        for path in (
+            "from-toml-lang.toml",
+            "sorted/from-toml-lang.toml",
+            "sorted/weird.toml",
+            "sorted/pyproject-weird-order.toml",
+            "comment.toml",
+        )
+    ]
+    serial = capture(["toml-sort", "--check"] + paths)
+    parallel = capture(["toml-sort", "--check", "--jobs", jobs] + paths)
+    assert serial.returncode == 1
+    assert parallel.returncode == serial.returncode
+    assert parallel.stdout == serial.stdout
+    assert parallel.stderr == serial.stderr
+
+
+def test_multiple_files_check_jobs_parse_error():
+    """A file that fails to parse still fails a parallel run."""
+    paths = [
+        os.path.join(PATH_EXAMPLES, "sorted/from-toml-lang.toml"),
+        os.path.join(PATH_EXAMPLES, "weird.toml"),
+    ]
+    result = capture(["toml-sort", "--check", "--jobs", "2"] + paths)
+    assert result.returncode == 1
+    assert "ParseError" in result.stderr
+
+
+def test_options_share_sorters() -> None:
+    """Options with the same configuration share their sorter and verifier."""
+
+    def options(sort_config: SortConfiguration) -> cli.ProcessOptions:
+        return cli.ProcessOptions(
+            CommentConfiguration(),
+            sort_config,
+            FormattingConfiguration(),
+            {"servers": SortOverrideConfiguration(first=["ip"])},
+        )
+
+    first = options(SortConfiguration())
+    second = options(SortConfiguration())
+    assert first.sorter() is second.sorter()
+    assert first.verifier() is second.verifier()
+    other = options(SortConfiguration(table_keys=False))
+    assert other.sorter() is not first.sorter()
+    assert other.verifier() is not first.verifier()
+
+
+def test_map_files_reads_ahead(tmp_path: Path) -> None:
+    """A parallel run reads filenames only a few chunks ahead of its results."""
+    path = tmp_path / "sorted.toml"
+    path.write_text("a = 1\n", encoding="utf-8")
+    count = 50 * cli.STREAM_CHUNKSIZE
+    read = 0
+
+    def filenames() -> Iterator[str]:
+        nonlocal read
+        for _ in range(count):
+            read += 1
+            yield str(path)
+
+    options = cli.ProcessOptions(
+        CommentConfiguration(),
+        SortConfiguration(),
+        FormattingConfiguration(),
+        {},
+        check=True,
+    )
+    results = cli.map_files(cli.process_file, filenames(), options, jobs=2)
+    assert next(results) is None
+    # Two chunks a job, and the one sent once the first was done
+    assert read <= 5 * cli.STREAM_CHUNKSIZE
+    assert list(results) == [None] * (count - 1)
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "many"])
+def test_jobs_invalid(jobs):
+    """--jobs only accepts positive integers or 'auto'."""
+    path = os.path.join(PATH_EXAMPLES, "from-toml-lang.toml")
+    result = capture(["toml-sort", "--check", "--jobs", jobs, path])
+    assert result.returncode == 2, result.stderr
+
+
+@pytest.mark.parametrize("jobs", [[], ["--jobs", "2"], ["--memory-budget", "1"]])
+def test_multiple_files_in_place(tmpdir, jobs):
     """Unsorted files should be sorted in-place."""
     paths_sorted = [
         os.path.join(PATH_EXAMPLES, "sorted/from-toml-lang.toml"),
@@ -212,7 +375,7 @@ def test_multiple_files_in_place(tmpdir):
         shutil.copy(orig_path, temp_path)
         temp_paths_unsorted.append(str(temp_path))
 
-    result = capture(["toml-sort", "--in-place"] + temp_paths_unsorted)
+    result = capture(["toml-sort", "--in-place"] + jobs + temp_paths_unsorted)
     assert result.returncode == 0, result.stderr
 
     for path_unsorted, path_sorted in zip(temp_paths_unsorted, paths_sorted):
@@ -223,6 +386,49 @@ def test_multiple_files_in_place(tmpdir):
         assert actual == expected
 
 
+def test_in_place_sorts_once(tmp_path):
+    """Files not proven sorted are sorted once, and only written if changed."""
+    unsorted = tmp_path / "unsorted.toml"
+    unsorted.write_text("[b]\nx = 1\n\n[a]\ny = 2\n", encoding="utf-8")
+    # Dotted keys are only checked by sorting
+    dotted = tmp_path / "dotted.toml"
+    dotted.write_text("a.x = 1\n", encoding="utf-8")
+    os.utime(dotted, (0, 0))
+    with mock.patch.object(SortVerifier, "verify", side_effect=AssertionError):
+        with mock.patch(
+            "toml_sort.tomlsort.TomlSorter.toml_doc_sorted",
+            autospec=True,
+            side_effect=TomlSorter.toml_doc_sorted,
+        ) as toml_doc_sorted:
+            cli.cli(["--in-place", str(unsorted), str(dotted)])
+    assert unsorted.read_text(encoding="utf-8") == "[a]\ny = 2\n\n[b]\nx = 1\n"
+    assert toml_doc_sorted.call_count == 1
+    assert os.stat(dotted).st_mtime == 0
+
+
+@pytest.mark.parametrize(
+    "path_unsorted",
+    ["from-toml-lang", "pyproject-weird-order", "comment", "inline"],
+)
+def test_memory_budget_output(tmpdir, path_unsorted):
+    """Streaming output matches the default output."""
+    path = os.path.join(PATH_EXAMPLES, f"{path_unsorted}.toml")
+    expected = capture(["toml-sort", path]).stdout
+    result = capture(["toml-sort", "--memory-budget", "1", path])
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == expected
+
+    with open(path, encoding="UTF-8") as infile:
+        original = infile.read()
+    result_stdin = capture(["toml-sort", "--memory-budget", "1"], stdin=original)
+    assert result_stdin.stdout == expected
+
+    output = str(tmpdir / "output.toml")
+    capture(["toml-sort", "--memory-budget", "1", "-o", output, path])
+    with open(output, encoding="UTF-8") as outfile:
+        assert outfile.read() == expected
+
+
 @pytest.mark.parametrize(
     "options",
     (
@@ -278,6 +484,13 @@ def test_load_config_file_read():
             {"spaces_before_inline_comment": 4},
         ),
         ("[tool.tomlsort]\nsort_first=['x', 'y']", {"sort_first": "x,y"}),
+        (
+            "[tool.tomlsort]\nsort_aot_keys=['name', 'version']",
+            {"sort_aot_keys": "name,version"},
+        ),
+        ("[tool.tomlsort]\nmemory_budget=64", {"memory_budget": 64}),
+        ("tool = 1\ntomlsort = true", {}),
+        ("[tool]\ntomlsort = 'yes'", {}),
     ],
 )
 def test_load_config_file(toml, expected):
@@ -289,7 +502,14 @@ def test_load_config_file(toml, expected):
 
 
 @pytest.mark.parametrize(
-    "toml", ["[tool.tomlsort]\nunknown=2", "[tool.tomlsort]\nall=42"]
+    "toml",
+    [
+        "[tool.tomlsort]\nunknown=2",
+        "[tool.tomlsort]\nall=42",
+        "[tool.tomlsort]\nmemory_budget=0",
+        "[tool.tomlsort]\nmemory_budget=-5",
+        "[tool.tomlsort]\nmemory_budget=true",
+    ],
 )
 def test_load_config_file_invalid(toml):
     """Test error if pyproject.toml is not valid."""
@@ -347,6 +567,13 @@ def test_load_config_file_invalid(toml):
                 "test.123": SortOverrideConfiguration(first=["one", "two", "three"]),
             },
         ),
+        (
+            """
+                    [tool.tomlsort.overrides]
+                    package.aot_sort_keys = ["name"]
+                    """,
+            {"package": SortOverrideConfiguration(aot_sort_keys=["name"])},
+        ),
     ],
 )
 def test_load_config_overrides(toml, expected):
@@ -390,6 +617,86 @@ def test_load_config_overrides_fail(toml):
             cli.parse_config_overrides(section)
 
 
+def test_load_configuration_cached():
+    """The configuration is parsed once per pyproject contents."""
+    toml = '[tool.tomlsort]\nall = true\n[tool.tomlsort.overrides.a]\nfirst = ["x"]\n'
+    expected = ({"all": True}, {"a": SortOverrideConfiguration(first=["x"])})
+    open_mock = mock.mock_open(read_data=toml)
+    with mock.patch("toml_sort.cli.open", open_mock):
+        with mock.patch("toml_sort.cli.parse_config", wraps=cli.parse_config) as parse:
+            configuration, overrides = cli.load_configuration()
+            assert (configuration, overrides) == expected
+            # Changing a result does not change the next one
+            parse_sort_first("a.y", overrides)
+            assert cli.load_configuration() == expected
+            assert parse.call_count == 1
+            open_mock.return_value.read.return_value = toml + "\n"
+            assert cli.load_configuration() == expected
+            assert parse.call_count == 2
+
+
+def test_load_configuration_invalid(capsys):
+    """An invalid pyproject.toml is reported without a traceback."""
+    with mock.patch("toml_sort.cli.open", mock.mock_open(read_data="[tool.tomlsort")):
+        with pytest.raises(SystemExit) as error:
+            cli.load_configuration()
+    assert error.value.code == 1
+    assert capsys.readouterr().err.startswith("pyproject.toml: ")
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_nearest_configuration(tmp_path, monkeypatch, capsys, jobs):
+    """Each file is sorted with the nearest configuration above it."""
+    monkeypatch.chdir(tmp_path)
+    unsorted_keys = "[a]\ny = 2\nx = 1\n"
+    unsorted_tables = "[b]\ny = 2\n\n[a]\nx = 1\n"
+    files = {
+        "pyproject.toml": "[tool.tomlsort]\nsort_table_keys = true\n",
+        "root.toml": unsorted_keys,
+        "a/pyproject.toml": "[tool.tomlsort]\nno_sort_tables = true\n",
+        "a/tables.toml": unsorted_tables,
+        "a/sub/keys.toml": unsorted_keys,
+        "b/pyproject.toml": '[project]\nname = "b"\n',
+        "b/keys.toml": unsorted_keys,
+    }
+    for path, content in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(content, encoding="utf-8")
+    with mock.patch(
+        "toml_sort.cli.find_configuration", wraps=cli.find_configuration
+    ) as find:
+        with pytest.raises(SystemExit):
+            cli.cli(["--check", "--jobs", jobs, "."])
+    failures = capsys.readouterr().err.splitlines()[1:]
+    # b has a pyproject.toml without a configuration, so has the defaults
+    assert [failure.split(":")[0] for failure in failures] == [
+        f"  - {os.path.join('.', 'root.toml')}",
+    ]
+    # Once for the current directory, then once for each pyproject.toml
+    assert find.call_count == 4
+    # The command line applies to every file
+    with pytest.raises(SystemExit):
+        cli.cli(["--check", "--sort-table-keys", os.path.join("a", "sub", "keys.toml")])
+    cli.cli(["--check", os.path.join("a", "sub", "keys.toml")])
+
+
+def test_configuration_stops_at_repository(tmp_path, monkeypatch):
+    """Configurations above the top of the repository do not apply."""
+    (tmp_path / "pyproject.toml").write_text(
+        "[tool.tomlsort]\nsort_table_keys = true\n", encoding="utf-8"
+    )
+    (tmp_path / "repo" / ".git").mkdir(parents=True)
+    (tmp_path / "repo" / "sub").mkdir()
+    (tmp_path / "repo" / "sub" / "keys.toml").write_text(
+        "[a]\ny = 2\nx = 1\n", encoding="utf-8"
+    )
+    monkeypatch.chdir(tmp_path / "repo")
+    cli.cli(["--check", "sub"])
+    (tmp_path / "repo" / ".git").rmdir()
+    with pytest.raises(SystemExit):
+        cli.cli(["--check", "sub"])
+
+
 @pytest.mark.parametrize(
     "arg,expected_first,expected_overrides",
     [
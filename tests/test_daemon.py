@@ -0,0 +1,219 @@
+"""Test the toml_sort.daemon module."""
+
+from __future__ import annotations
+
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pytest
+
+from toml_sort import daemon
+from toml_sort.daemon import SOCKET_ENV, socket_path
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, "getuid"), reason="the daemon needs Unix domain sockets"
+)
+
+CLIENT = [sys.executable, "-c", "from toml_sort.daemon import client; client()"]
+
+UNSORTED = "[b]\nx = 1\n\n[a]\ny = 2\n"
+SORTED = "[a]\ny = 2\n\n[b]\nx = 1\n"
+
+
+def run(
+    command: List[str],
+    cwd: Path,
+    env: Dict[str, str],
+    stdin: Optional[str] = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a command, capturing its output."""
+    return subprocess.run(
+        command,
+        cwd=cwd,
+        env=env,
+        input=stdin,
+        capture_output=True,
+        encoding="utf-8",
+        check=False,
+    )
+
+
+def wait_for(path: Path, exists: bool = True) -> None:
+    """Wait until path exists, or until it is gone."""
+    deadline = time.monotonic() + 10
+    while path.exists() != exists:
+        assert time.monotonic() < deadline, f"timed out waiting for {path}"
+        time.sleep(0.02)
+
+
+@pytest.fixture(name="socket_env")
+def fixture_socket_env(tmp_path: Path) -> Iterator[Dict[str, str]]:
+    """Environment of a client talking to a running daemon."""
+    socket = tmp_path / "toml-sort.sock"
+    env = dict(os.environ, **{SOCKET_ENV: str(socket)})
+    with subprocess.Popen(
+        ["toml-sort", "--daemon", "--idle-timeout", "30"], env=env
+    ) as daemon:
+        try:
+            wait_for(socket)
+            yield env
+        finally:
+            daemon.terminate()
+
+
+@pytest.mark.parametrize(
+    "arguments,stdin",
+    [
+        (["--check", "unsorted.toml"], None),
+        (["--check", "sorted.toml"], None),
+        (["-"], UNSORTED),
+        (["--all"], UNSORTED),
+        (["--no-such-option"], None),
+    ],
+)
+def test_client_matches_cli(
+    arguments: List[str],
+    stdin: Optional[str],
+    socket_env: Dict[str, str],
+    tmp_path: Path,
+) -> None:
+    """The client prints and exits the way toml-sort itself does."""
+    (tmp_path / "unsorted.toml").write_text(UNSORTED, encoding="utf-8")
+    (tmp_path / "sorted.toml").write_text(SORTED, encoding="utf-8")
+    expected = run(["toml-sort", *arguments], tmp_path, socket_env, stdin)
+    result = run([*CLIENT, *arguments], tmp_path, socket_env, stdin)
+    assert result.stdout == expected.stdout
+    assert result.stderr == expected.stderr
+    assert result.returncode == expected.returncode
+
+
+def test_client_in_place(socket_env: Dict[str, str], tmp_path: Path) -> None:
+    """Files are written relative to the working directory of the client."""
+    (tmp_path / "file.toml").write_text(UNSORTED, encoding="utf-8")
+    result = run([*CLIENT, "--in-place", "file.toml"], tmp_path, socket_env)
+    assert result.returncode == 0
+    assert (tmp_path / "file.toml").read_text(encoding="utf-8") == SORTED
+
+
+def test_client_reloads_pyproject(socket_env: Dict[str, str], tmp_path: Path) -> None:
+    """Changes to pyproject.toml apply to the next run."""
+    (tmp_path / "file.toml").write_text(UNSORTED, encoding="utf-8")
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text("[tool.tomlsort]\nno_sort_tables = true\n", encoding="utf-8")
+    result = run([*CLIENT, "file.toml"], tmp_path, socket_env)
+    assert result.stdout == UNSORTED
+    pyproject.write_text("[tool.tomlsort]\n", encoding="utf-8")
+    result = run([*CLIENT, "file.toml"], tmp_path, socket_env)
+    assert result.stdout == SORTED
+
+
+def test_client_without_daemon(tmp_path: Path) -> None:
+    """Without a daemon the client runs the command line itself."""
+    env = dict(os.environ, **{SOCKET_ENV: str(tmp_path / "missing.sock")})
+    result = run([*CLIENT, "-"], tmp_path, env, UNSORTED)
+    assert result.stdout == SORTED
+    assert result.returncode == 0
+
+
+def test_daemon_idle_timeout(tmp_path: Path) -> None:
+    """The daemon removes its socket and exits once idle."""
+    socket = tmp_path / "toml-sort.sock"
+    with subprocess.Popen(
+        ["toml-sort", "--daemon", "--socket", str(socket), "--idle-timeout", "0.5"]
+    ) as daemon:
+        wait_for(socket)
+        assert daemon.wait(timeout=10) == 0
+    assert not socket.exists()
+
+
+def test_daemon_already_running(socket_env: Dict[str, str], tmp_path: Path) -> None:
+    """A second daemon on the same socket refuses to start."""
+    result = run(["toml-sort", "--daemon"], tmp_path, socket_env)
+    assert result.returncode == 1
+    assert "already listening" in result.stderr
+    assert Path(socket_env[SOCKET_ENV]).exists()
+
+
+# pylint: disable=protected-access
+def test_socket_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Without a runtime directory, the socket is in a directory of the user."""
+    monkeypatch.delenv(SOCKET_ENV, raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    path = Path(socket_path())
+    assert path.parent == tmp_path / f"toml-sort-{os.getuid()}"
+    with closing(daemon._listen(str(path))):
+        assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+        connection = daemon._connect()
+        assert connection is not None
+        connection.close()
+
+
+def test_client_ignores_shared_directory(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Sockets in directories others can write to are never connected to."""
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o1777)
+    path = shared / "toml-sort.sock"
+    monkeypatch.setenv(SOCKET_ENV, str(path))
+    with pytest.raises(OSError, match="only its owner"):
+        daemon._listen(str(path))
+    with closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as server:
+        server.bind(str(path))
+        server.listen()
+        assert daemon._connect() is None
+        shared.chmod(0o700)
+        connection = daemon._connect()
+        assert connection is not None
+        connection.close()
+    # Only sockets are connected to
+    path.unlink()
+    path.write_text("", encoding="utf-8")
+    assert daemon._connect() is None
+
+
+def handle(request: Dict[str, Any], run: Callable[[List[str]], None]) -> List[Any]:
+    """Frames the daemon replies to request with, running it with run."""
+    server, client = socket.socketpair()
+    with closing(server), closing(client):
+        daemon._send(client, request)
+        daemon._handle(server, run)
+        frames = []
+        while not frames or frames[-1][0]["type"] != "exit":
+            frames.append(daemon._receive(client))
+    return frames
+
+
+def test_handle_environment(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Requests run in the environment of the client, then the daemon's."""
+    monkeypatch.setenv("TOML_SORT_DAEMON_ONLY", "1")
+    seen: List[Dict[str, str]] = []
+    request = {"argv": [], "cwd": str(tmp_path), "env": {"TOML_SORT_CLIENT": "2"}}
+    handle(request, lambda _: seen.append(dict(os.environ)))
+    assert seen == [{"TOML_SORT_CLIENT": "2"}]
+    assert os.environ["TOML_SORT_DAEMON_ONLY"] == "1"
+    assert "TOML_SORT_CLIENT" not in os.environ
+
+
+@pytest.mark.parametrize("argv", [["--daemon"], ["--check", "--daem"]])
+def test_handle_rejects_daemon(argv: List[str], tmp_path: Path) -> None:
+    """A client cannot start another daemon inside the daemon."""
+    runs: List[List[str]] = []
+    frames = handle({"argv": argv, "cwd": str(tmp_path)}, runs.append)
+    assert not runs
+    assert frames[-1][0] == {"type": "exit", "code": 1}
+    assert b"--daemon" in frames[0][1]
+    # Only options are taken for --daemon
+    frames = handle({"argv": ["--", "--daemon"], "cwd": str(tmp_path)}, runs.append)
+    assert runs == [["--", "--daemon"]]
+    assert frames[-1][0] == {"type": "exit", "code": 0}
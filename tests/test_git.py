@@ -0,0 +1,172 @@
+"""Test the toml_sort.git module and the git options of the CLI."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict
+from unittest import mock
+
+import pytest
+
+from toml_sort import cli
+from toml_sort.git import ChangedFile, GitError, changed_files, is_toml
+
+SORTED = "[a]\nx = 1\n\n[b]\ny = 2\n"
+UNSORTED = "[b]\ny = 2\n\n[a]\nx = 1\n"
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def git(*arguments: str) -> str:
+    """Run git in the current directory."""
+    return subprocess.run(
+        ["git", *arguments], check=True, stdout=subprocess.PIPE, text=True
+    ).stdout
+
+
+def write(files: Dict[str, str]) -> None:
+    """Write files relative to the current directory."""
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        Path(path).write_text(content, encoding="utf-8")
+
+
+@pytest.fixture(name="repository")
+def fixture_repository(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A repository with one commit, as the current directory."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    git("config", "user.email", "toml-sort@example.com")
+    git("config", "user.name", "toml-sort")
+    write(
+        {
+            "sorted.toml": SORTED,
+            "unsorted.toml": UNSORTED,
+            "sub/nested.toml": SORTED,
+            "notes.txt": "",
+        }
+    )
+    git("add", ".")
+    git("commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "path,expected",
+    [
+        ("pyproject.toml", True),
+        ("sub/dir/config.toml", True),
+        ("Pipfile", True),
+        ("Cargo.lock", False),
+        ("sub/uv.lock", False),
+        ("poetry.lock", False),
+        ("my-poetry.lock", False),
+        ("notes.txt", False),
+        ("toml", False),
+    ],
+)
+def test_is_toml(path: str, expected: bool) -> None:
+    """Files are filtered like the pre-commit hooks filter them."""
+    assert is_toml(path) is expected
+
+
+def test_changed_files(repository: Path) -> None:
+    """Staged and committed changes are found, with their blobs."""
+    assert not changed_files()
+    assert not changed_files("HEAD")
+    write(
+        {
+            "new.toml": UNSORTED,
+            "poetry.lock": UNSORTED,
+            "notes.txt": "changed",
+            "sub/nested.toml": UNSORTED,
+        }
+    )
+    git("add", "new.toml", "poetry.lock", "notes.txt")
+    os.remove("unsorted.toml")
+    blob = git("rev-parse", ":new.toml").strip()
+    assert changed_files() == [ChangedFile("new.toml", blob)]
+    assert changed_files("HEAD") == [
+        ChangedFile("new.toml", blob),
+        ChangedFile(os.path.join("sub", "nested.toml"), None),
+    ]
+    # A file changed again after it was staged has no blob
+    write({"new.toml": SORTED})
+    assert changed_files() == [ChangedFile("new.toml", None)]
+    # Untracked files are changes since a commit, unless git ignores them
+    write(
+        {
+            ".gitignore": "ignored.toml\n",
+            "ignored.toml": UNSORTED,
+            "sub/untracked.toml": UNSORTED,
+        }
+    )
+    assert changed_files() == [ChangedFile("new.toml", None)]
+    assert changed_files("HEAD") == [
+        ChangedFile("new.toml", None),
+        ChangedFile(os.path.join("sub", "nested.toml"), None),
+        ChangedFile(os.path.join("sub", "untracked.toml"), None),
+    ]
+    os.chdir("sub")
+    assert changed_files("HEAD") == [
+        ChangedFile("nested.toml", None),
+        ChangedFile("untracked.toml", None),
+    ]
+
+
+def test_changed_files_errors(repository: Path, tmp_path_factory: Path) -> None:
+    """Bad references and directories outside a repository are errors."""
+    with pytest.raises(GitError, match="nope"):
+        changed_files("nope")
+    # Options are not passed on to git
+    with pytest.raises(GitError, match="invalid reference"):
+        changed_files(f"--output={repository / 'written'}")
+    assert not (repository / "written").exists()
+    os.chdir(tmp_path_factory.mktemp("outside"))  # type: ignore[attr-defined]
+    with pytest.raises(GitError):
+        changed_files()
+
+
+def test_cli_changed_since(
+    repository: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Only changed TOML files are checked or sorted."""
+    cli.cli(["--check", "--changed-since", "HEAD"])
+    write({"sorted.toml": UNSORTED, "poetry.lock": UNSORTED, "new.toml": UNSORTED})
+    with pytest.raises(SystemExit) as error:
+        cli.cli(["--check", "--changed-since", "HEAD"])
+    assert error.value.code == 1
+    errors = capsys.readouterr().err
+    assert "sorted.toml" in errors
+    assert "new.toml" in errors
+    cli.cli(["--in-place", "--changed-since", "HEAD"])
+    assert Path("sorted.toml").read_text(encoding="utf-8") == SORTED
+    assert Path("new.toml").read_text(encoding="utf-8") == SORTED
+    assert Path("unsorted.toml").read_text(encoding="utf-8") == UNSORTED
+    assert Path("poetry.lock").read_text(encoding="utf-8") == UNSORTED
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [["--staged"], ["--check", "--staged", "sorted.toml"]],
+)
+def test_cli_git_usage(repository: Path, arguments: list[str]) -> None:
+    """The git options need --check or --in-place and no filenames."""
+    with pytest.raises(SystemExit) as error:
+        cli.cli(arguments)
+    assert error.value.code == 1
+
+
+def test_cli_staged_cache(repository: Path) -> None:
+    """Files whose blobs were seen sorted are not read again."""
+    write({"new.toml": SORTED})
+    git("add", "new.toml")
+    command = ["--check", "--staged", "--cache-dir", str(repository / ".cache")]
+    cli.cli(command)
+    # A new mtime defeats the stat entry, but not the blob
+    os.utime("new.toml", ns=(1, 1))
+    with mock.patch("toml_sort.cli.read_file", side_effect=AssertionError):
+        cli.cli(command)
@@ -0,0 +1,196 @@
+"""Test the toml_sort.incremental module."""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest import mock
+
+import pytest
+
+from toml_sort import TomlSorter
+from toml_sort.incremental import SortedDocument
+from toml_sort.stream import split_groups
+from toml_sort.tomlsort import (
+    CommentConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+)
+
+EXAMPLES = sorted(
+    str(path.relative_to(Path(__file__).parent / "examples"))
+    for path in (Path(__file__).parent / "examples").glob("**/*.toml")
+)
+
+CONFIGS = [
+    {},
+    {"sort_config": SortConfiguration(table_keys=False)},
+    {"comment_config": CommentConfiguration(header=False, footer=False)},
+    {"sort_config": SortConfiguration(tables=False)},
+    {
+        "sort_config": SortConfiguration(ignore_case=True, first=["servers"]),
+        "sort_config_overrides": {
+            "servers": SortOverrideConfiguration(first=["beta"]),
+        },
+    },
+]
+
+# Snippets inserted by the edits, each one testing a way in which an
+# edit can reach beyond the lines it changes
+SNIPPETS = [
+    "",
+    "\n\n",
+    "# comment\n",
+    "key = 1\n",
+    "dotted.key = 1\n",
+    "[A]\n",
+    "[zz]\nk = 1\n",
+    "[a.b]\nq = 2\n",
+    "[[products]]\nname = 'n'\n",
+    "[servers.gamma]\nip = 1\n",
+    "open = '''\n",
+]
+
+# Snippets that only add comments and blank lines, which attach to
+# whatever comes after them
+COMMENT_SNIPPETS = ["\n", "\n\n", "# c\n", "\n# c", "# c\n\n", "\n\n# c", "x"]
+
+COMMENTED = (
+    "# header\n\na = 1\n\n# on b\n[b]\nx = 1\n\n[c]\ny = 2  # y\n\n"
+    "[d.e]\nz = 3\n\n# footer\n"
+)
+
+DOCUMENT = "".join(f"[table{i:03}]\nkey = {i}\n\n" for i in range(100))
+
+
+@pytest.mark.parametrize("args", CONFIGS)
+@pytest.mark.parametrize("example", EXAMPLES)
+def test_edit_matches_sort(
+    example: str, args: Dict[str, Any], fixture_path: Path
+) -> None:
+    """Every edit gives the same text as sorting the edited text."""
+    text = (fixture_path / example).read_text(encoding="utf-8")
+    sorter = TomlSorter(**args)
+    try:
+        document = SortedDocument(text, sorter)
+    except Exception:  # pylint: disable=broad-except
+        return
+    edits = random.Random(example)
+    for _ in range(10):
+        previous = document.text
+        start = edits.randrange(len(previous) + 1)
+        if edits.random() < 0.5:
+            start = end = previous.rfind("\n", 0, start) + 1
+        else:
+            end = min(len(previous), start + edits.choice([1, 5, 40]))
+        replacement = edits.choice(SNIPPETS)
+        edited = previous[:start] + replacement + previous[end:]
+        try:
+            expected = sorter.sort(edited)
+        except Exception as error:  # pylint: disable=broad-except
+            with pytest.raises(type(error)):
+                document.edit(start, end, replacement)
+            assert document.text == previous
+            continue
+        assert document.edit(start, end, replacement) == expected
+        assert document.text == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_edit_comments_match_sort(seed: int) -> None:
+    """Comments and blank lines added anywhere sort as in the edited text."""
+    edits = random.Random(seed)
+    sorter = TomlSorter(**edits.choice(CONFIGS))
+    document = SortedDocument(COMMENTED, sorter)
+    for _ in range(10):
+        previous = document.text
+        start = edits.randrange(len(previous) + 1)
+        if edits.random() < 0.5:
+            # Between two parts
+            start = previous.find("\n\n", start) + 1 or start
+        end = min(len(previous), start + edits.choice([0, 0, 1, 5]))
+        replacement = edits.choice(COMMENT_SNIPPETS + SNIPPETS)
+        edited = previous[:start] + replacement + previous[end:]
+        try:
+            expected = sorter.sort(edited)
+        except Exception as error:  # pylint: disable=broad-except
+            with pytest.raises(type(error)):
+                document.edit(start, end, replacement)
+            continue
+        assert document.edit(start, end, replacement) == expected
+
+
+def test_edit_comment_before_group() -> None:
+    """A comment added at the end of the root is kept, on the next group."""
+    document = SortedDocument("a = 1\n\n[b]\nx = 1\n")
+    start = document.text.index("[b]") - 1
+    assert document.edit(start, start, "\n# about b") == (
+        "a = 1\n\n# about b\n[b]\nx = 1\n"
+    )
+
+
+def test_edit_sorts_touched_groups() -> None:
+    """An edit within a group only sorts the groups around it."""
+    document = SortedDocument(DOCUMENT)
+    sorted_lengths: List[int] = []
+    sort = TomlSorter.sort
+
+    def recording_sort(sorter: TomlSorter, text: str) -> str:
+        sorted_lengths.append(len(text))
+        return sort(sorter, text)
+
+    start = document.text.index("[table050]")
+    with mock.patch.object(TomlSorter, "sort", recording_sort):
+        # Renamed, the table moves to the front
+        text = document.edit(start, start + len("[table050]"), "[a]")
+    assert text == TomlSorter().sort(DOCUMENT.replace("[table050]", "[a]"))
+    assert text.startswith("[a]\nkey = 50\n\n[table000]")
+    assert sorted_lengths and max(sorted_lengths) < len(DOCUMENT) / 20
+
+
+@pytest.mark.parametrize(
+    "replacement",
+    [
+        # A table under the key of another group
+        "[table001.child]\nx = 1\n\n",
+        # A value left open swallows the rest of the document
+        "x = '''\n",
+    ],
+)
+def test_edit_sorts_everything(replacement: str) -> None:
+    """Edits that change how other groups sort sort the whole text."""
+    document = SortedDocument(DOCUMENT)
+    start = document.text.index("[table050]")
+    edited = document.text[:start] + replacement + document.text[start:]
+    try:
+        expected = TomlSorter().sort(edited)
+    except Exception as error:  # pylint: disable=broad-except
+        with pytest.raises(type(error)):
+            document.edit(start, start, replacement)
+        assert document.text == TomlSorter().sort(DOCUMENT)
+    else:
+        assert document.edit(start, start, replacement) == expected
+
+
+def test_edit_outside_text() -> None:
+    """Edits must lie within the text."""
+    document = SortedDocument("[a]\n")
+    with pytest.raises(ValueError):
+        document.edit(2, 10, "")
+    with pytest.raises(ValueError):
+        document.edit(3, 2, "")
+
+
+@pytest.mark.parametrize("example", EXAMPLES)
+def test_split_groups(example: str, fixture_path: Path) -> None:
+    """Joined with blank lines, the parts give back the sorted text."""
+    try:
+        text = TomlSorter().sort((fixture_path / example).read_text(encoding="utf-8"))
+    except Exception:  # pylint: disable=broad-except
+        return
+    split = split_groups(text, header_comments=True, footer=True)
+    if split is None:
+        return
+    parts = [split.root, *(group for _, group in split.groups), split.footer]
+    assert "\n\n".join(part for part in parts if part) + "\n" == text
@@ -0,0 +1,329 @@
+"""Test the toml_sort.linesort module."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+from unittest import mock
+
+import pytest
+import tomlkit
+
+from toml_sort import TomlSort, linesort
+from toml_sort.linesort import sort_tables
+from toml_sort.tomlsort import (
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+    clean_toml_text,
+)
+
+EXAMPLES = sorted(
+    str(path.relative_to(Path(__file__).parent / "examples"))
+    for path in (Path(__file__).parent / "examples").glob("**/*.toml")
+)
+
+CONFIGS = [
+    {"sort_config": SortConfiguration(table_keys=False)},
+    {
+        "sort_config": SortConfiguration(table_keys=False),
+        "comment_config": CommentConfiguration(header=False, footer=False),
+    },
+    {
+        "sort_config": SortConfiguration(table_keys=False),
+        "comment_config": CommentConfiguration(block=False),
+    },
+    {"sort_config": SortConfiguration(table_keys=False, tables=False)},
+    {
+        "sort_config": SortConfiguration(
+            table_keys=False, ignore_case=True, first=["servers"]
+        ),
+        "sort_config_overrides": {
+            "servers": SortOverrideConfiguration(first=["beta"]),
+        },
+    },
+    {
+        "sort_config": SortConfiguration(table_keys=False),
+        "format_config": FormattingConfiguration(spaces_before_inline_comment=1),
+    },
+    {"sort_config": SortConfiguration(table_keys=False, aot_sort_keys=["name", "sku"])},
+    {},
+    {"comment_config": CommentConfiguration(header=False, footer=False)},
+    {
+        "sort_config": SortConfiguration(ignore_case=True, first=["title"]),
+        "sort_config_overrides": {
+            "servers.*": SortOverrideConfiguration(first=["ip"]),
+            "products": SortOverrideConfiguration(table_keys=False),
+        },
+    },
+    {"sort_config": SortConfiguration(aot_sort_keys=["name", "sku"])},
+]
+
+# Sorted, with every line formatted the way TomlSort formats it
+DOCUMENT = """\
+# Header
+
+title = "example"
+# Attached to owner
+owner = {name = "Tom", dob = 1979-05-27T07:32:00-08:00}  # inline
+
+[[products]]
+name = "Hammer"
+
+[products.details]
+weight = 1
+
+[[products]]
+name = "Nail"
+
+[servers]
+
+# Attached to alpha
+[servers.alpha]
+ip = "10.0.0.1"
+ports = [
+  8001,
+  # Comment in array
+  8002
+]
+
+[servers.beta]
+ip = "10.0.0.2"
+
+[zeta]
+key = 'value'
+
+# Footer
+"""
+
+
+# The same document, with its tables out of order
+UNSORTED = """\
+# Header
+
+title = "example"
+# Attached to owner
+owner = {name = "Tom", dob = 1979-05-27T07:32:00-08:00}  # inline
+
+[zeta]
+key = 'value'
+
+[[products]]
+name = "Hammer"
+
+[products.details]
+weight = 1
+
+[[products]]
+name = "Nail"
+
+[servers]
+
+[servers.beta]
+ip = "10.0.0.2"
+
+# Attached to alpha
+[servers.alpha]
+ip = "10.0.0.1"
+ports = [
+  8001,
+  # Comment in array
+  8002
+]
+
+# Footer
+"""
+
+
+def tomlkit_sorted(text: str, **kwargs: Any) -> str:
+    """Sort text with tomlkit only."""
+    with mock.patch("toml_sort.linesort.sort_tables_with", return_value=None):
+        return TomlSort(text, **kwargs).sorted()
+
+
+def fast_sorted(text: str, **kwargs: Any) -> Optional[str]:
+    """Sort text with sort_tables, if it applies."""
+    chunks = sort_tables(clean_toml_text(text), **kwargs)
+    return None if chunks is None else "".join(chunks)
+
+
+def shuffled(text: str) -> str:
+    """Reverse the order of the blocks of a document."""
+    header, *blocks = text.strip().split("\n\n")
+    return "\n\n".join([header, *reversed(blocks)]) + "\n"
+
+
+@pytest.mark.parametrize("args", CONFIGS)
+@pytest.mark.parametrize("example", EXAMPLES)
+def test_sort_tables_matches_tomlkit(
+    example: str, args: Dict[str, Any], fixture_path: Path
+) -> None:
+    """The output is the same as sorting with tomlkit."""
+    text = (fixture_path / example).read_text(encoding="utf-8")
+    try:
+        expected = tomlkit_sorted(text, **args)
+    except Exception as error:  # pylint: disable=broad-except
+        with pytest.raises(type(error)):
+            TomlSort(text, **args).sorted()
+        return
+    assert TomlSort(text, **args).sorted() == expected
+    for source in (text, expected, shuffled(expected)):
+        result = fast_sorted(source, **args)
+        assert result is None or result == tomlkit_sorted(source, **args)
+
+
+@pytest.mark.parametrize(
+    "args",
+    # DOCUMENT has no lines to format under these
+    [CONFIGS[0], CONFIGS[1], CONFIGS[3], CONFIGS[4]],
+)
+def test_sort_tables_reorders_blocks(args: Dict[str, Any]) -> None:
+    """Formatted documents are sorted without tomlkit."""
+    for text in (DOCUMENT, UNSORTED):
+        expected = tomlkit_sorted(text, **args)
+        assert fast_sorted(text, **args) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Dotted keys define tables
+        "b.x = 1\n\n[a]\n",
+        # Table defined in pieces
+        "[b.x]\n\n[a]\n\n[b.y]\n",
+        # Table defined after its child
+        "[a.b]\n\n[a]\n",
+        # Lines that need formatting
+        "[b]\nx=1\n\n[a]\n",
+        "[b]\n\n  [a]\n",
+        # Invalid TOML
+        "[b]\nx = 1\nx = 2\n\n[a]\n",
+        "[b]\nx = nope\n\n[a]\n",
+    ],
+)
+def test_sort_tables_unsupported_documents(text: str) -> None:
+    """Documents that need more than reordering are left to tomlkit."""
+    config = SortConfiguration(table_keys=False)
+    assert fast_sorted(text, sort_config=config) is None
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        {"sort_config": SortConfiguration(inline_tables=True)},
+        {"sort_config": SortConfiguration(table_keys=False, inline_arrays=True)},
+        {
+            "sort_config_overrides": {
+                "servers": SortOverrideConfiguration(inline_arrays=True)
+            },
+        },
+    ],
+)
+def test_sort_tables_unsupported_configs(args: Dict[str, Any]) -> None:
+    """Configurations that sort inline values are left to tomlkit."""
+    assert fast_sorted(DOCUMENT, **args) is None
+
+
+def test_sort_tables_keys() -> None:
+    """Keys are sorted within their tables, with the comments above them."""
+    text = (
+        "zeta = 1\nalpha = 2\n\n[[b]]\ny = 1\n# On x\nx = 2  # x\n\n"
+        "[b.c]\nq = 1\np = 2\n\n[a]\nz = 1\n"
+    )
+    result = fast_sorted(text)
+    assert result == tomlkit_sorted(text)
+    assert result == (
+        "alpha = 2\nzeta = 1\n\n[a]\nz = 1\n\n[[b]]\n# On x\nx = 2  # x\n"
+        "y = 1\n\n[b.c]\np = 2\nq = 1\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "args,engine",
+    [
+        ({}, True),
+        ({"sort_config": SortConfiguration(table_keys=False)}, True),
+        ({"sort_config": SortConfiguration(inline_arrays=True)}, False),
+        (
+            {
+                "sort_config_overrides": {
+                    "zeta": SortOverrideConfiguration(inline_tables=True)
+                }
+            },
+            False,
+        ),
+    ],
+)
+def test_sorted_engine(args: Dict[str, Any], engine: bool) -> None:
+    """TomlSort tries the line engine unless inline values are sorted."""
+    expected = tomlkit_sorted(UNSORTED, **args)
+    wrapped = linesort.sort_tables_with
+    with mock.patch("tomlkit.parse", wraps=tomlkit.parse) as parse:
+        with mock.patch(
+            "toml_sort.linesort.sort_tables_with", wraps=wrapped
+        ) as sort_tables_with:
+            assert TomlSort(UNSORTED, **args).sorted() == expected
+    assert sort_tables_with.called == engine
+    # Formatted documents need no tomlkit when the engine applies
+    assert parse.called != engine
+
+
+def test_sort_tables_copies_spans(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Runs of lines that keep their place are copied as one slice."""
+    config = SortConfiguration(table_keys=False)
+    chunks = sort_tables(clean_toml_text(DOCUMENT), sort_config=config)
+    assert chunks is not None
+    assert list(chunks) == [DOCUMENT]
+    monkeypatch.setattr(linesort, "CHUNK_SIZE", 16)
+    chunks = sort_tables(clean_toml_text(UNSORTED), sort_config=config)
+    assert chunks is not None
+    sliced = list(chunks)
+    assert max(len(chunk) for chunk in sliced) <= 16
+    assert "".join(sliced) == DOCUMENT
+
+
+# The tables of an array of tables, out of order by name and version
+LOCK = """\
+[[package]]
+name = "b"
+version = 'x'
+
+[package.dependencies]
+c = "1"
+
+[[package]]
+name = "a"
+version = 2.5
+
+[[package]]
+version = true
+
+[[package]]
+name = "a"
+version = 10  # newest
+
+[metadata]
+hash = "0"
+"""
+
+
+def test_sort_tables_aot_keys() -> None:
+    """Arrays of tables sorted by keys are sorted without tomlkit."""
+    args: Dict[str, Any] = {
+        "sort_config": SortConfiguration(
+            table_keys=False, aot_sort_keys=["name", "version"]
+        )
+    }
+    result = fast_sorted(LOCK, **args)
+    assert result is not None
+    assert result == tomlkit_sorted(LOCK, **args)
+    assert [line for line in result.splitlines() if line.startswith("version")] == [
+        "version = 2.5",
+        "version = 10  # newest",
+        "version = 'x'",
+        "version = true",
+    ]
+    # Dates are left to tomlkit
+    dated = LOCK.replace("version = true", "version = 2024-01-01")
+    assert fast_sorted(dated, **args) is None
@@ -0,0 +1,59 @@
+"""Test the toml_sort.profiling module."""
+
+from __future__ import annotations
+
+import io
+import pstats
+from pathlib import Path
+
+import pytest
+
+from toml_sort import TomlSort
+from toml_sort.profiling import phase_times, profile
+from toml_sort.tomlsort import SortConfiguration
+
+
+def test_profile_phases(tmp_path: Path) -> None:
+    """Phases are summarized in order, with their calls."""
+    summary = io.StringIO()
+    with profile(str(tmp_path / "sort.prof"), summary=summary) as profiler:
+        TomlSort(
+            "[b]\nx = [2, 1]\n\n[a]\n",
+            sort_config=SortConfiguration(inline_arrays=True),
+        ).sorted()
+    phases = [phase.name for phase in phase_times(pstats.Stats(profiler))]
+    assert {"parse", "toml_elements_sorted", "array_steps", "dumps"} <= set(phases)
+    assert phases.index("parse") < phases.index("dumps")
+    lines = summary.getvalue().splitlines()
+    assert lines[0].endswith(f"written to {tmp_path / 'sort.prof'}")
+    assert len(lines) == len(phases) + 1
+    assert (tmp_path / "sort.prof").exists()
+
+
+def test_profile_nested_phases() -> None:
+    """Nested tables and arrays of tables are counted in their phases."""
+    text = "".join(
+        f"[t{index}]\nb = [2, 1]\n[t{index}.sub]\nz = {{b = 1, a = [2, 1]}}\n"
+        f"[[t{index}.items]]\nx = 1\n[t{index}.items.deep]\ny = 2\n\n"
+        for index in range(5)
+    )
+    sort_config = SortConfiguration(
+        table_keys=True, inline_tables=True, inline_arrays=True
+    )
+    with profile() as profiler:
+        TomlSort(text, sort_config=sort_config).sorted()
+    calls = {phase.name: phase.calls for phase in phase_times(pstats.Stats(profiler))}
+    # t, t.sub and t.items.deep, and each element of t.items
+    assert calls["table_steps"] >= 3 * 5
+    assert calls["aot_steps"] >= 5
+    assert calls["inline_table_steps"] >= 5
+    # b, and a in each inline table
+    assert calls["array_steps"] >= 2 * 5
+
+
+def test_profile_exception(tmp_path: Path) -> None:
+    """The profile is written when the block fails."""
+    with pytest.raises(ValueError):
+        with profile(str(tmp_path / "sort.prof")):
+            raise ValueError()
+    assert (tmp_path / "sort.prof").exists()
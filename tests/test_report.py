@@ -0,0 +1,175 @@
+"""Test the toml_sort.report module and the --report option."""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+from pathlib import Path
+from typing import Iterator
+from unittest import mock
+
+import pytest
+
+from toml_sort import cli
+from toml_sort.report import (
+    DocumentShape,
+    FileReport,
+    document_shape,
+    summary,
+    write_report,
+)
+
+SORTED = "[a]\nx = 1\n"
+UNSORTED = "[b]\ny = [1, [2, 3]]\n\n[a]\nx = 1\n"
+
+
+def test_document_shape() -> None:
+    """Tables, keys, depth and arrays are measured over the whole document."""
+    text = (
+        "title = 1\n"
+        "inline = {a = {b = 1}}\n"
+        "[table]\n"
+        "values = [1, [2, 3, 4]]\n"
+        "[[items]]\n"
+        "id = 1\n"
+        "[[items]]\n"
+        "id = 2\n"
+    )
+    assert document_shape(text) == DocumentShape(
+        tables=5, keys=6, max_depth=3, largest_array=3
+    )
+    assert document_shape("") == DocumentShape(0, 0, 0, 0)
+    assert document_shape("[a\n") is None
+
+
+def test_summary() -> None:
+    """Statuses and phases are totalled, and the slowest files listed first."""
+    reports = [
+        FileReport("a.toml", "sorted", 1.0, {"read": 0.5}),
+        FileReport("b.toml", "rewritten", 3.0, {"read": 0.5, "sort": 2.0}),
+        FileReport("c.toml", "sorted", 2.0),
+    ]
+    result = summary(reports, slowest=2)
+    assert result["count"] == 3
+    assert result["statuses"] == {"sorted": 2, "rewritten": 1}
+    assert result["phases"] == {"read": 1.0, "sort": 2.0}
+    assert result["slowest"] == [
+        {"path": "b.toml", "seconds": 3.0},
+        {"path": "c.toml", "seconds": 2.0},
+    ]
+
+
+def test_write_report() -> None:
+    """Reports are one JSON document, or one object per line."""
+    reports = [FileReport("a.toml", "sorted", 1.0, size=8)]
+    file = io.StringIO()
+    write_report(reports, file, "json")
+    document = json.loads(file.getvalue())
+    assert document["files"][0]["size"] == 8
+    assert document["summary"]["count"] == 1
+    file = io.StringIO()
+    write_report(reports, file, "ndjson")
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert [record["type"] for record in records] == ["file", "summary"]
+    assert records[0]["path"] == "a.toml"
+
+
+def test_write_report_streams() -> None:
+    """Each NDJSON record is written as soon as its file is reported."""
+    file = io.StringIO()
+
+    def reports() -> Iterator[FileReport]:
+        yield FileReport("a.toml", "sorted", 1.0)
+        assert json.loads(file.getvalue())["path"] == "a.toml"
+        yield FileReport("b.toml", "sorted", 2.0)
+
+    written = write_report(reports(), file, "ndjson")
+    assert [report.path for report in written] == ["a.toml", "b.toml"]
+    assert json.loads(file.getvalue().splitlines()[-1])["count"] == 2
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_report(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    jobs: str,
+) -> None:
+    """Each file is reported in order, with its status, phases and shape."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sorted.toml").write_text(SORTED, encoding="utf-8")
+    (tmp_path / "unsorted.toml").write_text(UNSORTED, encoding="utf-8")
+    with pytest.raises(SystemExit) as error:
+        cli.cli(["--check", "--report", "ndjson", "--jobs", jobs, "."])
+    assert error.value.code == 1
+    output = capsys.readouterr()
+    records = [json.loads(line) for line in output.out.splitlines()]
+    assert [(record["path"], record["status"]) for record in records[:2]] == [
+        (os.path.join(".", "sorted.toml"), "sorted"),
+        (os.path.join(".", "unsorted.toml"), "would_change"),
+    ]
+    assert records[1]["size"] == len(UNSORTED)
+    assert records[1]["shape"] == {
+        "tables": 2,
+        "keys": 2,
+        "max_depth": 3,
+        "largest_array": 2,
+    }
+    assert set(records[1]["phases"]) == {"read", "verify"}
+    assert records[2]["statuses"] == {"sorted": 1, "would_change": 1}
+    assert "1 check failure(s):" in output.err
+
+    cli.cli(["--in-place", "--report", "json", "--report-file", "r.json", "."])
+    files = json.loads((tmp_path / "r.json").read_text(encoding="utf-8"))["files"]
+    assert [report["status"] for report in files] == ["sorted", "rewritten"]
+    assert {"read", "verify", "write"} <= set(files[1]["phases"])
+
+
+def test_cli_report_cache_hit(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Files known to be sorted from the cache are reported without reading."""
+    path = tmp_path / "sorted.toml"
+    path.write_text(SORTED, encoding="utf-8")
+    # Files modified just now are not trusted by their stat
+    os.utime(path, (0, 0))
+    arguments = ["--check", "--cache-dir", str(tmp_path / "cache"), str(path)]
+    cli.cli([*arguments, "--report", "ndjson"])
+    capsys.readouterr()
+    with mock.patch("toml_sort.cli.read_file", side_effect=AssertionError):
+        cli.cli([*arguments, "--report", "ndjson"])
+    record = json.loads(capsys.readouterr().out.splitlines()[0])
+    assert record["status"] == "sorted"
+    assert record["size"] == len(SORTED)
+    assert record["shape"] is None
+    assert record["phases"] == {}
+
+
+def test_cli_report_parse_error(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Files that cannot be parsed are reported before exiting with an error."""
+    invalid = tmp_path / "invalid.toml"
+    invalid.write_text("[a\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as error:
+        cli.cli(["--check", "--report", "json", str(invalid)])
+    assert error.value.code == 1
+    output = capsys.readouterr()
+    (report,) = json.loads(output.out)["files"]
+    assert report["status"] == "parse_error"
+    assert report["shape"] is None
+    assert output.err.startswith(f"{invalid}: ")
+
+
+def test_cli_report_usage() -> None:
+    """The report cannot share stdout with the sorted output."""
+    with pytest.raises(SystemExit) as error:
+        cli.cli(
+            [
+                "--report",
+                "json",
+                os.path.join("tests", "examples", "from-toml-lang.toml"),
+            ]
+        )
+    assert error.value.code == 1
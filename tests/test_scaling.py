@@ -0,0 +1,60 @@
+"""Test that the core entry points scale linearly with their input."""
+
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+
+from benchmarks.scaling import (
+    CALLS_BOUND,
+    SCALING_CASES,
+    SECONDS_BOUND,
+    Scaling,
+    exponent,
+    growth,
+)
+
+
+@pytest.mark.parametrize("case", SCALING_CASES, ids=lambda case: case.name)
+def test_scaling(case: Scaling) -> None:
+    """The cost of each entry point grows no faster than its input."""
+    assert growth(case) <= case.bound
+
+
+def test_exponent() -> None:
+    """The exponent of a power law is fitted exactly."""
+    sizes = [10, 20, 40, 80]
+    assert exponent(sizes, [3 * size for size in sizes]) == pytest.approx(1)
+    assert exponent(sizes, [size**2 for size in sizes]) == pytest.approx(2)
+
+
+def _nested_calls(items: List[int]) -> None:
+    for item in items:
+        for other in items:
+            abs(item - other)
+
+
+def _pop_front(items: List[int]) -> None:
+    while items:
+        items.pop(0)
+
+
+@pytest.mark.parametrize(
+    "case",
+    [
+        Scaling("calls", lambda size: list(range(size)), _nested_calls, (10, 20, 40)),
+        Scaling(
+            "seconds",
+            lambda size: list(range(size)),
+            _pop_front,
+            (5000, 10000, 20000),
+            cost="seconds",
+        ),
+    ],
+    ids=lambda case: case.name,
+)
+def test_growth_finds_quadratic(case: Scaling) -> None:
+    """Quadratic work is over the bound, for both costs."""
+    assert case.bound in (CALLS_BOUND, SECONDS_BOUND)
+    assert growth(case) > case.bound
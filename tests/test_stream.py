@@ -0,0 +1,175 @@
+"""Test the toml_sort.stream and toml_sort.scanner modules."""
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from toml_sort import TomlSort
+from toml_sort.scanner import AOT, BLANK, COMMENT, KEYVALUE, TABLE, scan_lines
+from toml_sort.stream import sort_stream
+from toml_sort.tomlsort import (
+    CommentConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+)
+
+
+class Unseekable(io.RawIOBase):
+    """A binary stream that cannot seek, like a pipe."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        chunk = self.data.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def stream_sorted(text: str, seekable: bool = True, **kwargs: Any) -> str:
+    """Sort text with sort_stream, returning the output as one string."""
+    data = text.encode("utf-8")
+    infile = io.BytesIO(data) if seekable else io.BufferedReader(Unseekable(data))
+    chunks: List[str] = []
+    sort_stream(infile, chunks.append, **kwargs)
+    return "".join(chunks)
+
+
+@pytest.mark.parametrize(
+    "fixture",
+    [
+        "comment",
+        "dotted-key",
+        "empty",
+        "from-toml-lang",
+        "gradle-version-catalog",
+        "inline",
+        "pyproject-weird-order",
+        "single-comment",
+    ],
+)
+@pytest.mark.parametrize(
+    "args",
+    [
+        {},
+        {"comment_config": CommentConfiguration(header=False, footer=False)},
+        {"sort_config": SortConfiguration(tables=False)},
+        {"sort_config": SortConfiguration(table_keys=True, ignore_case=True)},
+        {
+            "sort_config": SortConfiguration(first=["servers"]),
+            "sort_config_overrides": {
+                "servers": SortOverrideConfiguration(first=["beta"])
+            },
+        },
+    ],
+)
+def test_sort_stream_matches_sorted(
+    fixture: str,
+    args: Dict[str, Any],
+    get_fixture: Callable[[str], Path],
+) -> None:
+    """Streaming output is identical to sorting the whole document."""
+    text = get_fixture(fixture).read_text(encoding="utf-8")
+    expected = TomlSort(text, **args).sorted()
+    assert stream_sorted(text, memory_budget=1, **args) == expected
+    assert stream_sorted(text, seekable=False, memory_budget=1, **args) == expected
+
+
+def test_sort_stream_array_of_tables_batches() -> None:
+    """A large array of tables is sorted in batches of whole elements."""
+    elements = "".join(
+        f"[[items]]\nname = 'item{i}'\n[items.meta]\nb = 1\na = 2\n\n"
+        for i in range(50)
+    )
+    text = f"# header\n\n[zeta]\nx = 1\n\n{elements}[alpha]\ny = 2\n"
+    args: Dict[str, Any] = {"sort_config": SortConfiguration(table_keys=True)}
+    expected = TomlSort(text, **args).sorted()
+    chunks: List[str] = []
+    sort_stream(io.BytesIO(text.encode()), chunks.append, memory_budget=64, **args)
+    assert "".join(chunks) == expected
+    assert len(chunks) > 50
+
+
+def test_sort_stream_array_of_tables_sorted_by_keys() -> None:
+    """Elements are put in order by their keys before they are batched."""
+    elements = "".join(
+        f"[[items]]\nname = 'item{i % 7}'\nid = {i}\n[items.meta]\nb = 1\n\n"
+        for i in range(50)
+    )
+    text = f"[zeta]\nx = 1\n\n{elements}[alpha]\ny = 2\n"
+    args: Dict[str, Any] = {"sort_config": SortConfiguration(aot_sort_keys=["name"])}
+    expected = TomlSort(text, **args).sorted()
+    chunks: List[str] = []
+    sort_stream(io.BytesIO(text.encode()), chunks.append, memory_budget=64, **args)
+    assert "".join(chunks) == expected
+    assert len(chunks) > 50
+    # Values only TomlSort can order keep the array in one batch
+    dated = text.replace("name = 'item0'\nid = 0\n", "name = 2024-01-01\nid = 0\n", 1)
+    args = {"sort_config": SortConfiguration(aot_sort_keys=["name", "id"])}
+    chunks = []
+    sort_stream(io.BytesIO(dated.encode()), chunks.append, memory_budget=64, **args)
+    assert "".join(chunks) == TomlSort(dated, **args).sorted()
+    assert len(chunks) == 4
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Root dotted key that defines the same table as a header
+        "b.x = 1\n[b]\ny = 2\n[a]\n",
+        # Root dotted key that tomlkit moves out of the root
+        "x.b = 1\n\n[b]\nd = 1\n",
+        # Tables of one group interrupted by another group
+        "[b.x]\n[a]\n[b.y]\n",
+        # Value that never ends
+        "[b]\nx = '''\n",
+        # Old Mac line endings
+        "[b]\rx = 1\r[a]\r",
+    ],
+)
+def test_sort_stream_falls_back(text: str) -> None:
+    """Documents that cannot be split are sorted as a whole."""
+    try:
+        expected = TomlSort(text).sorted()
+    except Exception as error:  # pylint: disable=broad-except
+        with pytest.raises(type(error)):
+            stream_sorted(text, memory_budget=1)
+    else:
+        assert stream_sorted(text, memory_budget=1) == expected
+        assert stream_sorted(text, seekable=False, memory_budget=1) == expected
+
+
+def test_scan_lines() -> None:
+    """Values spanning several lines are one logical line."""
+    text = (
+        "# comment\n"
+        "\n"
+        "[a.'b.c']\n"
+        'x = """\n'
+        "[not.a.table]\n"
+        '"""\n'
+        "y = [\n"
+        "  1, # ]\n"
+        "  '[',\n"
+        "]\n"
+        '[[ "d\\u0065" ]] # note\n'
+        "z = { a = 1 }\n"
+    )
+    lines = list(scan_lines(text.splitlines(keepends=True)))
+    assert [(line.kind, line.lineno, line.keys) for line in lines] == [
+        (COMMENT, 1, None),
+        (BLANK, 2, None),
+        (TABLE, 3, ("a", "b.c")),
+        (KEYVALUE, 4, ("x",)),
+        (KEYVALUE, 7, ("y",)),
+        (AOT, 11, ("de",)),
+        (KEYVALUE, 12, ("z",)),
+    ]
+    assert "".join(line.text for line in lines) == text
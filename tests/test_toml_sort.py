@@ -2,17 +2,25 @@
 
 from __future__ import annotations
 
+import io
+import sys
 from pathlib import Path
 from typing import Any, Callable, Dict, List
+from unittest import mock
 
 import pytest
+import tomlkit
+from tomlkit.items import SingleKey
 
-from toml_sort import TomlSort
+from toml_sort import TomlSort, TomlSorter
 from toml_sort.tomlsort import (
     CommentConfiguration,
     FormattingConfiguration,
     SortConfiguration,
     SortOverrideConfiguration,
+    SortPlan,
+    TomlSortKeys,
+    has_newline,
 )
 
 
@@ -178,3 +186,237 @@ def test_tomlsort(
 
     assert sort_output == toml_sorted_fixture
     assert TomlSort(sort_output, **args).sorted() == sort_output
+
+
+def test_sort_plan() -> None:
+    """Overrides resolve exact matches first, then the first glob."""
+    base = SortConfiguration(table_keys=True, first=["a"])
+    overrides = {
+        "servers.*": SortOverrideConfiguration(table_keys=False),
+        "servers.beta": SortOverrideConfiguration(inline_arrays=True),
+        "*": SortOverrideConfiguration(first=["z"]),
+    }
+    plan = SortPlan(base, overrides)
+
+    assert plan.resolve(None) is base
+    assert plan.find_pattern("servers.beta") == "servers.beta"
+    assert plan.find_pattern("servers.alpha") == "servers.*"
+    assert plan.find_pattern("clients") == "*"
+
+    beta = plan.resolve("servers.beta")
+    assert beta == SortConfiguration(table_keys=True, inline_arrays=True)
+    alpha = plan.resolve("servers.alpha")
+    assert alpha == SortConfiguration(table_keys=False)
+    assert plan.resolve("clients") == SortConfiguration(first=["z"])
+
+    # Merged configurations are memoized and shared between matching paths
+    assert plan.resolve("servers.alpha") is alpha
+    assert plan.resolve("servers.gamma") is alpha
+    assert alpha.first is not overrides["servers.*"].first
+    assert base == SortConfiguration(table_keys=True, first=["a"])
+
+    # The memo of paths is bounded, and still resolves paths once cleared
+    for index in range(SortPlan.RESOLVED_SIZE * 2):
+        assert plan.resolve(f"servers.s{index}") is alpha
+    assert len(plan._resolved) <= SortPlan.RESOLVED_SIZE  # pylint: disable=protected-access
+
+
+def test_sort_keys_first_and_ignore_case() -> None:
+    """Keys in first lead in their given order, the rest sort by key."""
+    toml = "D = 1\nb = 2\nc = 3\na = 4\nB = 5\n"
+    sort_config = SortConfiguration(ignore_case=True, first=["c", "D", "c"])
+    sorted_toml = TomlSort(toml, sort_config=sort_config).sorted()
+    assert sorted_toml == "c = 3\nD = 1\na = 4\nb = 2\nB = 5\n"
+
+
+@pytest.mark.parametrize("table_keys", [True, False])
+def test_write(table_keys: bool, get_fixture: Callable[[str], Path]) -> None:
+    """Output written in chunks is the same as the sorted string."""
+    text = get_fixture("from-toml-lang").read_text(encoding="utf-8")
+    sorter = TomlSort(text, sort_config=SortConfiguration(table_keys=table_keys))
+    output = io.StringIO()
+    sorter.write(output)
+    assert output.getvalue() == sorter.sorted()
+
+
+def test_sorted_chunks_raises_early() -> None:
+    """Invalid TOML fails before any chunk is produced."""
+    with pytest.raises(tomlkit.exceptions.ParseError):
+        TomlSort("[a]\nb = \n").sorted_chunks()
+
+
+@pytest.mark.parametrize("table_keys", [True, False])
+def test_sorter_reused(table_keys: bool, get_fixture: Callable[[str], Path]) -> None:
+    """One TomlSorter sorts many documents like a TomlSort for each."""
+    args: Dict[str, Any] = {
+        "sort_config": SortConfiguration(table_keys=table_keys),
+        "sort_config_overrides": {"servers.*": SortOverrideConfiguration(first=["ip"])},
+    }
+    documents = [
+        get_fixture(name).read_text(encoding="utf-8")
+        for name in ("from-toml-lang", "comment", "inline", "from-toml-lang")
+    ]
+    sorter = TomlSorter(**args)
+    expected = [TomlSort(document, **args).sorted() for document in documents]
+    assert [sorter.sort(document) for document in documents] == expected
+    assert list(sorter.sort_many(documents)) == expected
+    for document, sorted_document in zip(documents, expected):
+        assert (sorter.check(document) is None) == (document == sorted_document)
+        assert sorter.check(sorted_document) is None
+
+
+def test_sorter_sort_many_lazy() -> None:
+    """Documents are sorted as they are consumed."""
+    sorted_documents = TomlSorter().sort_many(iter(["b = 1\na = 2\n", "[a]\nb = \n"]))
+    assert next(sorted_documents) == "a = 2\nb = 1\n"
+    with pytest.raises(tomlkit.exceptions.ParseError):
+        next(sorted_documents)
+
+
+def test_sorter_check() -> None:
+    """check() reports where a document first differs from its sorted form."""
+    violation = TomlSorter().check("[b]\n\n[a]\n")
+    assert violation is not None
+    assert (violation.line, violation.column) == (3, 1)
+
+
+def test_sort_keys_paths() -> None:
+    """Key paths share their parents, and give the same keys either way."""
+    first, second, third = (SingleKey(name) for name in ("a", "b", "c"))
+    path = TomlSortKeys(first) + second + TomlSortKeys(third)
+    assert path.as_string() == "a.b.c"
+    assert path.keys == [first, second, third]
+    assert path.base is third
+    assert path.parent is not None and path.parent.as_string() == "a.b"
+    assert TomlSortKeys([first, second, third]).as_string() == "a.b.c"
+    assert repr(path) == "<TomlSortKeys: a.b.c>"
+    path.base = SingleKey("d")
+    assert path.as_string() == "a.b.d"
+    # The keys are kept, and changing them changes the path
+    keys = [first, second]
+    listed = TomlSortKeys(keys)
+    assert listed.keys is keys
+    assert path.keys is path.keys
+    path.keys.append(SingleKey("e"))
+    assert path.as_string() == "a.b.d.e"
+    assert path.base.key == "e"
+    path.base = SingleKey("f")
+    assert path.keys[-1].key == "f"
+    assert (path + SingleKey("g")).as_string() == "a.b.d.f.g"
+
+
+def test_sort_keys_overrides() -> None:
+    """Overrides apply to inline tables nested under a path."""
+    sorter = TomlSorter(
+        sort_config=SortConfiguration(inline_tables=False),
+        sort_config_overrides={"a.b.c": SortOverrideConfiguration(inline_tables=True)},
+    )
+    assert (
+        sorter.sort("[a]\nb = {z = 1, c = {y = 1, x = 2}}\n")
+        == "[a]\nb = {z = 1, c = {x = 2, y = 1}}\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "[1, 2]",
+        "[\n  1,\n  2\n]",
+        "[1, # comment\n 2]",
+        "[[1, [2, 3]], {a = [4]}]",
+        "[[1, [2,\n 3]], 4]",
+        "[{a = [1,\n 2]}]",
+        "{a = 1, b = {c = [2]}}",
+        "{a = [1, {b = '''x\ny'''}]}",
+        '["""x\ny"""]',
+        "[]",
+    ],
+)
+def test_has_newline(value: str) -> None:
+    """Newlines are found without serializing, as they are by serializing."""
+    item = tomlkit.parse(f"key = {value}\n")["key"]
+    assert has_newline(item) is ("\n" in item.as_string())
+
+
+def test_sort_array_single_line() -> None:
+    """Arrays in single line arrays are not scanned again."""
+    sorter = TomlSorter(sort_config=SortConfiguration(inline_arrays=True))
+    with mock.patch("toml_sort.tomlsort.has_newline", side_effect=has_newline) as scan:
+        sorted_toml = sorter.sort("key = [[[[[1, 2], 3]]], [[0]]]\n")
+    assert scan.call_count == 1
+    assert sorted_toml == "key = [[[0]], [[[3, [1, 2]]]]]\n"
+
+
+def test_sort_deep_nesting() -> None:
+    """Nesting deeper than the recursion limit is sorted without recursion.
+
+    tomlkit parses and serializes recursively, so only sorting runs
+    under the default limit.
+    """
+    depth = 2 * sys.getrecursionlimit()
+    array = "[" * depth + "1" + "".join(f", {level % 3}]" for level in range(depth))
+    expected_array = "[0, 1]"
+    for level in range(1, depth):
+        expected_array = f"[{level % 3}, {expected_array}]"
+    text = f"[t]\nz = {array}\n{'a.' * depth}x = 1\n"
+    sorter = TomlSorter(sort_config=SortConfiguration(inline_arrays=True))
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10 * depth)
+    try:
+        document = tomlkit.parse(text)
+        sys.setrecursionlimit(limit)
+        sorted_document = sorter.toml_doc_sorted(document)
+        sys.setrecursionlimit(10 * depth)
+        sorted_toml = tomlkit.dumps(sorted_document)
+    finally:
+        sys.setrecursionlimit(limit)
+    assert sorted_toml == f"\n\n[t]\nz = {expected_array}\n{'a.' * depth}x = 1\n"
+
+
+AOT_UNSORTED = """\
+[[package]]
+name = "b"
+version = "2"
+
+# The first table
+[[package]]
+name = "b"
+version = "10"
+
+[[package]]
+version = "0"
+
+[[package]]
+name = "A"
+version = "1"
+
+[package.dependencies]
+x = "1"
+
+[[package]]
+name = 3
+"""
+
+
+def test_sort_aot_keys() -> None:
+    """Tables of arrays of tables are ordered by the values of keys."""
+    sort_config = SortConfiguration(table_keys=False, aot_sort_keys=["name", "version"])
+    sorted_toml = TomlSorter(sort_config=sort_config).sort(AOT_UNSORTED)
+    assert sorted_toml == (
+        '[[package]]\nname = 3\n\n[[package]]\nname = "A"\nversion = "1"\n\n'
+        '[package.dependencies]\nx = "1"\n\n'
+        '# The first table\n[[package]]\nname = "b"\nversion = "10"\n\n'
+        '[[package]]\nname = "b"\nversion = "2"\n\n'
+        '[[package]]\nversion = "0"\n'
+    )
+    # Overrides choose the keys of one array
+    sorter = TomlSorter(
+        sort_config=SortConfiguration(table_keys=False, ignore_case=True),
+        sort_config_overrides={
+            "package": SortOverrideConfiguration(aot_sort_keys=["version"])
+        },
+    )
+    assert [
+        table.get("version")
+        for table in tomlkit.parse(sorter.sort(AOT_UNSORTED))["package"]
+    ] == ["0", "1", "10", "2", None]
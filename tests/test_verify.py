@@ -0,0 +1,183 @@
+"""Test the toml_sort.verify module."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict
+from unittest import mock
+
+import pytest
+
+from toml_sort import TomlSort
+from toml_sort.tomlsort import (
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+)
+from toml_sort.verify import SortVerifier, Violation, first_difference
+
+EXAMPLES = sorted(
+    str(path.relative_to(Path(__file__).parent / "examples"))
+    for path in (Path(__file__).parent / "examples").glob("**/*.toml")
+)
+
+# Dotted keys and inline tables spanning lines are checked by sorting
+SORTED_BY_FALLBACK = (
+    "dotted-key",
+    "gradle-version-catalog",
+    "inline",
+    "sorted/dotted-key",
+    "sorted/gradle-version-catalog",
+    "sorted/inline",
+)
+
+CONFIGS = [
+    {},
+    {"comment_config": CommentConfiguration(header=False, footer=False)},
+    {
+        "comment_config": CommentConfiguration(
+            header=False, footer=False, block=False, inline=False
+        )
+    },
+    {"sort_config": SortConfiguration(tables=False)},
+    {
+        "sort_config": SortConfiguration(
+            table_keys=False, inline_tables=True, inline_arrays=True
+        )
+    },
+    {
+        "sort_config": SortConfiguration(ignore_case=True, first=["servers"]),
+        "sort_config_overrides": {
+            "servers.*": SortOverrideConfiguration(first=["ip"]),
+            "clients": SortOverrideConfiguration(table_keys=False),
+        },
+    },
+    {
+        "format_config": FormattingConfiguration(
+            spaces_before_inline_comment=1,
+            spaces_indent_inline_array=4,
+            trailing_comma_inline_array=True,
+        )
+    },
+    {"sort_config": SortConfiguration(aot_sort_keys=["name", "sku"])},
+]
+
+
+@pytest.mark.parametrize("args", CONFIGS)
+@pytest.mark.parametrize("example", EXAMPLES)
+def test_verify_matches_compare(
+    example: str, args: Dict[str, Any], fixture_path: Path
+) -> None:
+    """The verdict is the same as comparing with the sorted output."""
+    text = (fixture_path / example).read_text(encoding="utf-8")
+    verifier = SortVerifier(**args)
+    try:
+        sorted_text = TomlSort(text, **args).sorted()
+    except Exception as error:  # pylint: disable=broad-except
+        with pytest.raises(type(error)):
+            verifier.verify(text)
+        return
+    assert (verifier.verify(text) is None) == (text == sorted_text)
+    with mock.patch("toml_sort.tomlsort.TomlSort", side_effect=AssertionError):
+        assert not verifier.proves_sorted(text) or text == sorted_text
+    # Sorted output is recognized without sorting it again
+    with mock.patch("toml_sort.tomlsort.TomlSort", side_effect=AssertionError):
+        if not example.startswith(SORTED_BY_FALLBACK) and sorted_text.strip():
+            assert verifier.verify(sorted_text) is None
+
+
+@pytest.mark.parametrize(
+    "text,args,expected",
+    [
+        ("b = 1\na = 2\n", {}, Violation(2, 1, "key 'a' should come before 'b'")),
+        ("b = 1\na = 2\n", {"sort_config": SortConfiguration(table_keys=False)}, None),
+        (
+            "[b]\nx = 1\n\n[a]\n",
+            {},
+            Violation(4, 1, "table 'a' should come before 'b'"),
+        ),
+        ("[a]\nx  = 1\n", {}, Violation(2, 3, "line is not formatted")),
+        ("[a]\nx = [1,2]\n", {}, Violation(2, 8, "line is not formatted")),
+        ("x = 1\n[a]\n", {}, Violation(2, 1, "expected a blank line")),
+        ("[a]\n\nx = 1\n", {}, Violation(2, 1, "unexpected blank line")),
+        ("x = 1 # note\n", {}, Violation(1, 7, "line is not formatted")),
+        (
+            "x = 1\n# note\n\ny = 2\n",
+            {},
+            Violation(2, 1, "comment is not attached to anything"),
+        ),
+        ("x = 1", {}, Violation(1, 6, "no newline at end of file")),
+        (
+            "[[a]]\nx = 2\n\n[[a]]\nx = 1\n",
+            {"sort_config": SortConfiguration(aot_sort_keys=["x"])},
+            Violation(4, 1, "table of 'a' should come before the one at line 1"),
+        ),
+        # Dotted keys are checked by sorting
+        ("b.x = 1\na = 2\n", {}, Violation(1, 1, "differs from sorted output")),
+        # TomlSort drops the comments of an array of tables in a table
+        # without keys
+        (
+            "[a]\n\n# note\n[[a.b]]\nx = 1\n",
+            {},
+            Violation(3, 1, "differs from sorted output"),
+        ),
+    ],
+)
+def test_verify_violation(
+    text: str, args: Dict[str, Any], expected: Violation | None
+) -> None:
+    """Violations point at the first line that is out of place."""
+    assert SortVerifier(**args).verify(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[[B.s]]\nz = 0\nc = 1\n",
+        "[[a.b]]\nz = 0\nc = 1\n\n[a.b.t]\nz = 1\ny = 2\n",
+        "[[a.b]]\nz = 2\n\n[[a.b]]\nz = 1\n\n[[a.b.s]]\nz = 0\nc = [2, 1]\n",
+    ],
+)
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"*.s": SortOverrideConfiguration(table_keys=True)},
+        {"B.s": SortOverrideConfiguration(table_keys=True)},
+        {"s": SortOverrideConfiguration(table_keys=True, inline_arrays=True)},
+        {"a.b": SortOverrideConfiguration(table_keys=True, aot_sort_keys=["z"])},
+        {"b": SortOverrideConfiguration(table_keys=True, aot_sort_keys=["z"])},
+        {"b.*": SortOverrideConfiguration(table_keys=True)},
+    ],
+)
+def test_verify_overrides_in_array_of_tables(
+    text: str, overrides: Dict[str, SortOverrideConfiguration]
+) -> None:
+    """Overrides apply in arrays of tables by the same keys as in TomlSort."""
+    args: Dict[str, Any] = {
+        "sort_config": SortConfiguration(table_keys=False),
+        "sort_config_overrides": overrides,
+    }
+    sorted_text = TomlSort(text, **args).sorted()
+    assert (SortVerifier(**args).verify(text) is None) == (text == sorted_text)
+    assert SortVerifier(**args).verify(sorted_text) is None
+
+
+def test_verify_sort_error() -> None:
+    """Keys that TomlSort cannot sort fail as they do when sorting."""
+    text = "[a.b]\n[a.x]\n[a]\nx = 1\n"
+    with pytest.raises(Exception) as error:
+        TomlSort(text).sorted()
+    with pytest.raises(type(error.value)):
+        SortVerifier().verify(text)
+
+
+def test_first_difference() -> None:
+    """Positions are 1-based lines and columns."""
+    assert first_difference("a\nbc\n", "a\nbc\n") is None
+    assert first_difference("a\nbc\n", "a\nbd\n") == Violation(
+        2, 2, "differs from sorted output"
+    )
+    assert first_difference("a\n", "a\nb\n") == Violation(
+        2, 1, "differs from sorted output"
+    )
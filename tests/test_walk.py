@@ -0,0 +1,221 @@
+"""Test the toml_sort.walk module and directory FILENAME args."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List
+from unittest import mock
+
+import pytest
+
+from toml_sort import cli
+from toml_sort.walk import GitIgnore, compile_globs, walk
+
+SORTED = "[a]\nx = 1\n\n[b]\ny = 2\n"
+UNSORTED = "[b]\ny = 2\n\n[a]\nx = 1\n"
+
+
+def write(root: Path, files: Dict[str, str]) -> None:
+    """Write files relative to root."""
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content, encoding="utf-8")
+
+
+def found(directory: Path, **globs: List[str]) -> List[str]:
+    """Paths found by walk, relative to directory."""
+    patterns = {name: compile_globs(value) for name, value in globs.items()}
+    return [
+        Path(path).relative_to(directory).as_posix()
+        for path in walk(str(directory), **patterns)
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern,path,is_directory,expected",
+    [
+        ("target/", "target", True, True),
+        ("target/", "target", False, False),
+        ("target", "crates/a/target", True, True),
+        ("/target", "crates/target", True, False),
+        ("crates/*.toml", "crates/a.toml", False, True),
+        ("crates/*.toml", "crates/a/b.toml", False, False),
+        ("crates/*.toml", "other/crates/a.toml", False, False),
+        ("**/build", "a/b/build", True, True),
+        ("a/**/b.toml", "a/b.toml", False, True),
+        ("a/**/b.toml", "a/x/y/b.toml", False, True),
+        ("a/**", "a/x/y.toml", False, True),
+        ("*.t?ml", "dir/x.toml", False, True),
+        ("[!a]*.toml", "a.toml", False, False),
+        ("[!a]*.toml", "b.toml", False, True),
+        ("\\#x.toml", "#x.toml", False, True),
+        ("# comment", "# comment", False, False),
+    ],
+)
+def test_gitignore_patterns(
+    tmp_path: Path, pattern: str, path: str, is_directory: bool, expected: bool
+) -> None:
+    """Patterns match like they do in git."""
+    write(tmp_path, {".gitignore": pattern + "\n"})
+    ignore = GitIgnore().enter(str(tmp_path), "")
+    assert ignore.ignores(path, is_directory) is expected
+
+
+def test_gitignore_order(tmp_path: Path) -> None:
+    """The last rule that matches wins, and deeper files win."""
+    write(
+        tmp_path,
+        {".gitignore": "*.toml\n!keep.toml\n", "sub/.gitignore": "keep.toml\n"},
+    )
+    ignore = GitIgnore().enter(str(tmp_path), "")
+    assert ignore.ignores("a.toml", False)
+    assert not ignore.ignores("keep.toml", False)
+    sub = ignore.enter(str(tmp_path / "sub"), "sub")
+    assert sub.ignores("sub/keep.toml", False)
+    assert not sub.ignores("keep.toml", False)
+
+
+def test_walk(tmp_path: Path) -> None:
+    """TOML files are found in sorted order, without the lock files."""
+    write(
+        tmp_path,
+        {
+            "b.toml": "",
+            "a/pyproject.toml": "",
+            "a/Pipfile": "",
+            "a/poetry.lock": "",
+            "a/Cargo.lock": "",
+            "a/notes.txt": "",
+            ".cargo/config.toml": "",
+            ".git/config.toml": "",
+        },
+    )
+    assert found(tmp_path) == [
+        ".cargo/config.toml",
+        "a/Pipfile",
+        "a/pyproject.toml",
+        "b.toml",
+    ]
+    assert found(tmp_path, include=["*.lock"], exclude=["a/C*"]) == ["a/poetry.lock"]
+    assert found(tmp_path, exclude=["a", ".*"]) == ["b.toml"]
+    assert found(tmp_path, include=[]) == []
+
+
+def test_walk_prunes_ignored(tmp_path: Path) -> None:
+    """Ignored directories are never entered."""
+    write(
+        tmp_path,
+        {
+            ".gitignore": "node_modules/\n",
+            "crate/.gitignore": "/target\n",
+            "crate/Cargo.toml": "",
+            "crate/target/debug/build.toml": "",
+            "crate/src/target/kept.toml": "",
+            "node_modules/package/x.toml": "",
+        },
+    )
+    scanned: List[str] = []
+    scandir = os.scandir
+
+    def recording_scandir(path: str) -> Iterator[os.DirEntry[str]]:
+        scanned.append(Path(path).relative_to(tmp_path).as_posix())
+        return scandir(path)
+
+    with mock.patch("os.scandir", recording_scandir):
+        assert found(tmp_path) == ["crate/Cargo.toml", "crate/src/target/kept.toml"]
+    assert scanned == [".", "crate", "crate/src", "crate/src/target"]
+
+
+def test_walk_reads_parent_ignores(tmp_path: Path) -> None:
+    """The rules of directories above the one walked apply in a repository."""
+    write(
+        tmp_path,
+        {
+            ".gitignore": "sub/generated/\n",
+            ".git/info/exclude": "local.toml\n",
+            "sub/generated/x.toml": "",
+            "sub/local.toml": "",
+            "sub/kept.toml": "",
+        },
+    )
+    assert found(tmp_path / "sub") == ["kept.toml"]
+    # Outside a repository, only the directory walked has rules
+    os.remove(tmp_path / ".git" / "info" / "exclude")
+    os.rmdir(tmp_path / ".git" / "info")
+    os.rmdir(tmp_path / ".git")
+    assert found(tmp_path / "sub") == ["generated/x.toml", "kept.toml", "local.toml"]
+
+
+def test_cli_directories(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Directories are checked or sorted with the files found in them."""
+    monkeypatch.chdir(tmp_path)
+    write(
+        tmp_path,
+        {
+            "sorted.toml": SORTED,
+            "sub/unsorted.toml": UNSORTED,
+            "sub/vendor/unsorted.toml": UNSORTED,
+            "sub/poetry.lock": UNSORTED,
+        },
+    )
+    with pytest.raises(SystemExit) as error:
+        cli.cli(["--check", ".", "sorted.toml"])
+    assert error.value.code == 1
+    assert capsys.readouterr().err.splitlines()[1:] == [
+        f"  - {os.path.join('.', 'sub', 'unsorted.toml')}:4:1: table 'a' should come before 'b'",
+        (
+            f"  - {os.path.join('.', 'sub', 'vendor', 'unsorted.toml')}:4:1: "
+            "table 'a' should come before 'b'"
+        ),
+    ]
+    # --exclude replaces the default globs
+    cli.cli(["--in-place", "--exclude", "vendor,*.lock", "sub"])
+    assert (tmp_path / "sub/unsorted.toml").read_text(encoding="utf-8") == SORTED
+    assert (tmp_path / "sub/poetry.lock").read_text(encoding="utf-8") == UNSORTED
+    assert (tmp_path / "sub/vendor/unsorted.toml").read_text(
+        encoding="utf-8"
+    ) == UNSORTED
+    capsys.readouterr()
+    with pytest.raises(SystemExit):
+        cli.cli(["--check", "--jobs", "2", "--include", "*.toml,*.lock", "sub"])
+    # The lock file is still excluded
+    assert capsys.readouterr().err.splitlines()[1:] == [
+        (
+            f"  - {os.path.join('sub', 'vendor', 'unsorted.toml')}:4:1: "
+            "table 'a' should come before 'b'"
+        ),
+    ]
+
+
+def test_cli_directory_usage(tmp_path: Path) -> None:
+    """Directories need --check or --in-place, and no --output."""
+    for arguments in ([str(tmp_path)], ["--check", "-o", "out", str(tmp_path)]):
+        with pytest.raises(SystemExit) as error:
+            cli.cli(arguments)
+        assert error.value.code == 1
+
+
+def test_cli_streams_files(tmp_path: Path) -> None:
+    """Files are processed while the directory is still being walked."""
+    events: List[str] = []
+
+    def recording_walk(directory: str, *_: object) -> Iterator[str]:
+        for name in ("a.toml", "b.toml"):
+            events.append(f"found {name}")
+            yield os.path.join(directory, name)
+
+    def recording_process_file(filename: str, _: object) -> None:
+        events.append(f"processed {os.path.basename(filename)}")
+
+    with mock.patch("toml_sort.walk.walk", recording_walk):
+        with mock.patch("toml_sort.cli.process_file", recording_process_file):
+            cli.cli(["--check", str(tmp_path)])
+    assert events == [
+        "found a.toml",
+        "processed a.toml",
+        "found b.toml",
+        "processed b.toml",
+    ]
@@ -3,6 +3,18 @@
 A library to easily sort toml files.
 """
 
-from .tomlsort import TomlSort
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["TomlSort"]
+if TYPE_CHECKING:
+    from .tomlsort import TomlSort, TomlSorter
+
+__all__ = ["TomlSort", "TomlSorter"]
+
+
+def __getattr__(name: str) -> Any:
+    # The sorters import tomlkit, which the command line often does not need
+    if name in __all__:
+        from . import tomlsort  # pylint: disable=import-outside-toplevel
+
+        return getattr(tomlsort, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
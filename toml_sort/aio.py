@@ -0,0 +1,185 @@
+"""Sort and check files from asyncio code.
+
+Reading and writing files runs on the default executor of the event
+loop, and sorting and checking run on the executor given, so that
+neither blocks the event loop. A process pool executor lets files be
+sorted in parallel, at the cost of sending the sorter to the workers
+for each file. The *_paths functions process files with bounded
+concurrency and yield results in the order files finish. Leaving the
+iteration early cancels the files still in progress.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .tomlsort import TomlSorter
+from .verify import Violation, first_difference
+
+__all__ = [
+    "FileResult",
+    "async_check_file",
+    "async_check_paths",
+    "async_sort_file",
+    "async_sort_paths",
+]
+
+ENCODING = "UTF-8"
+DEFAULT_CONCURRENCY = 8
+
+
+@dataclass
+class FileResult:
+    """The outcome of checking or sorting one file.
+
+    violation is where the file first differs from its sorted form, or
+    None if it is already sorted. sorted_toml is the sorted text when a
+    file was sorted without writing it back. error is the exception
+    raised for the file by the *_paths functions, which keep going.
+    """
+
+    path: str
+    violation: Optional[Violation] = None
+    sorted_toml: Optional[str] = None
+    error: Optional[Exception] = None
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding=ENCODING) as fileobj:
+        return fileobj.read()
+
+
+def _write(path: str, content: str) -> None:
+    with open(path, "w", encoding=ENCODING) as fileobj:
+        fileobj.write(content)
+
+
+async def async_check_file(
+    path: str,
+    sorter: Optional[TomlSorter] = None,
+    executor: Optional[Executor] = None,
+) -> FileResult:
+    """Check whether a file is sorted, without sorting it if it is."""
+    sorter = sorter or TomlSorter()
+    loop = asyncio.get_running_loop()
+    text = await loop.run_in_executor(None, _read, path)
+    violation = await loop.run_in_executor(executor, sorter.check, text)
+    return FileResult(path, violation)
+
+
+async def async_sort_file(
+    path: str,
+    sorter: Optional[TomlSorter] = None,
+    in_place: bool = False,
+    executor: Optional[Executor] = None,
+) -> FileResult:
+    """Sort a file, writing it back if in_place and it was not sorted.
+
+    Files proven sorted by the verifier of sorter are never sorted, and
+    other files are sorted once, their violation being the first
+    difference with the sorted output.
+    """
+    sorter = sorter or TomlSorter()
+    loop = asyncio.get_running_loop()
+    text = await loop.run_in_executor(None, _read, path)
+    violation, sorted_toml = await loop.run_in_executor(
+        executor, _sort_unless_sorted, sorter, text
+    )
+    if violation is None:
+        return FileResult(path, None, None if in_place else text)
+    if not in_place:
+        return FileResult(path, violation, sorted_toml)
+    await loop.run_in_executor(None, _write, path, sorted_toml)
+    return FileResult(path, violation)
+
+
+def _sort_unless_sorted(
+    sorter: TomlSorter, text: str
+) -> Tuple[Optional[Violation], str]:
+    """The first difference of text with its sorted form, and that form.
+
+    Checking a file with a violation would parse it with tomlkit, and
+    sorting it would then parse it again, so files are sorted unless the
+    verifier proves them sorted without tomlkit.
+    """
+    if sorter.verifier.proves_sorted(text):
+        return None, text
+    sorted_toml = sorter.sort(text)
+    return first_difference(text, sorted_toml), sorted_toml
+
+
+async def _stream(
+    paths: Iterable[str],
+    process: Callable[[str], Awaitable[FileResult]],
+    concurrency: int,
+) -> AsyncIterator[FileResult]:
+    """Process paths, at most concurrency at a time, as they finish."""
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, not {concurrency}")
+
+    async def guarded(path: str) -> FileResult:
+        try:
+            return await process(path)
+        except Exception as error:  # pylint: disable=broad-except
+            return FileResult(path, error=error)
+
+    remaining = iter(paths)
+    pending: Set[asyncio.Future[FileResult]] = set()
+    try:
+        while True:
+            for path in itertools.islice(remaining, concurrency - len(pending)):
+                pending.add(asyncio.ensure_future(guarded(path)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def async_check_paths(
+    paths: Iterable[str],
+    sorter: Optional[TomlSorter] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[FileResult]:
+    """Check files, yielding a result for each as it finishes."""
+    checker = sorter or TomlSorter()
+    return _stream(
+        paths,
+        lambda path: async_check_file(path, checker, executor),
+        concurrency,
+    )
+
+
+def async_sort_paths(
+    paths: Iterable[str],
+    sorter: Optional[TomlSorter] = None,
+    in_place: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[FileResult]:
+    """Sort files, yielding a result for each as it finishes."""
+    shared = sorter or TomlSorter()
+    return _stream(
+        paths,
+        lambda path: async_sort_file(path, shared, in_place, executor),
+        concurrency,
+    )
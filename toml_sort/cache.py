@@ -0,0 +1,230 @@
+"""Persistent cache of files that are known to be sorted.
+
+The cache is a directory of small entry files, so that several toml-sort
+processes can share it without any locking:
+
+- content entries are keyed by the hash of a file's contents and mark that
+  those contents are already sorted.
+- stat entries are keyed by a file's path and record the mtime, size and
+  content hash of a file that was sorted when it was last seen, which lets
+  us skip reading and hashing files that have not been touched.
+
+Every key also includes a fingerprint of the sort configuration and the
+toml-sort and tomlkit versions, so changing either never reuses a stale
+verdict. Entries are written atomically with os.replace and a missing or
+unreadable entry is simply a cache miss.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+__all__ = ["ResultCache", "config_fingerprint"]
+
+CACHE_VERSION = "1"
+DEFAULT_MAX_ENTRIES = 50_000
+
+# Files modified this recently may be modified again within the same mtime
+# tick without changing size, so their stat is not trusted for the fast path.
+RACY_MTIME_NS = 2_000_000_000
+
+_TEMP_PREFIX = "tmp"
+
+
+def _package_version(name: str) -> str:
+    """Version of an installed distribution, or 'unknown'."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _hash(*parts: str) -> str:
+    """Hex digest of the given string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ContentHash:
+    """content_hash of contents that are produced in chunks."""
+
+    def __init__(self) -> None:
+        self._digest = hashlib.sha256()
+
+    def update(self, chunk: str) -> None:
+        """Add the next chunk of the contents."""
+        self._digest.update(chunk.encode("utf-8"))
+
+    def hexdigest(self) -> str:
+        """The hash of the contents so far."""
+        return self._digest.hexdigest()
+
+
+def content_hash(content: str) -> str:
+    """Hash of a file's contents, as used in cache keys."""
+    digest = ContentHash()
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def config_fingerprint(
+    *configs: Any, overrides: Optional[Dict[str, Any]] = None
+) -> str:
+    """Fingerprint configuration dataclasses and the library versions.
+
+    Two runs only share cache entries if their fingerprints are equal.
+    """
+    payload = {
+        "cache": CACHE_VERSION,
+        "toml-sort": _package_version("toml-sort"),
+        "tomlkit": _package_version("tomlkit"),
+        "configs": [
+            [type(config).__name__, dataclasses.asdict(config)] for config in configs
+        ],
+        "overrides": {
+            key: dataclasses.asdict(value)
+            for key, value in sorted((overrides or {}).items())
+        },
+    }
+    return _hash(json.dumps(payload, sort_keys=True))
+
+
+class ResultCache:
+    """Directory backed cache of 'already sorted' verdicts."""
+
+    def __init__(
+        self,
+        directory: str,
+        fingerprint: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+
+    def _entry_path(self, kind: str, value: str) -> str:
+        return os.path.join(self.directory, _hash(kind, self.fingerprint, value))
+
+    def _write_entry(self, path: str, content: str) -> None:
+        """Atomically write an entry, ignoring failures."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=_TEMP_PREFIX, dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fileobj:
+                fileobj.write(content)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _stat_signature(stat: os.stat_result) -> str:
+        return f"{stat.st_mtime_ns} {stat.st_size}"
+
+    def is_sorted_path(self, path: str) -> bool:
+        """Stat fast path: True if path is unchanged since it was sorted."""
+        entry_path = self._entry_path("stat", os.path.abspath(path))
+        try:
+            stat = os.stat(path)
+            with open(entry_path, encoding="utf-8") as fileobj:
+                signature = fileobj.read()
+        except OSError:
+            return False
+        if not signature.startswith(self._stat_signature(stat) + " "):
+            return False
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return True
+
+    def is_sorted_content(
+        self, content: Optional[str] = None, key: Optional[str] = None
+    ) -> bool:
+        """True if content is known to be sorted.
+
+        key defaults to the hash of content; callers that already know a
+        stable identifier for the content (a git blob id, say) can pass it
+        instead, without reading the content.
+        """
+        if key is None:
+            assert content is not None
+            key = content_hash(content)
+        entry_path = self._entry_path("content", key)
+        try:
+            # Touch the entry so that eviction drops least recently used first
+            os.utime(entry_path)
+        except OSError:
+            return False
+        return True
+
+    def record_sorted(
+        self,
+        path: str,
+        content: Optional[str] = None,
+        stat: Optional[os.stat_result] = None,
+        key: Optional[str] = None,
+    ) -> None:
+        """Record that path, whose contents are content, is sorted.
+
+        Either content or its key must be given. stat should be taken
+        before content was read; the stat entry is only written if the
+        file still has that stat, so a concurrent edit is never recorded
+        as sorted.
+        """
+        if key is None:
+            assert content is not None
+            key = content_hash(content)
+        self._write_entry(self._entry_path("content", key), "")
+        try:
+            current = os.stat(path)
+        except OSError:
+            return
+        if stat is not None and self._stat_signature(stat) != self._stat_signature(
+            current
+        ):
+            return
+        if time.time_ns() - current.st_mtime_ns < RACY_MTIME_NS:
+            return
+        self._write_entry(
+            self._entry_path("stat", os.path.abspath(path)),
+            f"{self._stat_signature(current)} {key}",
+        )
+
+    def prune(self) -> None:
+        """Evict the least recently used entries beyond max_entries."""
+        try:
+            with os.scandir(self.directory) as scan:
+                entries = [entry for entry in scan if entry.is_file()]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        dated = []
+        for entry in entries:
+            try:
+                dated.append((entry.stat().st_mtime_ns, entry.path))
+            except OSError:
+                continue
+        dated.sort()
+        for _, path in dated[: len(dated) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,26 +1,77 @@
 """Toml Sort command line interface."""
 
+from __future__ import annotations
+
 import argparse
+import collections
+import copy
 import dataclasses
+import io
+import itertools
+import os
+import shutil
+import socket
 import sys
-from argparse import ArgumentParser
-from typing import Any, Dict, List, Optional, Tuple, Type, cast
-
-import tomlkit
-from tomlkit import TOMLDocument
+import tempfile
+import time
+import traceback
+from argparse import ArgumentParser, Namespace
+from functools import partial
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
-from .tomlsort import (
+from .configuration import (
     CommentConfiguration,
     FormattingConfiguration,
     SortConfiguration,
     SortOverrideConfiguration,
-    TomlSort,
 )
+from .daemon import DEFAULT_IDLE_TIMEOUT, SOCKET_ENV, serve, socket_path
+from .report import FORMATS as REPORT_FORMATS
+from .report import (
+    PARSE_ERROR,
+    REWRITTEN,
+    SORTED,
+    WOULD_CHANGE,
+    FileReport,
+    Recorder,
+    document_shape,
+)
+from .verify import SortVerifier, Violation, first_difference
+
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .tomlsort import TomlSorter
+
+# tomlkit, TomlSort, the result cache, streaming, profiling and process
+# pools are imported where they are used, so that short runs (--version,
+# or --check on a sorted file) start quickly.
+# pylint: disable=import-outside-toplevel
 
 __all__ = ["cli"]
 
 STD_STREAM = "-"  # The standard stream
 ENCODING = "UTF-8"  # Currently, we only support UTF-8
+STREAM_CHUNKSIZE = 8  # Files sent to a worker at a time while walking
+
+R = TypeVar("R")
 
 
 def get_version() -> str:
@@ -45,11 +96,646 @@ def read_file(path: str) -> str:
 
 def write_file(path: str, content: str) -> None:
     """Write content to a path."""
+    write_chunks(path, [content])
+
+
+def write_chunks(path: str, chunks: Iterable[str]) -> None:
+    """Write chunks of content to a path as they are produced."""
     if path == STD_STREAM:
-        print(content, end="")
+        sys.stdout.writelines(chunks)
         return
     with open(path, "w", encoding=ENCODING) as fileobj:
-        fileobj.write(content)
+        fileobj.writelines(chunks)
+
+
+def _tee(chunks: Iterable[str], *consumers: Callable[[str], object]) -> Iterator[str]:
+    """Yield chunks, passing each one to consumers first."""
+    for chunk in chunks:
+        for consumer in consumers:
+            consumer(chunk)
+        yield chunk
+
+
+def parse_jobs(value: str) -> int:
+    """Parse the --jobs argument, resolving 'auto' to the CPU count."""
+    if value == "auto":
+        return os.cpu_count() or 1
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid value: '{value}' (expected a positive integer or 'auto')"
+        ) from None
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(
+            f"invalid value: '{value}' (expected a positive integer or 'auto')"
+        )
+    return jobs
+
+
+def parse_memory_budget(value: str) -> int:
+    """Parse the --memory-budget argument, in MiB."""
+    try:
+        budget = int(value)
+    except ValueError:
+        budget = 0
+    if budget < 1:
+        raise argparse.ArgumentTypeError(
+            f"invalid value: '{value}' (expected a positive number of MiB)"
+        )
+    return budget
+
+
+@dataclasses.dataclass
+class ProcessOptions:
+    """Everything a worker needs to process one file.
+
+    Kept picklable so that it can be shipped to worker processes when
+    running with --jobs.
+    """
+
+    comment_config: CommentConfiguration
+    sort_config: SortConfiguration
+    format_config: FormattingConfiguration
+    sort_config_overrides: Dict[str, SortOverrideConfiguration]
+    check: bool = False
+    in_place: bool = False
+    output: str = STD_STREAM
+    cache: Optional[ResultCache] = None
+    # Cache keys of files known without reading them, such as git blob ids
+    cache_keys: Dict[str, str] = dataclasses.field(default_factory=dict)
+    memory_budget: Optional[int] = None
+    _verifier: Optional[SortVerifier] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _sorter: Optional[TomlSorter] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def _configuration_key(self) -> str:
+        return repr(
+            (
+                self.comment_config,
+                self.sort_config,
+                self.format_config,
+                self.sort_config_overrides,
+            )
+        )
+
+    def verifier(self) -> SortVerifier:
+        """SortVerifier for these options, built once for all files."""
+        if self._verifier is None:
+            key = self._configuration_key()
+            verifier = _VERIFIERS.get(key)
+            if verifier is None:
+                verifier = SortVerifier(
+                    comment_config=self.comment_config,
+                    sort_config=self.sort_config,
+                    format_config=self.format_config,
+                    sort_config_overrides=self.sort_config_overrides,
+                )
+                _remember(_VERIFIERS, key, verifier)
+            self._verifier = verifier
+        return self._verifier
+
+    def sorter(self) -> TomlSorter:
+        """TomlSorter for these options, built once for all files."""
+        if self._sorter is None:
+            key = self._configuration_key()
+            sorter = _SORTERS.get(key)
+            if sorter is None:
+                from .tomlsort import TomlSorter
+
+                sorter = TomlSorter(
+                    comment_config=self.comment_config,
+                    sort_config=self.sort_config,
+                    format_config=self.format_config,
+                    sort_config_overrides=self.sort_config_overrides,
+                )
+                _remember(_SORTERS, key, sorter)
+            self._sorter = sorter
+        return self._sorter
+
+
+# Verifiers and sorters by the repr of their configuration, so that the
+# runs of a daemon, and the directories of a run that share a
+# configuration, keep the overrides they resolved warm
+_VERIFIERS: Dict[str, SortVerifier] = {}
+_SORTERS: Dict[str, TomlSorter] = {}
+_SORTERS_SIZE = 64
+
+
+def _remember(cache: Dict[str, Any], key: str, value: Any) -> None:
+    if len(cache) >= _SORTERS_SIZE:
+        cache.clear()
+    cache[key] = value
+
+
+class _CompareWriter:
+    """Compare chunks of output with the original text as they are written."""
+
+    def __init__(
+        self, original: IO[str], write: Optional[Callable[[str], object]] = None
+    ) -> None:
+        self.original = original
+        self.write_through = write
+        self.violation: Optional[Violation] = None
+        self.line = 1
+        self.column = 1
+
+    def write(self, chunk: str) -> None:
+        if self.write_through is not None:
+            self.write_through(chunk)
+        if self.violation is not None:
+            return
+        original = self.original.read(len(chunk))
+        difference = first_difference(original, chunk)
+        if difference is None:
+            self._advance(chunk)
+            return
+        column = difference.column
+        if difference.line == 1:
+            column += self.column - 1
+        self.violation = Violation(
+            self.line + difference.line - 1, column, difference.message
+        )
+
+    def _advance(self, text: str) -> None:
+        newlines = text.count("\n")
+        if newlines:
+            self.line += newlines
+            self.column = len(text) - text.rfind("\n")
+        else:
+            self.column += len(text)
+
+    def finish(self) -> Optional[Violation]:
+        """Return the first difference between the output and the original."""
+        if self.violation is None and self.original.read(1):
+            self.violation = Violation(
+                self.line, self.column, "differs from sorted output"
+            )
+        return self.violation
+
+
+def _sort_streaming(
+    path: str, target: str, options: ProcessOptions
+) -> Optional[Violation]:
+    """Stream path through sort_stream to target, comparing as it goes."""
+    from .stream import sort_stream
+
+    with open(path, "rb") as infile, open(path, encoding=ENCODING) as original:
+        sort = partial(
+            sort_stream,
+            infile,
+            comment_config=options.comment_config,
+            sort_config=options.sort_config,
+            format_config=options.format_config,
+            sort_config_overrides=options.sort_config_overrides,
+            memory_budget=(options.memory_budget or 0) * 1024 * 1024,
+        )
+        if options.check:
+            compare = _CompareWriter(original)
+            sort(compare.write)
+            return compare.finish()
+        if target == STD_STREAM:
+            compare = _CompareWriter(original, sys.stdout.write)
+            sort(compare.write)
+            return compare.finish()
+        # Write next to the target and move it into place at the end,
+        # which also makes it safe for the output to be the input file.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)))
+        try:
+            with open(fd, "w", encoding=ENCODING) as output:
+                compare = _CompareWriter(original, output.write)
+                sort(compare.write)
+            violation = compare.finish()
+            if options.in_place and violation is None:
+                os.remove(temp_path)
+                return None
+            if os.path.exists(target):
+                shutil.copymode(target, temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return violation
+
+
+def process_file_streaming(
+    filename: str, options: ProcessOptions
+) -> Optional[Violation]:
+    """Sort a single file within options.memory_budget.
+
+    Like process_file, but the file is never held in memory as a whole;
+    see toml_sort.stream. The result cache is not used.
+    """
+    target = filename if options.in_place else options.output
+    if filename != STD_STREAM:
+        return _sort_streaming(filename, target, options)
+    # Spill stdin to disk so that it can be read again for comparison
+    fd, temp_path = tempfile.mkstemp()
+    try:
+        with open(fd, "wb") as stdin_copy:
+            shutil.copyfileobj(sys.stdin.buffer, stdin_copy)
+        return _sort_streaming(temp_path, target, options)
+    finally:
+        os.remove(temp_path)
+
+
+def process_file(
+    filename: str, options: ProcessOptions, recorder: Optional[Recorder] = None
+) -> Optional[Violation]:
+    """Read, sort and check or write a single file.
+
+    Returns where the file first differs from its sorted form, or None
+    if it is already sorted. With --check, files are checked with
+    SortVerifier, so sorted files are never sorted, and with --in-place,
+    files proven sorted by it are not. Other files are sorted once, and
+    only written in place if the output differs. recorder, if given,
+    records the phases and the text of the file, except with a memory
+    budget; see toml_sort.report.
+    """
+    if options.memory_budget is not None:
+        return process_file_streaming(filename, options)
+    if recorder is None:
+        recorder = Recorder()
+    cache = options.cache
+    if filename == STD_STREAM or not (options.check or options.in_place):
+        cache = None
+    stat = None
+    key = options.cache_keys.get(filename)
+    if cache is not None:
+        if cache.is_sorted_path(filename):
+            return None
+        if key is not None and cache.is_sorted_content(key=key):
+            return None
+        stat = os.stat(filename)
+    with recorder.phase("read"):
+        original_toml = read_file(filename)
+    recorder.text = original_toml
+    if cache is not None and cache.is_sorted_content(original_toml):
+        cache.record_sorted(filename, original_toml, stat, key=key)
+        return None
+    if options.check or options.in_place:
+        with recorder.phase("verify"):
+            if options.check:
+                violation = options.verifier().verify(original_toml)
+                proven = violation is None
+            else:
+                # A violation would cost a parse to confirm, then a sort
+                proven = options.verifier().proves_sorted(original_toml)
+        if proven:
+            if cache is not None:
+                cache.record_sorted(filename, original_toml, stat, key=key)
+            return None
+        if options.check:
+            return violation
+    chunks = options.sorter().sort_chunks(original_toml, recorder.phases)
+    compare = _CompareWriter(io.StringIO(original_toml))
+    with recorder.phase("write"):
+        if not options.in_place:
+            write_chunks(options.output, _tee(chunks, compare.write))
+            return compare.finish()
+        # sort_chunks sorted the whole document, so holding its chunks is cheap
+        sorted_chunks = list(_tee(chunks, compare.write))
+        violation = compare.finish()
+        if violation is None:
+            if cache is not None:
+                cache.record_sorted(filename, original_toml, stat, key=key)
+            return None
+        if cache is None:
+            write_chunks(filename, sorted_chunks)
+            return violation
+        from .cache import ContentHash
+
+        digest = ContentHash()
+        write_chunks(filename, _tee(sorted_chunks, digest.update))
+        cache.record_sorted(filename, key=digest.hexdigest())
+        return violation
+
+
+def report_file(filename: str, options: ProcessOptions) -> FileReport:
+    """Process a file like process_file, returning its FileReport.
+
+    A file that cannot be parsed is reported with its error instead of
+    raising it. Files known to be sorted from the result cache are not
+    read, and neither are files sorted with a memory budget read whole,
+    so only their size is reported, without their shape.
+    """
+    recorder = Recorder()
+    error = None
+    violation = None
+    start = time.perf_counter()
+    try:
+        violation = process_file(filename, options, recorder)
+    except Exception as exception:  # pylint: disable=broad-except
+        from tomlkit.exceptions import TOMLKitError
+
+        if not isinstance(exception, TOMLKitError):
+            raise
+        error = f"{type(exception).__name__}: {exception}"
+    seconds = time.perf_counter() - start
+    text = recorder.text
+    size = None if text is None else len(text.encode(ENCODING))
+    if text is None and filename != STD_STREAM:
+        size = os.stat(filename).st_size
+    if error is not None:
+        status = PARSE_ERROR
+    elif violation is None:
+        status = SORTED
+    else:
+        status = WOULD_CHANGE if options.check else REWRITTEN
+    return FileReport(
+        path=filename,
+        status=status,
+        seconds=seconds,
+        phases=recorder.phases,
+        size=size,
+        shape=None if text is None or error else document_shape(text),
+        violation=violation,
+        error=error,
+    )
+
+
+def _process_file_in_worker(
+    process: Callable[[str, ProcessOptions], R], filename: str, options: ProcessOptions
+) -> Tuple[Optional[R], Optional[str]]:
+    """Run process in a worker, returning errors as a traceback.
+
+    Not every exception (tomlkit's ParseError, for instance) survives the
+    trip back from a worker process, so the traceback text is returned
+    instead and re-emitted by the parent.
+    """
+    try:
+        return process(filename, options), None
+    except Exception:  # pylint: disable=broad-except
+        return None, traceback.format_exc()
+
+
+def _process_chunk_in_worker(
+    process: Callable[[str, ProcessOptions], R],
+    chunk: List[Tuple[str, ProcessOptions]],
+) -> List[Tuple[Optional[R], Optional[str]]]:
+    """Run process on each file of a chunk, like _process_file_in_worker."""
+    return [
+        _process_file_in_worker(process, filename, options)
+        for filename, options in chunk
+    ]
+
+
+def _chunks(
+    filenames: Iterable[str],
+    options_for: Callable[[str], ProcessOptions],
+    size: int,
+) -> Iterator[List[Tuple[str, ProcessOptions]]]:
+    """Files and their options, size at a time, read as they are needed."""
+    remaining = iter(filenames)
+    while True:
+        chunk = [
+            (filename, options_for(filename))
+            for filename in itertools.islice(remaining, size)
+        ]
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_files(
+    filenames: Iterable[str],
+    options: Union[ProcessOptions, Callable[[str], ProcessOptions]],
+    jobs: int = 1,
+) -> List[Optional[Violation]]:
+    """Process files, in parallel when more than one job is requested.
+
+    options are the ProcessOptions of every file, or give the options of
+    each file, see DirectoryOptions. Results are always returned in the
+    same order as filenames, so that the output of a parallel run is
+    identical to a serial one. Stdin cannot be shared with worker
+    processes, so it forces a serial run. filenames may be an iterator,
+    such as the files found by walking a directory, and files are then
+    processed as it yields them.
+    """
+    return list(map_files(process_file, filenames, options, jobs))
+
+
+def map_files(
+    process: Callable[[str, ProcessOptions], R],
+    filenames: Iterable[str],
+    options: Union[ProcessOptions, Callable[[str], ProcessOptions]],
+    jobs: int = 1,
+) -> Iterator[R]:
+    """Yield process(filename, options) of each file, as process_files runs.
+
+    Results are yielded in the order of filenames as soon as they are
+    ready, so that they can be used before every file is processed. A
+    parallel run reads filenames only a few chunks ahead of the results.
+    """
+    if isinstance(options, ProcessOptions):
+        options_for: Callable[[str], ProcessOptions] = partial(_same_options, options)
+    else:
+        options_for = options
+    if isinstance(filenames, Sequence):
+        jobs = min(jobs, len(filenames))
+        if STD_STREAM in filenames:
+            jobs = 1
+        chunksize = max(1, len(filenames) // (jobs * 4))
+    else:
+        # The length is unknown, and files wait in a chunk until it fills
+        chunksize = STREAM_CHUNKSIZE
+    if jobs <= 1:
+        for filename in filenames:
+            yield process(filename, options_for(filename))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    # The options of a chunk are pickled once, however many files share them
+    chunks = _chunks(filenames, options_for, chunksize)
+    worker = partial(_process_chunk_in_worker, process)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Chunks in flight, oldest first: results keep the order of
+        # filenames, which is only read a few chunks ahead of them
+        pending = collections.deque(
+            executor.submit(worker, chunk)
+            for chunk in itertools.islice(chunks, jobs * 2)
+        )
+        try:
+            while pending:
+                results = pending.popleft().result()
+                for chunk in itertools.islice(chunks, 1):
+                    pending.append(executor.submit(worker, chunk))
+                for result, error in results:
+                    if error is not None:
+                        sys.stderr.write(error)
+                        sys.exit(1)
+                    yield cast(R, result)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _same_options(options: ProcessOptions, _filename: str) -> ProcessOptions:
+    return options
+
+
+def options_from_args(
+    args: Namespace,
+    configuration_overrides: Dict[str, SortOverrideConfiguration],
+    cache_keys: Optional[Dict[str, str]] = None,
+) -> ProcessOptions:
+    """ProcessOptions for parsed command line arguments and overrides."""
+    sort_first, configuration_overrides = parse_sort_first(
+        args.sort_first, configuration_overrides
+    )
+    comment_config = CommentConfiguration(
+        header=not bool(args.no_header or args.no_header_comments or args.no_comments),
+        footer=not bool(args.no_footer_comments or args.no_comments),
+        block=not bool(args.no_block_comments or args.no_comments),
+        inline=not bool(args.no_inline_comments or args.no_comments),
+    )
+    sort_config = SortConfiguration(
+        ignore_case=args.ignore_case,
+        tables=not bool(args.no_sort_tables),
+        table_keys=bool(args.sort_table_keys or args.all),
+        inline_tables=bool(args.sort_inline_tables or args.all),
+        inline_arrays=bool(args.sort_inline_arrays or args.all),
+        first=sort_first,
+        aot_sort_keys=[
+            key.strip() for key in args.sort_aot_keys.split(",") if key.strip()
+        ],
+    )
+    format_config = FormattingConfiguration(
+        spaces_before_inline_comment=args.spaces_before_inline_comment,
+        spaces_indent_inline_array=args.spaces_indent_inline_array,
+        trailing_comma_inline_array=args.trailing_comma_inline_array,
+    )
+    cache = None
+    if args.cache_dir:
+        from .cache import ResultCache, config_fingerprint
+
+        cache = ResultCache(
+            args.cache_dir,
+            config_fingerprint(
+                comment_config,
+                sort_config,
+                format_config,
+                overrides=configuration_overrides,
+            ),
+        )
+    return ProcessOptions(
+        comment_config=comment_config,
+        sort_config=sort_config,
+        format_config=format_config,
+        sort_config_overrides=configuration_overrides,
+        check=args.check,
+        in_place=args.in_place,
+        output=args.output if args.output is not None else STD_STREAM,
+        cache=cache,
+        cache_keys=cache_keys or {},
+        memory_budget=args.memory_budget,
+    )
+
+
+class DirectoryOptions:
+    """The ProcessOptions of each file, from its nearest configuration.
+
+    A file is configured by the nearest pyproject.toml in its directory
+    or above it, which has no configuration without a tool.tomlsort
+    section. The search stops at the top of a repository (a directory
+    with a .git), and files without a pyproject.toml up to there are
+    configured by the current directory. Options
+    given on the command line apply to every file, and only the options
+    of the current directory choose the files and how they are
+    processed (--check or --cache-dir, for instance).
+
+    The directory that configures each directory, and the options of
+    each configuration, are kept for the run, so that the files of a
+    tree share a few loads.
+    """
+
+    # Options that apply to the run, not to the files in a directory
+    RUN_OPTIONS = ("check", "in_place", "output", "cache_dir", "memory_budget")
+
+    def __init__(
+        self, argv: Sequence[str], args: Namespace, default: ProcessOptions
+    ) -> None:
+        """Initializer, with default the ProcessOptions of args."""
+        self.argv = list(argv)
+        self.args = args
+        self.default = default
+        self._configured_by: Dict[str, Optional[str]] = {}
+        self._configurations: Dict[str, Configuration] = {}
+        self._options = {os.path.abspath(os.curdir): default}
+
+    def __call__(self, filename: str) -> ProcessOptions:
+        """The ProcessOptions of the file at filename."""
+        if filename == STD_STREAM:
+            return self.default
+        directory = self.configured_by(os.path.dirname(os.path.abspath(filename)))
+        if directory is None:
+            return self.default
+        options = self._options.get(directory)
+        if options is None:
+            options = self._options[directory] = self._load(directory)
+        return options
+
+    def configured_by(self, directory: str) -> Optional[str]:
+        """The directory of the pyproject.toml that configures directory.
+
+        directory must be absolute. None if no pyproject.toml is found
+        before the top of the repository or of the file system.
+        """
+        visited = []
+        current = directory
+        found: Optional[str] = None
+        while True:
+            if current in self._configured_by:
+                found = self._configured_by[current]
+                break
+            visited.append(current)
+            if os.path.isfile(os.path.join(current, "pyproject.toml")):
+                configuration = find_configuration(current)
+                self._configurations[current] = configuration or ({}, {})
+                found = current
+                break
+            if os.path.exists(os.path.join(current, ".git")):
+                break
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+        for path in visited:
+            self._configured_by[path] = found
+        return found
+
+    def _load(self, directory: str) -> ProcessOptions:
+        configuration, overrides = self._configurations[directory]
+        args = get_parser(configuration).parse_args(self.argv)
+        for name in self.RUN_OPTIONS:
+            setattr(args, name, getattr(self.args, name))
+        return options_from_args(
+            args, copy.deepcopy(overrides), self.default.cache_keys
+        )
+
+
+def _split_globs(value: str) -> List[str]:
+    return [glob.strip() for glob in value.split(",") if glob.strip()]
+
+
+def _expand(
+    filenames: Iterable[str],
+    directories: Set[str],
+    include: Pattern[str],
+    exclude: Pattern[str],
+) -> Iterator[str]:
+    """Filenames, with each directory replaced by the files found in it."""
+    from .walk import walk
+
+    for filename in filenames:
+        if filename in directories:
+            yield from walk(filename, include, exclude)
+        else:
+            yield filename
 
 
 def validate_and_copy(
@@ -64,20 +750,110 @@ def validate_and_copy(
     target[key] = data.pop(key)
 
 
-def load_pyproject() -> TOMLDocument:
-    """Load pyproject file, and return tool.tomlsort section."""
+# Unicode escapes can spell any key, including tomlsort
+_KEY_ESCAPES = ("\\u", "\\U")
+
+# The parse_config and parse_config_overrides of a tool.tomlsort section
+Configuration = Tuple[Dict[str, Any], Dict[str, SortOverrideConfiguration]]
+
+# Validated configurations by the contents of the pyproject file they
+# were loaded from, or None for contents without a tool.tomlsort
+# section, so that the runs of a daemon only load a file again after it
+# was edited, and the directories of a repository share their loads
+_CONFIG_CACHE: Dict[str, Optional[Configuration]] = {}
+_CONFIG_CACHE_SIZE = 256
+
+
+def _read_pyproject(path: str) -> Optional[str]:
+    """The contents of the file at path, or None if it cannot be read."""
     try:
-        with open("pyproject.toml", encoding="utf-8") as file:
-            content = file.read()
+        with open(path, encoding="utf-8") as file:
+            return file.read()
     except OSError:
-        return tomlkit.document()
+        return None
+
+
+def _parse_section(content: str, path: str) -> Optional[Dict[str, Any]]:
+    """The tool.tomlsort section of pyproject contents, as Python types.
+
+    None if the contents have no such section, including when tool or
+    tool.tomlsort is not a table.
+    """
+    if "tomlsort" not in content and not any(
+        escape in content for escape in _KEY_ESCAPES
+    ):
+        return None
+    try:
+        if sys.version_info >= (3, 11):
+            import tomllib
+
+            document = tomllib.loads(content)
+        else:  # pragma: no cover
+            import tomlkit
+
+            document = tomlkit.parse(content).unwrap()
+    except Exception as error:  # pylint: disable=broad-except
+        printerr(f"{path}: {error}")
+        sys.exit(1)
+    tool = document.get("tool")
+    if not isinstance(tool, dict):
+        return None
+    section = tool.get("tomlsort")
+    if not isinstance(section, dict):
+        return None
+    return section
+
+
+def load_pyproject() -> Dict[str, Any]:
+    """Load pyproject file, and return tool.tomlsort section.
+
+    The section is read with tomllib where available, and with tomlkit
+    otherwise. A pyproject file that cannot configure toml-sort is not
+    parsed at all.
+    """
+    content = _read_pyproject("pyproject.toml")
+    if content is None:
+        return {}
+    return _parse_section(content, "pyproject.toml") or {}
+
 
-    document = tomlkit.parse(content)
-    tool_section = document.get("tool", tomlkit.document())
-    return cast(TOMLDocument, tool_section.get("tomlsort", tomlkit.document()))
+def find_configuration(directory: str) -> Optional[Configuration]:
+    """The configuration of the pyproject file in directory, if it has one.
+
+    Configurations are kept for the contents they were loaded from, so
+    loading the same pyproject file again only reads it. They are shared
+    and must not be changed, see load_configuration.
+    """
+    path = os.path.join(directory, "pyproject.toml")
+    content = _read_pyproject(path)
+    if content is None:
+        return None
+    if content in _CONFIG_CACHE:
+        return _CONFIG_CACHE[content]
+    section = _parse_section(content, os.path.relpath(path))
+    configuration = None
+    if section is not None:
+        configuration = (parse_config(section), parse_config_overrides(section))
+    if len(_CONFIG_CACHE) >= _CONFIG_CACHE_SIZE:
+        _CONFIG_CACHE.clear()
+    _CONFIG_CACHE[content] = configuration
+    return configuration
 
 
-def parse_config(tomlsort_section: TOMLDocument) -> Dict[str, Any]:
+def load_configuration(directory: str = os.curdir) -> Configuration:
+    """The parse_config and parse_config_overrides of the pyproject file.
+
+    Returns copies, which the caller may change, of the configuration
+    that find_configuration found in directory.
+    """
+    configuration = find_configuration(directory)
+    if configuration is None:
+        return {}, {}
+    config, overrides = configuration
+    return dict(config), copy.deepcopy(overrides)
+
+
+def parse_config(tomlsort_section: Dict[str, Any]) -> Dict[str, Any]:
     """Load the toml_sort configuration from a TOMLDocument."""
     config = dict(tomlsort_section)
 
@@ -104,8 +880,24 @@ def parse_config(tomlsort_section: TOMLDocument) -> Dict[str, Any]:
     validate_and_copy(config, clean_config, "spaces_indent_inline_array", int)
     validate_and_copy(config, clean_config, "trailing_comma_inline_array", bool)
     validate_and_copy(config, clean_config, "sort_first", list)
-    if "sort_first" in clean_config:
-        clean_config["sort_first"] = ",".join(clean_config["sort_first"])
+    validate_and_copy(config, clean_config, "sort_aot_keys", list)
+    validate_and_copy(config, clean_config, "cache_dir", str)
+    validate_and_copy(config, clean_config, "memory_budget", int)
+    validate_and_copy(config, clean_config, "include", list)
+    validate_and_copy(config, clean_config, "exclude", list)
+    if "memory_budget" in clean_config:
+        # Bools are ints, and defaults skip the checks of the parser
+        budget = clean_config["memory_budget"]
+        try:
+            parse_memory_budget(
+                str(budget).lower() if isinstance(budget, bool) else str(budget)
+            )
+        except argparse.ArgumentTypeError as error:
+            printerr(f"Value of tool.tomlsort.memory_budget: {error}")
+            sys.exit(1)
+    for key in ("sort_first", "sort_aot_keys", "include", "exclude"):
+        if key in clean_config:
+            clean_config[key] = ",".join(clean_config[key])
 
     if config:
         printerr(f"Unexpected configuration values: {config}")
@@ -115,12 +907,12 @@ def parse_config(tomlsort_section: TOMLDocument) -> Dict[str, Any]:
 
 
 def parse_config_overrides(
-    tomlsort_section: TOMLDocument,
+    tomlsort_section: Dict[str, Any],
 ) -> Dict[str, SortOverrideConfiguration]:
     """Parse the tool.tomlsort.overrides section of the config."""
     fields = dataclasses.fields(SortOverrideConfiguration)
     settings_definition = {field.name: field.type for field in fields}
-    override_settings = tomlsort_section.get("overrides", tomlkit.document()).unwrap()
+    override_settings = tomlsort_section.get("overrides", {})
 
     overrides = {}
     for path, settings in override_settings.items():
@@ -175,6 +967,12 @@ Examples:
   - **Disk -> Disk**: toml-sort -o output.toml input.toml
   - **Linting**: toml-sort --check input.toml input2.toml input3.toml
   - **Inplace Disk**: toml-sort --in-place input.toml input2.toml
+  - **Parallel**: toml-sort --check --jobs auto *.toml
+  - **Directories**: toml-sort --check --exclude 'tests/*' .
+  - **Changed files**: toml-sort --check --changed-since origin/main
+  - **Large files**: toml-sort --in-place --memory-budget 256 data.toml
+  - **Profile**: toml-sort --check --profile sort.prof large.toml
+  - **Daemon**: toml-sort --daemon & toml-sort-client --check *.toml
 
 Return codes:
 
@@ -259,6 +1057,17 @@ Notes:
         type=str,
         default="",
     )
+    sort.add_argument(
+        "--sort-aot-keys",
+        help=(
+            "Sort the tables of arrays of tables by the values of these keys, "
+            "then by the next key for equal values. Multiple keys can be "
+            "given separated by a comma."
+        ),
+        metavar="KEYS",
+        type=str,
+        default="",
+    )
     comments = parser.add_argument_group("comments", "exclude comments from output")
     comments.add_argument(
         "--no-header",
@@ -319,6 +1128,138 @@ Notes:
         help=("silently check if an original file would be changed by the formatter"),
         action="store_true",
     )
+    parser.add_argument(
+        "--cache-dir",
+        help=(
+            "directory in which to cache files that are already sorted, so "
+            "that --check and --in-place can skip them on later runs"
+        ),
+        metavar="DIR",
+        type=str,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help=(
+            "number of files to process in parallel, or 'auto' to use one job "
+            "per CPU (default: 1)"
+        ),
+        metavar="N",
+        type=parse_jobs,
+        default=1,
+    )
+    parser.add_argument(
+        "--memory-budget",
+        help=(
+            "sort files group by group, holding about MIB mebibytes of TOML "
+            "in memory at a time, for files too large to sort at once. "
+            "Disables --cache-dir"
+        ),
+        metavar="MIB",
+        type=parse_memory_budget,
+    )
+    parser.add_argument(
+        "--profile",
+        help=(
+            "write a cProfile profile of the run to PATH, and a summary of the "
+            "time spent in each phase of sorting to stderr. Files are "
+            "processed one at a time, ignoring --jobs"
+        ),
+        metavar="PATH",
+        type=str,
+    )
+    parser.add_argument(
+        "--report",
+        help=(
+            "write a report of each file processed, with its status, the time "
+            "spent in each phase, its size and the shape of the document, "
+            "and a summary listing the slowest files, as one JSON document or "
+            "as one JSON object per line"
+        ),
+        choices=REPORT_FORMATS,
+    )
+    parser.add_argument(
+        "--report-file",
+        help=f"file to write the --report to (default: {STD_STREAM})",
+        metavar="PATH",
+        type=str,
+        default=STD_STREAM,
+    )
+    directories = parser.add_argument_group(
+        "directories",
+        "process the TOML files found in directories given as FILENAME args, "
+        "skipping files and directories ignored by git. Globs without a '/' "
+        "match file and directory names, and globs with one match paths "
+        "relative to the directory given",
+    )
+    directories.add_argument(
+        "--include",
+        help=(
+            "files to process, as globs separated by a comma (default: "
+            "*.toml and the TOML files without the extension, such as Pipfile)"
+        ),
+        metavar="GLOBS",
+        type=str,
+    )
+    directories.add_argument(
+        "--exclude",
+        help=(
+            "files and directories to skip, as globs separated by a comma "
+            "(default: the lock files uv.lock, poetry.lock and Cargo.lock)"
+        ),
+        metavar="GLOBS",
+        type=str,
+    )
+    git = parser.add_argument_group(
+        "git",
+        "process the TOML files changed in the git repository of the current "
+        "directory instead of FILENAME args, skipping the lock files the "
+        "pre-commit hooks skip",
+    ).add_mutually_exclusive_group()
+    git.add_argument(
+        "--changed-since",
+        help=(
+            "process files changed since the commit REF, including changes "
+            "not yet committed"
+        ),
+        metavar="REF",
+        type=str,
+    )
+    git.add_argument(
+        "--staged",
+        help="process files with changes staged for commit",
+        action="store_true",
+    )
+    daemon = parser.add_argument_group(
+        "daemon", "keep toml-sort running to avoid its startup cost"
+    )
+    daemon.add_argument(
+        "--daemon",
+        help=(
+            "serve toml-sort-client requests on a Unix domain socket instead "
+            "of processing files"
+        ),
+        action="store_true",
+    )
+    daemon.add_argument(
+        "--socket",
+        help=(
+            f"socket path for --daemon (default: ${SOCKET_ENV}, or "
+            "toml-sort-UID.sock in $XDG_RUNTIME_DIR or the temporary directory)"
+        ),
+        metavar="PATH",
+        type=str,
+    )
+    daemon.add_argument(
+        "--idle-timeout",
+        help=(
+            "seconds without a request after which --daemon exits "
+            f"(default: {DEFAULT_IDLE_TIMEOUT:g})"
+        ),
+        metavar="SECONDS",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+    )
     parser.add_argument(
         "filenames",
         metavar="F",
@@ -330,25 +1271,86 @@ Notes:
     return parser
 
 
-def cli(  # pylint: disable=too-many-branches,too-many-locals
+def cli(
     arguments: Optional[List[str]] = None,
 ) -> None:
     """Toml sort cli implementation."""
-    settings = load_pyproject()
-    configuration = parse_config(settings)
-    configuration_overrides = parse_config_overrides(settings)
-    args = get_parser(configuration).parse_args(args=arguments)  # strip command itself
+    argv = sys.argv[1:] if arguments is None else arguments
+    if argv == ["--version"]:
+        # Skip the configuration and the parser, which a version has no use for
+        print(get_version())
+        sys.exit(0)
+    configuration, configuration_overrides = load_configuration()
+    args = get_parser(configuration).parse_args(args=argv)
     if args.version:
         print(get_version())
         sys.exit(0)
-    sort_first, configuration_overrides = parse_sort_first(
-        args.sort_first, configuration_overrides
-    )
+    if args.daemon:
+        if not hasattr(socket, "AF_UNIX"):
+            printerr("--daemon requires Unix domain sockets")
+            sys.exit(1)
+        try:
+            serve(args.socket or socket_path(), cli, args.idle_timeout)
+        except OSError as error:
+            printerr(str(error))
+            sys.exit(1)
+        sys.exit(0)
+    if args.profile is None:
+        process_args(args, configuration_overrides, argv)
+    else:
+        from .profiling import profile
 
-    filenames_clean = args.filenames if args.filenames else (STD_STREAM,)
+        with profile(args.profile, summary=sys.stderr):
+            process_args(args, configuration_overrides, argv)
+
+
+def process_args(  # pylint: disable=too-many-branches,too-many-locals
+    args: Namespace,
+    configuration_overrides: Dict[str, SortOverrideConfiguration],
+    argv: Sequence[str] = (),
+) -> None:
+    """Process the files named by parsed command line arguments.
+
+    argv are the arguments parsed, which are parsed again with the
+    configuration of each directory that has one, see DirectoryOptions.
+    """
     usage_errors = []
+    cache_keys: Dict[str, str] = {}
+    use_git = args.changed_since is not None or args.staged
+    if use_git:
+        option = "--staged" if args.staged else "--changed-since"
+        if args.filenames:
+            usage_errors.append(f"'{option}' not allowed with FILENAME args")
+        if not (args.check or args.in_place):
+            usage_errors.append(f"'--check' or '--in-place' required with '{option}'")
+        if not usage_errors:
+            from .git import GitError, changed_files
 
-    if len(filenames_clean) > 1:
+            try:
+                changed = changed_files(args.changed_since)
+            except GitError as error:
+                printerr(str(error))
+                sys.exit(1)
+            if not changed:
+                return
+            args.filenames = [file.path for file in changed]
+            cache_keys = {file.path: file.blob for file in changed if file.blob}
+
+    filenames_clean = args.filenames if args.filenames else (STD_STREAM,)
+    directories = {
+        filename
+        for filename in filenames_clean
+        if filename != STD_STREAM and os.path.isdir(filename)
+    }
+
+    if directories:
+        if not (args.in_place or args.check):
+            usage_errors.append(
+                "'--check' or '--in-place' required with directory FILENAME args"
+            )
+        if args.output is not None:
+            usage_errors.append("'--output' not allowed with directory FILENAME args")
+    elif len(filenames_clean) > 1:
         if not (args.in_place or args.check):
             usage_errors.append(
                 "'--check' or '--in-place' required if using 2+ FILENAME args"
@@ -361,6 +1363,15 @@ def cli(  # pylint: disable=too-many-branches,too-many-locals
         )
     if args.in_place and args.output is not None:
         usage_errors.append("'--output' and '--in-place' cannot be used together")
+    if (
+        args.report is not None
+        and args.report_file == STD_STREAM
+        and not (args.check or args.in_place)
+        and args.output in (None, STD_STREAM)
+    ):
+        usage_errors.append(
+            "'--report' to stdout requires '--check', '--in-place' or '--output'"
+        )
 
     if usage_errors:
         printerr("Usage error(s):")
@@ -368,51 +1379,71 @@ def cli(  # pylint: disable=too-many-branches,too-many-locals
             printerr(f"{errno + 1}. {usage_error}")
         sys.exit(1)
 
-    output_clean = args.output if args.output is not None else STD_STREAM
-    check_failures = []
+    if not (args.check or args.in_place) and (len(filenames_clean) > 1 or directories):
+        printerr("Uncaught error. Please submit GitHub issue:")
+        printerr("<https://github.com/pappasam/toml-sort/issues>")
+        sys.exit(1)
 
-    for filename in filenames_clean:
-        original_toml = read_file(filename)
-        sorted_toml = TomlSort(
-            input_toml=original_toml,
-            comment_config=CommentConfiguration(
-                header=not bool(
-                    args.no_header or args.no_header_comments or args.no_comments
-                ),
-                footer=not bool(args.no_footer_comments or args.no_comments),
-                block=not bool(args.no_block_comments or args.no_comments),
-                inline=not bool(args.no_inline_comments or args.no_comments),
-            ),
-            sort_config=SortConfiguration(
-                ignore_case=args.ignore_case,
-                tables=not bool(args.no_sort_tables),
-                table_keys=bool(args.sort_table_keys or args.all),
-                inline_tables=bool(args.sort_inline_tables or args.all),
-                inline_arrays=bool(args.sort_inline_arrays or args.all),
-                first=sort_first,
-            ),
-            format_config=FormattingConfiguration(
-                spaces_before_inline_comment=args.spaces_before_inline_comment,
-                spaces_indent_inline_array=args.spaces_indent_inline_array,
-                trailing_comma_inline_array=args.trailing_comma_inline_array,
-            ),
-            sort_config_overrides=configuration_overrides,
-        ).sorted()
-        if args.check:
-            if original_toml != sorted_toml:
-                check_failures.append(filename)
-        elif args.in_place:
-            if original_toml != sorted_toml:
-                write_file(filename, sorted_toml)
-        elif len(filenames_clean) == 1:
-            write_file(output_clean, sorted_toml)
-        else:
-            printerr("Uncaught error. Please submit GitHub issue:")
-            printerr("<https://github.com/pappasam/toml-sort/issues>")
-            sys.exit(1)
+    options = options_from_args(args, configuration_overrides, cache_keys)
+    options_for = DirectoryOptions(argv, args, options)
+    # Worker processes would not be profiled
+    jobs = 1 if args.profile is not None else args.jobs
+    if directories:
+        from .walk import DEFAULT_EXCLUDE, DEFAULT_INCLUDE, compile_globs
+
+        if STD_STREAM in filenames_clean:
+            jobs = 1
+        include = compile_globs(
+            DEFAULT_INCLUDE if args.include is None else _split_globs(args.include)
+        )
+        exclude = compile_globs(
+            DEFAULT_EXCLUDE if args.exclude is None else _split_globs(args.exclude)
+        )
+        processed: List[str] = []
+        filenames: Iterable[str] = _tee(
+            _expand(filenames_clean, directories, include, exclude),
+            processed.append,
+        )
+    else:
+        processed = list(filenames_clean)
+        filenames = processed
+    if args.report is None:
+        violations = process_files(filenames, options_for, jobs=jobs)
+    else:
+        violations = _report(args, map_files(report_file, filenames, options_for, jobs))
+    if options.cache is not None:
+        options.cache.prune()
+    check_failures = [
+        (filename, violation)
+        for filename, violation in zip(processed, violations)
+        if violation is not None
+    ]
 
     if args.check and check_failures:
         printerr(f"{len(check_failures)} check failure(s):")
-        for check_failure in check_failures:
-            printerr(f"  - {check_failure}")
+        for check_failure, violation in check_failures:
+            printerr(f"  - {check_failure}:{violation}")
+        sys.exit(1)
+
+
+def _report(
+    args: Namespace, reports: Iterable[FileReport]
+) -> List[Optional[Violation]]:
+    """Write the --report, returning the violations of the files reported.
+
+    reports are written as they are yielded, see write_report. Files
+    that could not be parsed are reported before exiting with an error.
+    """
+    from .report import write_report
+
+    if args.report_file == STD_STREAM:
+        reports = write_report(reports, sys.stdout, args.report)
+    else:
+        with open(args.report_file, "w", encoding=ENCODING) as file:
+            reports = write_report(reports, file, args.report)
+    errors = [report for report in reports if report.error is not None]
+    if errors:
+        for report in errors:
+            printerr(f"{report.path}: {report.error}")
         sys.exit(1)
+    return [report.violation for report in reports]
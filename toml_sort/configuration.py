@@ -0,0 +1,197 @@
+"""Configuration of how toml-sort sorts and formats documents.
+
+Nothing here depends on tomlkit, so that code that only needs a
+configuration (the command line, the verifier and the line engine) can
+use it without importing tomlkit.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = [
+    "CommentConfiguration",
+    "FormattingConfiguration",
+    "SortConfiguration",
+    "SortOverrideConfiguration",
+    "SortPlan",
+    "aot_sort_value",
+    "format_comment",
+]
+
+
+def format_comment(comment: str) -> str:
+    """Reformats a comment string removing extra whitespace."""
+    return f"# {comment[1:].strip()}".strip()
+
+
+@dataclass
+class CommentConfiguration:
+    """Configures how TomlSort handles comments."""
+
+    header: bool = True
+    footer: bool = True
+    inline: bool = True
+    block: bool = True
+
+
+@dataclass
+class SortConfiguration:
+    """Configures how TomlSort sorts the input toml."""
+
+    tables: bool = True
+    table_keys: bool = True
+    inline_tables: bool = False
+    inline_arrays: bool = False
+    ignore_case: bool = False
+    first: List[str] = field(default_factory=list)
+    # Keys whose values order the tables of arrays of tables
+    aot_sort_keys: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FormattingConfiguration:
+    """Configures how TomlSort formats its output."""
+
+    spaces_before_inline_comment: int = 2
+    spaces_indent_inline_array: int = 2
+    trailing_comma_inline_array: bool = False
+
+
+@dataclass
+class SortOverrideConfiguration:
+    """Configures overrides to sort configuration for a particular key."""
+
+    table_keys: Optional[bool] = None
+    inline_tables: Optional[bool] = None
+    inline_arrays: Optional[bool] = None
+    first: List[str] = field(default_factory=list)
+    aot_sort_keys: Optional[List[str]] = None
+
+
+# Sort value of a table of an array of tables without the key
+MISSING_SORT_VALUE: Tuple[int, Any] = (4, "")
+
+
+def aot_sort_value(value: Any, ignore_case: bool = False) -> Optional[Tuple[int, Any]]:
+    """Sort value of the plain Python value of a key in aot_sort_keys.
+
+    Numbers sort before strings, and strings before booleans. Other
+    values (dates, arrays, tables) return None: TomlSort orders them by
+    their TOML text, after booleans, and the other engines leave
+    documents with them to TomlSort.
+    """
+    if isinstance(value, bool):
+        return (2, value)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value.lower() if ignore_case else value)
+    return None
+
+
+class SortPlan:
+    """Sort configuration overrides, compiled once for fast lookups.
+
+    Override patterns are compiled to regular expressions up front, and
+    both the override matching a key path and the merged
+    SortConfiguration for each override are memoized, so that resolving
+    the configuration of a node costs a dictionary lookup once a path
+    has been seen. At most RESOLVED_SIZE paths are kept, so that a plan
+    reused across many documents does not grow without bound.
+
+    The plan assumes the configurations it was built from are not
+    mutated afterwards.
+    """
+
+    # Key paths whose configuration is kept, more than most documents have
+    RESOLVED_SIZE = 4096
+
+    def __init__(
+        self,
+        sort_config: SortConfiguration,
+        overrides: Dict[str, SortOverrideConfiguration],
+    ) -> None:
+        self.sort_config = sort_config
+        self.overrides = overrides
+        # fnmatch.fnmatch normalizes case on both sides with os.path.normcase
+        self._patterns: List[Tuple[str, Callable[[str], Any]]] = [
+            (pattern, re.compile(fnmatch.translate(os.path.normcase(pattern))).match)
+            for pattern in overrides
+        ]
+        self._merged: Dict[str, SortConfiguration] = {}
+        self._resolved: Dict[str, SortConfiguration] = {}
+        self._first_ranks: Dict[int, Tuple[SortConfiguration, Dict[str, int]]] = {}
+
+    def find_pattern(self, path: str) -> Optional[str]:
+        """Find the override pattern matching a dotted key path.
+
+        An exact match wins, otherwise the first matching glob pattern is
+        returned.
+        """
+        if path in self.overrides:
+            return path
+        normalized = os.path.normcase(path)
+        for pattern, match in self._patterns:
+            if match(normalized):
+                return pattern
+        return None
+
+    def _merge(self, pattern: str) -> SortConfiguration:
+        """The SortConfiguration with the override for pattern applied."""
+        if pattern not in self._merged:
+            override = self.overrides[pattern]
+            changes: Dict[str, Any] = {}
+            for override_field in fields(override):
+                value = getattr(override, override_field.name)
+                if value is not None:
+                    changes[override_field.name] = (
+                        list(value) if isinstance(value, list) else value
+                    )
+            self._merged[pattern] = replace(self.sort_config, **changes)
+        return self._merged[pattern]
+
+    def resolve(self, path: Optional[str]) -> SortConfiguration:
+        """The SortConfiguration that applies to a dotted key path."""
+        if path is None or not self.overrides:
+            return self.sort_config
+        config = self._resolved.get(path)
+        if config is None:
+            pattern = self.find_pattern(path)
+            config = self.sort_config if pattern is None else self._merge(pattern)
+            if len(self._resolved) >= self.RESOLVED_SIZE:
+                self._resolved.clear()
+            self._resolved[path] = config
+        return config
+
+    def first_ranks(self, sort_config: SortConfiguration) -> Dict[str, int]:
+        """Map each key in sort_config.first to its position in the list."""
+        cached = self._first_ranks.get(id(sort_config))
+        if cached is not None and cached[0] is sort_config:
+            return cached[1]
+        ranks: Dict[str, int] = {}
+        for index, key in enumerate(sort_config.first):
+            ranks.setdefault(key, index)
+        self._first_ranks[id(sort_config)] = (sort_config, ranks)
+        return ranks
+
+    def key_order(
+        self, sort_config: SortConfiguration
+    ) -> Callable[[str], Tuple[int, str]]:
+        """Sort key function ordering keys as configured by sort_config.
+
+        Keys listed in sort_config.first come first, in that order, and
+        the rest are ordered by key, ignoring case if configured.
+        """
+        ranks = self.first_ranks(sort_config)
+        unranked = len(sort_config.first)
+        ignore_case = self.sort_config.ignore_case
+
+        def composite_key(key: str) -> Tuple[int, str]:
+            return ranks.get(key, unranked), key.lower() if ignore_case else key
+
+        return composite_key
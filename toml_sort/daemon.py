@@ -0,0 +1,305 @@
+"""Resident server that keeps toml-sort warm between runs.
+
+Starting toml-sort often costs more than sorting: every run starts the
+interpreter, imports tomlkit and argparse and parses pyproject.toml.
+``toml-sort --daemon`` pays for that once and then listens on a Unix
+domain socket. ``toml-sort-client`` forwards its arguments, working
+directory and standard input to the daemon, which runs the command line
+in its own process, and prints the output and exits with the exit code
+the command line produced. Without a daemon to talk to, the client runs
+the command line itself. The daemon keeps the configurations, sorters
+and verifiers of earlier runs, see toml_sort.cli, so that later runs
+with the same configuration find them warm.
+
+Requests are handled one at a time. The daemon exits once no request
+has come in for its idle timeout.
+
+Client and daemon exchange frames: the lengths of a JSON header and of
+a payload as two unsigned 32 bit integers, then the header and payload.
+The client sends {"argv": [...], "cwd": "...", "env": {...}}, and the
+command line runs in that working directory and environment, which
+reach git among others. The daemon replies with
+{"type": "stdout"} and {"type": "stderr"} frames carrying output, and
+ends with {"type": "exit", "code": N}. It sends {"type": "stdin"} if the
+command line reads standard input, to which the client replies with a
+"stdin" frame carrying all of it.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = ["client", "serve", "socket_path"]
+
+SOCKET_ENV = "TOML_SORT_SOCKET"
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+_LENGTHS = struct.Struct(">II")
+
+
+def socket_path() -> str:
+    """Path of the daemon socket, from $TOML_SORT_SOCKET by default.
+
+    Otherwise the socket is in $XDG_RUNTIME_DIR, or in a directory of
+    the user's own in the temporary directory, which the daemon creates.
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    uid = os.getuid()
+    directory = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(
+        tempfile.gettempdir(), f"toml-sort-{uid}"
+    )
+    return os.path.join(directory, f"toml-sort-{uid}.sock")
+
+
+def _is_private(directory: str) -> bool:
+    """True if only the current user can create files in directory.
+
+    Another user who could would be able to put their own socket in
+    place of the daemon's, and receive the arguments and input of
+    clients and choose their output.
+    """
+    try:
+        status = os.lstat(directory)
+    except OSError:
+        return False
+    return (
+        stat.S_ISDIR(status.st_mode)
+        and status.st_uid == os.getuid()
+        and not status.st_mode & 0o077
+    )
+
+
+def _is_daemon_socket(path: str) -> bool:
+    """True if path is a socket of the current user in a private directory."""
+    if not _is_private(os.path.dirname(os.path.abspath(path))):
+        return False
+    try:
+        status = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(status.st_mode) and status.st_uid == os.getuid()
+
+
+def _send(
+    connection: socket.socket, header: Dict[str, Any], payload: bytes = b""
+) -> None:
+    data = json.dumps(header).encode("utf-8")
+    connection.sendall(_LENGTHS.pack(len(data), len(payload)) + data + payload)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = connection.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _receive(connection: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    header_size, payload_size = _LENGTHS.unpack(
+        _receive_exactly(connection, _LENGTHS.size)
+    )
+    header = json.loads(_receive_exactly(connection, header_size))
+    return header, _receive_exactly(connection, payload_size)
+
+
+class _ClientStdin:
+    """Standard input of the client, fetched the first time it is used."""
+
+    def __init__(self, connection: socket.socket) -> None:
+        self._connection = connection
+        self._stream: Optional[io.TextIOWrapper] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._stream is None:
+            _send(self._connection, {"type": "stdin"})
+            _, data = _receive(self._connection)
+            self._stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+        return getattr(self._stream, name)
+
+
+def _exit_code(code: Any, stderr: io.StringIO) -> int:
+    """The exit status of the interpreter for a SystemExit code."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=stderr)
+    return 1
+
+
+def _starts_daemon(argv: List[str]) -> bool:
+    """True if argv asks for --daemon, or an abbreviation of it."""
+    for argument in argv:
+        if argument == "--":
+            break
+        option = argument.split("=", 1)[0]
+        if len(option) > 2 and "--daemon".startswith(option):
+            return True
+    return False
+
+
+def _set_environment(environment: Dict[str, str]) -> None:
+    os.environ.clear()
+    os.environ.update(environment)
+
+
+def _handle(connection: socket.socket, run: Callable[[List[str]], None]) -> None:
+    """Run the command line for one client."""
+    request, _ = _receive(connection)
+    if _starts_daemon(request["argv"]):
+        message = "toml-sort daemon: --daemon cannot be run through the client\n"
+        _send(connection, {"type": "stderr"}, message.encode("utf-8"))
+        _send(connection, {"type": "exit", "code": 1})
+        return
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    saved = sys.stdin, sys.stdout, sys.stderr
+    cwd = os.getcwd()
+    environment = dict(os.environ)
+    code = 0
+    try:
+        os.chdir(request["cwd"])
+        _set_environment(request.get("env", environment))
+        sys.stdin = _ClientStdin(connection)
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            run(request["argv"])
+        except SystemExit as error:
+            code = _exit_code(error.code, stderr)
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc(file=stderr)
+            code = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+        _set_environment(environment)
+        os.chdir(cwd)
+    _send(connection, {"type": "stdout"}, stdout.getvalue().encode("utf-8"))
+    _send(connection, {"type": "stderr"}, stderr.getvalue().encode("utf-8"))
+    _send(connection, {"type": "exit", "code": code})
+
+
+def _listen(path: str) -> socket.socket:
+    """Bind a socket at path, replacing a stale socket left behind.
+
+    The directory of path is created if missing, and must be private.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not _is_private(directory):
+        raise OSError(
+            f"{directory} must be a directory that only its owner can write to"
+        )
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)
+        else:
+            raise OSError(f"a toml-sort daemon is already listening on {path}")
+        finally:
+            probe.close()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Only the user running the daemon may connect to it
+    umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen()
+    return server
+
+
+def serve(
+    path: str,
+    run: Callable[[List[str]], None],
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+) -> None:
+    """Run requests from clients on path until idle for idle_timeout seconds."""
+    server = _listen(path)
+    inode = os.stat(path).st_ino
+    try:
+        server.settimeout(idle_timeout)
+        while True:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                return
+            with connection:
+                connection.settimeout(None)
+                try:
+                    _handle(connection, run)
+                except OSError:
+                    # The client went away; its output has nowhere to go
+                    continue
+    finally:
+        server.close()
+        try:
+            if os.stat(path).st_ino == inode:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _connect() -> Optional[socket.socket]:
+    """A connection to the daemon, or None if none is running.
+
+    Sockets that another user could have put in place are ignored.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path()
+    if not _is_daemon_socket(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+    return connection
+
+
+def client(arguments: Optional[List[str]] = None) -> None:
+    """Run the toml-sort command line through the daemon, if one is running."""
+    argv = sys.argv[1:] if arguments is None else arguments
+    connection = _connect()
+    if connection is None:
+        # The command line is only imported when there is no daemon
+        from .cli import cli  # pylint: disable=import-outside-toplevel
+
+        cli(argv)
+        return
+    with connection:
+        _send(connection, {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)})
+        try:
+            while True:
+                header, payload = _receive(connection)
+                if header["type"] == "stdin":
+                    _send(connection, {"type": "stdin"}, sys.stdin.buffer.read())
+                elif header["type"] == "stdout":
+                    sys.stdout.buffer.write(payload)
+                    sys.stdout.flush()
+                elif header["type"] == "stderr":
+                    sys.stderr.buffer.write(payload)
+                    sys.stderr.flush()
+                elif header["type"] == "exit":
+                    sys.exit(header["code"])
+        except ConnectionError as error:
+            print(f"toml-sort daemon: {error}", file=sys.stderr)
+            sys.exit(1)
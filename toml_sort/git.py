@@ -0,0 +1,126 @@
+"""Find the TOML files changed in a local git repository.
+
+Paths come from git diff, and from git ls-files for untracked files,
+relative to the current directory and limited to it, and are filtered
+the way the pre-commit hooks of toml-sort filter them: files that
+identify as TOML, without the lock files that tools generate. Each changed file comes with the id of its blob in the index
+when the file in the working tree has the same contents, which lets the
+result cache recognize a file without reading it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+from typing import Dict, List, NamedTuple, Optional
+
+__all__ = ["ChangedFile", "GitError", "changed_files", "is_toml"]
+
+# The same as the exclude pattern in .pre-commit-hooks.yaml
+EXCLUDE = re.compile(r"(^|/)(uv\.lock|poetry\.lock|Cargo\.lock)$")
+
+# Files without a .toml extension that identify recognizes as TOML
+TOML_NAMES = frozenset(
+    ["Cargo.lock", "Gopkg.lock", "Pipfile", "poetry.lock", "uv.lock"]
+)
+
+_NO_BLOB = re.compile(r"0+")
+
+
+class GitError(Exception):
+    """Raised when git cannot list the changed files."""
+
+
+class ChangedFile(NamedTuple):
+    """A changed file, with its blob id if the index matches the file."""
+
+    path: str
+    blob: Optional[str]
+
+
+def is_toml(path: str) -> bool:
+    """True if the pre-commit hooks would sort the file at path."""
+    name = path.rsplit("/", 1)[-1]
+    if not (name.endswith(".toml") or name in TOML_NAMES):
+        return False
+    return EXCLUDE.search(path) is None
+
+
+def _git(*arguments: str) -> str:
+    try:
+        result = subprocess.run(
+            ["git", *arguments],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False,
+        )
+    except OSError as error:
+        raise GitError(f"cannot run git: {error}") from error
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        raise GitError(message or f"git {arguments[0]} failed")
+    return result.stdout.decode("utf-8", "surrogateescape")
+
+
+def _diff(*arguments: str) -> Dict[str, Optional[str]]:
+    """Paths changed by a diff, with the blob id on the new side.
+
+    Deleted files are left out, and so are blob ids git does not know,
+    those of files in the working tree.
+    """
+    output = _git(
+        "diff",
+        "--raw",
+        "--no-abbrev",
+        "-z",
+        "--no-renames",
+        "--relative",
+        "--no-ext-diff",
+        *arguments,
+    )
+    fields = output.split("\0")
+    changes: Dict[str, Optional[str]] = {}
+    # Each change is ":<mode> <mode> <blob> <blob> <status>" then the path
+    for header, path in zip(fields[0::2], fields[1::2]):
+        _, _, _, blob, status = header.split(" ")
+        if status == "D":
+            changes.pop(path, None)
+            continue
+        changes[path] = None if _NO_BLOB.fullmatch(blob) else blob
+    return changes
+
+
+def _untracked() -> List[str]:
+    """Paths of the files git does not track and does not ignore."""
+    output = _git("ls-files", "--others", "--exclude-standard", "-z")
+    return [path for path in output.split("\0") if path]
+
+
+def changed_files(since: Optional[str] = None) -> List[ChangedFile]:
+    """TOML files with changes staged, or changed since the commit since.
+
+    With since, files changed in the working tree count too, and so do
+    untracked files that git does not ignore. Paths are relative to the
+    current directory and sorted. since may not start with "-", which
+    git would take for an option.
+    """
+    if since is not None and since.startswith("-"):
+        raise GitError(f"invalid reference: {since!r}")
+    # Outside a repository, git diff would compare files instead
+    _git("rev-parse", "--git-dir")
+    if since is None:
+        changes = _diff("--cached")
+    else:
+        changes = _diff("--cached", since, "--")
+    unstaged = _diff()
+    if since is not None:
+        changes.update(dict.fromkeys(unstaged))
+        changes.update(dict.fromkeys(_untracked()))
+    files = []
+    for path, blob in sorted(changes.items()):
+        if not is_toml(path) or not os.path.exists(path):
+            continue
+        # The blob only has the contents of the file if it is unchanged
+        files.append(ChangedFile(path, None if path in unstaged else blob))
+    return files
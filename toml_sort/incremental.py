@@ -0,0 +1,241 @@
+"""Re-sort a sorted document after small edits.
+
+Sorting only ever moves whole top-level groups (a top-level key and
+every table below it), and each group sorts the same on its own as in
+the document; see toml_sort.stream. SortedDocument keeps its sorted
+text cut into the root, the groups and the footer. An edit only
+re-sorts the parts it touches, and the groups that come out of them are
+merged back among the others by key, so the cost of an edit grows with
+the parts it touches and not with the document, apart from building
+the new text.
+
+Whenever an edit could change how the rest of the document sorts (a
+group moved under a key defined elsewhere, a value left open, ...), the
+whole document is sorted again. The text is always the same as sorting
+the edited text with TomlSorter.sort().
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .configuration import SortPlan
+from .stream import Split, split_groups
+from .tomlsort import TomlSorter
+
+__all__ = ["SortedDocument"]
+
+
+class _Part(NamedTuple):
+    """Sorted text of a group, or of the root or footer when key is None."""
+
+    key: Optional[str]
+    text: str
+
+
+def _ends_in_comment(text: str) -> bool:
+    """True if the last line of text that is not blank is a comment."""
+    return text.rstrip().rsplit("\n", 1)[-1].lstrip().startswith("#")
+
+
+def _settled(sorter: TomlSorter, text: str) -> bool:
+    """True if sorting sorted text again leaves it as it is."""
+    try:
+        return sorter.check(text) is None
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+class SortedDocument:
+    """A sorted TOML document that can be edited and re-sorted cheaply.
+
+    Positions are indexes into text, the current sorted text.
+    """
+
+    def __init__(self, text: str, sorter: Optional[TomlSorter] = None) -> None:
+        """Sort text with sorter, a default TomlSorter if None."""
+        self.sorter = sorter or TomlSorter()
+        self._plan = SortPlan(
+            self.sorter.sort_config(), self.sorter.sort_config_overrides
+        )
+        self._sorters: Dict[Tuple[bool, bool], TomlSorter] = {}
+        # None when the document cannot be cut into parts, or sorting
+        # its text again would change it
+        self._parts: Optional[List[_Part]] = None
+        self._root_keys: Set[str] = set()
+        self.text = ""
+        self._sort_all(text)
+
+    def _sorter(self, first: bool, last: bool) -> TomlSorter:
+        """Sorter for parts including the first and/or last of the document."""
+        config = self.sorter.comment_config
+        header = first and config.header
+        footer = last and config.footer
+        if (header, footer) == (config.header, config.footer):
+            return self.sorter
+        sorter = self._sorters.get((header, footer))
+        if sorter is None:
+            sorter = self._sorters[(header, footer)] = TomlSorter(
+                dataclasses.replace(config, header=header, footer=footer),
+                self.sorter.sort_config(),
+                self.sorter.format_config,
+                self.sorter.sort_config_overrides,
+            )
+        return sorter
+
+    def _split(self, text: str, first: bool, last: bool) -> Optional[Split]:
+        config = self.sorter.comment_config
+        return split_groups(text, first and config.header, last and config.footer)
+
+    def _sort_all(self, text: str) -> str:
+        """Sort the whole of text."""
+        self.text = self.sorter.sort(text)
+        split = self._split(self.text, True, True)
+        if split is None or not _settled(self.sorter, self.text):
+            self._parts = None
+            self._root_keys = set()
+        else:
+            self._parts = [
+                _Part(None, split.root),
+                *(_Part(key, group) for key, group in split.groups),
+                _Part(None, split.footer),
+            ]
+            self._root_keys = set(split.root_keys)
+        return self.text
+
+    def _starts(self, parts: List[_Part]) -> List[int]:
+        """Position of each part in the text, up to the separator before it."""
+        starts = []
+        position = 0
+        for part in parts:
+            starts.append(position)
+            if part.text:
+                position += len(part.text) + 2
+        return starts
+
+    def _merge(
+        self, before: List[_Part], edited: List[_Part], after: List[_Part]
+    ) -> List[_Part]:
+        """Groups that kept their place merged with the groups edited.
+
+        Like the stable sort of the whole document, an edited group goes
+        after the groups before it in the text with the same sort key,
+        and before the groups after it with the same sort key.
+        """
+        if not self.sorter.sort_config().tables:
+            return before + edited + after
+        key_order = self._plan.key_order(self.sorter.sort_config())
+        kept = before + after
+        merged: List[_Part] = []
+        position = 0
+        for part in edited:
+            order = key_order(part.key or "")
+            while position < len(kept):
+                kept_order = key_order(kept[position].key or "")
+                if kept_order > order or (
+                    kept_order == order and position >= len(before)
+                ):
+                    break
+                merged.append(kept[position])
+                position += 1
+            merged.append(part)
+        merged.extend(kept[position:])
+        return merged
+
+    def edit(self, start: int, end: int, replacement: str) -> str:
+        """Replace text[start:end] with replacement and sort the result.
+
+        Returns the new text, which is also the text of the document
+        from then on. If sorting raises, the document is unchanged.
+        Only the parts around the edit are sorted again, but every edit
+        still takes time in proportion to the whole text, to join the
+        parts into the new text.
+        """
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(
+                f"edit {start}:{end} is outside a text of length {len(self.text)}"
+            )
+        parts = self._parts
+        if parts is None:
+            return self._sort_all(self.text[:start] + replacement + self.text[end:])
+        starts = self._starts(parts)
+        count = len(parts)
+        # Every part whose text or separators the edit touches
+        first = max(bisect_left(starts, start) - 1, 0)
+        last = bisect_right(starts, end) - 1
+        if last >= count - 2:
+            # Whether trailing comments are the footer depends on what
+            # comes before them
+            first, last = min(first, count - 2), count - 1
+        while True:
+            region_start = starts[first]
+            region_end = starts[last + 1] if last + 1 < count else len(self.text)
+            region = (
+                self.text[region_start:start] + replacement + self.text[end:region_end]
+            )
+            if first == 0 and last == count - 1:
+                return self._sort_all(region)
+            split = self._split(region, first == 0, last == count - 1)
+            if split is None:
+                first, last = 0, count - 1
+            elif first > 0 and split.root:
+                # Lines before the first header belong to the part before
+                first -= 1
+            elif first == 0 and not split.root and last < count - 2:
+                # Comments on the next group could become the header
+                last += 1
+            elif last < count - 2 and _ends_in_comment(region):
+                # Comments at the end belong to the group after
+                last += 1
+            elif last == count - 1 and first > 0 and not split.groups:
+                # Comments at the end of the group before could become
+                # the footer
+                first -= 1
+            else:
+                break
+
+        sorter = self._sorter(first == 0, last == count - 1)
+        region_sorted = sorter.sort(region)
+        split = self._split(region_sorted, first == 0, last == count - 1)
+        full_text = self.text[:start] + replacement + self.text[end:]
+        if (
+            split is None
+            or (first > 0 and split.root)
+            # Parts are only left alone if sorting them again keeps them
+            or not _settled(sorter, region_sorted)
+        ):
+            return self._sort_all(full_text)
+        before = parts[1:first]
+        after = parts[last + 1 : count - 1]
+        edited = [_Part(key, group) for key, group in split.groups]
+        root_keys = set(split.root_keys) if first == 0 else self._root_keys
+        kept_keys = {part.key for part in before + after}
+        if any(
+            part.key in kept_keys or part.key in root_keys for part in edited
+        ) or not root_keys.isdisjoint(kept_keys):
+            # Tables under one key in several places sort differently
+            return self._sort_all(full_text)
+
+        root = _Part(None, split.root) if first == 0 else parts[0]
+        footer = _Part(None, split.footer) if last == count - 1 else parts[-1]
+        parts = [root, *self._merge(before, edited, after), footer]
+        self._root_keys = root_keys
+        texts = [part.text for part in parts if part.text]
+        self.text = "\n\n".join(texts) + "\n"
+        self._parts = parts if self._ends_settled(root, footer, texts) else None
+        return self.text
+
+    def _ends_settled(self, root: _Part, footer: _Part, texts: List[str]) -> bool:
+        """False if comments were sorted to the start or end of the text.
+
+        Sorting the text again would take them for the header or footer.
+        """
+        if not texts:
+            return True
+        config = self.sorter.comment_config
+        if config.header and not root.text and texts[0].startswith("#"):
+            return False
+        last_line = texts[-1].rsplit("\n", 1)[-1]
+        return not (config.footer and not footer.text and last_line.startswith("#"))
@@ -0,0 +1,344 @@
+"""Sort tables by reordering lines of text, without tomlkit.
+
+When inline values are not sorted, sorting a document only moves whole
+lines around: tables move with their keys, and keys move within their
+table together with the comments above them. Every key/value line is
+copied to the output once it is formatted. For a document whose lines
+are already formatted, the output of TomlSort can therefore be built
+from the text directly, which is much faster than parsing it with
+tomlkit:
+
+1. The logical lines are cut into units at table and array of tables
+   headers, each with the comments attached to it the way
+   TomlSort.body_to_tomlsortitems attaches them, and the units are
+   arranged in a tree by header path.
+2. The tree is written out depth first with sibling tables in sorted
+   order, the keys of each table sorted if table_keys is set, and the
+   elements of arrays of tables sorted by aot_sort_keys in the order
+   of their values, with blank lines where TomlSort puts them. The
+   output is made of slices of the input, so runs of lines that keep
+   their place are copied in one piece.
+3. The result is only used if SortVerifier accepts it as a sorted
+   document, which also checks that every line is formatted, and the
+   input is valid TOML.
+
+Anything else (dotted keys, tables defined in pieces, lines that need
+formatting, ...) is left to TomlSort.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .configuration import (
+    MISSING_SORT_VALUE,
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+)
+from .scanner import AOT, BLANK, COMMENT, KEYVALUE, Line, LineScanner
+from .verify import Path, SortVerifier, is_valid, line_sort_value
+
+__all__ = ["sort_tables", "sort_tables_with"]
+
+# Largest slice of the input copied to the output at once
+CHUNK_SIZE = 1024 * 1024
+
+_BLANK_LINE = Line(BLANK, "\n", 0)
+
+
+class _Unsupported(Exception):
+    """Raised when a document has to be sorted with tomlkit."""
+
+
+class _Node:
+    """A table, or an element of an array of tables, and its children.
+
+    lines is None for a table that is only defined implicitly by the
+    headers of its children, and elements is set for an array of tables.
+    """
+
+    __slots__ = ("lines", "children", "elements")
+
+    def __init__(self, lines: Optional[List[Line]] = None) -> None:
+        self.lines = lines
+        self.children: Dict[str, _Node] = {}
+        self.elements: Optional[List[_Node]] = None
+
+
+def supports(
+    sort_config: SortConfiguration,
+    sort_config_overrides: Dict[str, SortOverrideConfiguration],
+) -> bool:
+    """True if a configuration never sorts inline tables or arrays."""
+    if sys.version_info < (3, 11):
+        # Checking validity with tomlkit would cost as much as sorting
+        return False
+    if sort_config.inline_tables or sort_config.inline_arrays:
+        return False
+    return not any(
+        override.inline_tables or override.inline_arrays
+        for override in sort_config_overrides.values()
+    )
+
+
+class _Tree:
+    """Units of a document arranged by header path."""
+
+    def __init__(self) -> None:
+        self.root = _Node()
+        self.previous: Path = ()
+        # Tables that were left for another table, and may not continue
+        self.closed: Set[Path] = set()
+
+    def add(self, path: Path, kind: str, lines: List[Line]) -> None:
+        """Add the unit of a table header."""
+        previous = self.previous
+        common = 0
+        while (
+            common < min(len(path), len(previous)) and path[common] == previous[common]
+        ):
+            common += 1
+        if common == len(path):
+            # Only a new element of an array of tables may repeat a path
+            if kind != AOT:
+                raise _Unsupported()
+            # The tables of the previous element may come again
+            self.closed = {
+                closed for closed in self.closed if closed[: len(path)] != path
+            }
+        else:
+            if any(
+                path[:depth] in self.closed
+                for depth in range(common + 1, len(path) + 1)
+            ):
+                raise _Unsupported()
+            self.closed.update(
+                previous[:depth] for depth in range(common + 1, len(previous) + 1)
+            )
+        self.previous = path
+
+        node = self.root
+        for key in path[:-1]:
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _Node()
+            node = child if child.elements is None else child.elements[-1]
+        existing = node.children.get(path[-1])
+        if kind == AOT:
+            if existing is None:
+                existing = node.children[path[-1]] = _Node()
+                existing.elements = []
+            elif existing.elements is None:
+                raise _Unsupported()
+            existing.elements.append(_Node(lines))
+        elif existing is None:
+            node.children[path[-1]] = _Node(lines)
+        elif existing.lines is None and existing.elements is None:
+            existing.lines = lines
+        else:
+            raise _Unsupported()
+
+
+def _sorted_elements(
+    elements: List[_Node], sort_keys: List[str], verifier: SortVerifier
+) -> List[_Node]:
+    """Elements of an array of tables in the order of TomlSort.sorted_aot_tables."""
+    ignore_case = verifier.sort_config.ignore_case
+    column = []
+    for element in elements:
+        assert element.lines is not None
+        values: Dict[str, Tuple[int, Any]] = {}
+        for line in element.lines:
+            if line.kind != KEYVALUE:
+                continue
+            assert line.keys is not None
+            if line.keys[0] in sort_keys:
+                value = line_sort_value(line, ignore_case)
+                if value is None:
+                    raise _Unsupported()
+                values[line.keys[0]] = value
+        column.append(tuple(values.get(key, MISSING_SORT_VALUE) for key in sort_keys))
+    order = sorted(range(len(column)), key=column.__getitem__)
+    return [elements[index] for index in order]
+
+
+def _sorted_keys(lines: List[Line], path: Path, verifier: SortVerifier) -> List[Line]:
+    """Lines of a unit with its keys sorted, if table_keys is set.
+
+    Each key/value line moves with the comments above it, and the
+    header of a table stays first.
+    """
+    if not verifier.config(path).table_keys:
+        return lines
+    position = 0
+    while position < len(lines) and lines[position].kind == COMMENT:
+        position += 1
+    if position < len(lines) and lines[position].kind != KEYVALUE:
+        # The header and the comments attached to it
+        position += 1
+    else:
+        position = 0
+    items: List[Tuple[str, List[Line]]] = []
+    start = position
+    for index in range(position, len(lines)):
+        line = lines[index]
+        if line.kind == KEYVALUE:
+            assert line.keys is not None
+            items.append((line.keys[0], lines[start : index + 1]))
+            start = index + 1
+    key_order = verifier.key_order(path)
+    items.sort(key=lambda item: key_order(item[0]))
+    result = lines[:position]
+    for _, item_lines in items:
+        result.extend(item_lines)
+    return result
+
+
+def _units(node: _Node, path: Path, verifier: SortVerifier) -> Iterator[List[Line]]:
+    """Units of the tables below a node, depth first in sorted order.
+
+    path is the path TomlSort configures the node by: the elements of
+    an array of tables, and what they contain, go by the key of the
+    array alone, see SortVerifier.
+    """
+    keys = list(node.children)
+    if verifier.config(path).tables:
+        keys.sort(key=verifier.key_order(path))
+    for key in keys:
+        child = node.children[key]
+        tables = [child]
+        child_path = path + (key,)
+        if child.elements is not None:
+            tables = child.elements
+            sort_keys = verifier.config(child_path).aot_sort_keys
+            if sort_keys:
+                tables = _sorted_elements(tables, sort_keys, verifier)
+            child_path = (key,)
+        for table in tables:
+            if table.lines is not None:
+                yield _sorted_keys(table.lines, child_path, verifier)
+            yield from _units(table, child_path, verifier)
+
+
+def _sections(lines: List[Line], verifier: SortVerifier) -> Iterator[List[Line]]:
+    """Header comments, root unit, table units and footer of a document."""
+    comment_config = verifier.comment_config
+    position = 0
+    if lines[0].kind == COMMENT:
+        while position < len(lines) and lines[position].kind == COMMENT:
+            position += 1
+        if position == len(lines) or lines[position].kind != BLANK:
+            raise _Unsupported()
+        if comment_config.header:
+            yield lines[:position]
+    tree = _Tree()
+    root: List[Line] = []
+    unit = root
+    group: List[Line] = []
+    for line in lines[position:]:
+        if line.kind == BLANK:
+            # Comments followed by a blank line are not attached to anything
+            group = []
+        elif line.kind == COMMENT:
+            if comment_config.block:
+                group.append(line)
+        elif line.kind == KEYVALUE:
+            if line.keys is None or len(line.keys) != 1:
+                # Dotted keys define tables, which TomlSort moves around
+                raise _Unsupported()
+            unit.extend(group)
+            unit.append(line)
+            group = []
+        else:
+            if line.keys is None:
+                raise _Unsupported()
+            unit = group + [line]
+            tree.add(line.keys, line.kind, unit)
+            group = []
+    yield _sorted_keys(root, (), verifier)
+    yield from _units(tree.root, (), verifier)
+    if comment_config.footer:
+        yield group
+
+
+def _span(text: str, start: int, end: int) -> Iterator[str]:
+    """A span of text, in slices of at most CHUNK_SIZE characters."""
+    for chunk_start in range(start, end, CHUNK_SIZE):
+        yield text[chunk_start : min(end, chunk_start + CHUNK_SIZE)]
+
+
+def _slices(text: str, lines: List[Line]) -> Iterator[str]:
+    """The text of lines as slices of text, merging lines adjacent in it."""
+    start = end = 0
+    for line in lines:
+        if line.offset == end or (
+            # A blank line added to the output may be there in text too
+            line.offset < 0 and text.startswith(line.text, end)
+        ):
+            end += len(line.text)
+            continue
+        yield from _span(text, start, end)
+        if line.offset < 0:
+            yield line.text
+            start = end = 0
+        else:
+            start, end = line.offset, line.offset + len(line.text)
+    yield from _span(text, start, end)
+
+
+def sort_tables(  # pylint: disable=too-many-arguments
+    text: str,
+    comment_config: Optional[CommentConfiguration] = None,
+    sort_config: Optional[SortConfiguration] = None,
+    format_config: Optional[FormattingConfiguration] = None,
+    sort_config_overrides: Optional[Dict[str, SortOverrideConfiguration]] = None,
+) -> Optional[Iterator[str]]:
+    """Sort the tables of TOML text cleaned by clean_toml_text.
+
+    Returns chunks of the same text as TomlSort.sorted(), or None if the
+    configuration or the document needs TomlSort. The document is
+    checked before this returns; the chunks are slices of text, with
+    runs of lines that keep their place copied as one slice.
+    """
+    sort_config = sort_config or SortConfiguration()
+    sort_config_overrides = sort_config_overrides or {}
+    if not supports(sort_config, sort_config_overrides):
+        return None
+    verifier = SortVerifier(
+        comment_config, sort_config, format_config, sort_config_overrides
+    )
+    return sort_tables_with(text, verifier)
+
+
+def sort_tables_with(text: str, verifier: SortVerifier) -> Optional[Iterator[str]]:
+    """Like sort_tables, configured by a verifier the caller can reuse.
+
+    The configuration of verifier must pass supports().
+    """
+    if "\r" in text:
+        return None
+    scanner = LineScanner()
+    lines: List[Line] = []
+    for physical in text.splitlines(keepends=True):
+        line = scanner.feed(physical)
+        if line is not None and (lines or line.kind != BLANK):
+            lines.append(line)
+    if not lines or scanner.pending:
+        return None
+    output: List[Line] = []
+    try:
+        for section in _sections(lines, verifier):
+            if section:
+                if output:
+                    output.append(_BLANK_LINE)
+                output.extend(section)
+    except _Unsupported:
+        return None
+    if not verifier.accepts(output):
+        return None
+    if not is_valid(text):
+        return None
+    return _slices(text, output)
@@ -0,0 +1,104 @@
+"""Profile toml-sort with cProfile.
+
+profile() records a cProfile profile of the code run in its block. The
+profile can be written to a file for pstats or snakeviz, and summarized
+by phase of a sort: the time spent in each of the functions in PHASES,
+including the functions they call. Phases nest (sorted_children_table
+runs within toml_elements_sorted, for example), so their times do not
+add up to the total.
+
+Nested values and tables are sorted by the *_steps generators, which
+run_steps drives from an explicit stack rather than by calling each
+other. The time of a step phase is therefore the work on the nodes of
+its kind, without the nested nodes it hands back to run_steps, and its
+calls count each time one of its steps resumed, at least once per node.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import tomlkit
+
+from .linesort import sort_tables_with
+from .stream import sort_stream
+from .tomlsort import TomlSort, run_steps
+from .verify import SortVerifier
+
+__all__ = ["PhaseTime", "phase_times", "profile"]
+
+PHASES: Dict[str, Callable[..., Any]] = {
+    "sort_tables": sort_tables_with,
+    "verify": SortVerifier.verify,
+    "sort_stream": sort_stream,
+    "parse": tomlkit.parse,
+    "toml_elements_sorted": TomlSort.toml_elements_sorted,
+    "run_steps": run_steps,
+    "body_steps": TomlSort.body_steps,
+    "table_steps": TomlSort.table_steps,
+    "aot_steps": TomlSort.aot_steps,
+    "element_steps": TomlSort.element_steps,
+    "item_steps": TomlSort.item_steps,
+    "array_steps": TomlSort.array_steps,
+    "inline_table_steps": TomlSort.inline_table_steps,
+    "sorted_children_table": TomlSort.sorted_children_table,
+    "dumps": tomlkit.dumps,
+}
+
+
+class PhaseTime(NamedTuple):
+    """Time spent in a phase, including the functions it calls."""
+
+    name: str
+    calls: int
+    seconds: float
+
+
+def phase_times(stats: pstats.Stats) -> List[PhaseTime]:
+    """The phases of PHASES that ran, in the order they are listed."""
+    # pstats keys functions by (filename, first line number, name)
+    entries = stats.stats  # type: ignore[attr-defined]
+    times = []
+    for name, function in PHASES.items():
+        code = function.__code__
+        entry = entries.get((code.co_filename, code.co_firstlineno, code.co_name))
+        if entry is not None:
+            _, calls, _, cumulative, _ = entry
+            times.append(PhaseTime(name, calls, cumulative))
+    return times
+
+
+def _write_summary(stats: pstats.Stats, path: Optional[str], file: IO[str]) -> None:
+    total: float = stats.total_tt  # type: ignore[attr-defined]
+    written = f", written to {path}" if path is not None else ""
+    file.write(f"profile: {total:.3f}s total{written}\n")
+    for phase in phase_times(stats):
+        share = phase.seconds / total if total else 0.0
+        file.write(
+            f"  {phase.name:<22} {phase.seconds:>8.3f}s {share:>4.0%}"
+            f" {phase.calls:>8} calls\n"
+        )
+
+
+@contextmanager
+def profile(
+    path: Optional[str] = None, summary: Optional[IO[str]] = None
+) -> Iterator[cProfile.Profile]:
+    """Profile the code run in the block.
+
+    On leaving the block, even with an exception, the profile is written
+    to path in the format of pstats, and a summary by phase to summary.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path is not None:
+            profiler.dump_stats(path)
+        if summary is not None:
+            _write_summary(pstats.Stats(profiler), path, summary)
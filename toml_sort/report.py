@@ -0,0 +1,200 @@
+"""Machine-readable reports of the files processed by the command line.
+
+A report has one record per file, with what happened to the file, the
+wall time of each phase of processing it, its size and the shape of the
+document, and a summary that lists the slowest files. The phases are:
+
+- read: reading the file.
+- verify: checking whether the file is already sorted, see
+  toml_sort.verify. Sorted files are usually never parsed.
+- parse, sort and dump: parsing the file with tomlkit, sorting it and
+  writing the sorted document back to text. Files sorted by reordering
+  their tables as text spend all three in sort.
+- write: writing the output.
+
+Phases a file did not go through are left out. The shape of a document
+is measured apart from the phases, so measuring it does not add to
+them.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .verify import Violation
+
+__all__ = [
+    "DocumentShape",
+    "FileReport",
+    "Recorder",
+    "document_shape",
+    "summary",
+    "write_report",
+]
+
+# What happened to a file
+SORTED = "sorted"
+WOULD_CHANGE = "would_change"
+REWRITTEN = "rewritten"
+PARSE_ERROR = "parse_error"
+
+FORMATS = ("json", "ndjson")
+
+# Files listed in the summary, slowest first
+SLOWEST = 10
+
+
+class DocumentShape(NamedTuple):
+    """How big and how nested a TOML document is.
+
+    tables counts every table below the document, including inline
+    tables and the tables of arrays of tables. keys counts the keys
+    whose values are not tables. max_depth is the deepest nesting of
+    tables and arrays, the document being at depth 0, and largest_array
+    is the most items in one array, or in one array of tables.
+    """
+
+    tables: int
+    keys: int
+    max_depth: int
+    largest_array: int
+
+
+def _load(text: str) -> Dict[str, Any]:
+    # pylint: disable=import-outside-toplevel
+    if sys.version_info >= (3, 11):
+        import tomllib
+
+        return tomllib.loads(text)
+    import tomlkit  # pragma: no cover
+
+    return tomlkit.parse(text).unwrap()  # pragma: no cover
+
+
+def document_shape(text: str) -> Optional[DocumentShape]:
+    """The shape of a TOML document, or None if it is not valid TOML."""
+    try:
+        document = _load(text)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    tables = keys = max_depth = largest_array = 0
+    stack: List[Any] = [(document, 0)]
+    while stack:
+        value, depth = stack.pop()
+        max_depth = max(max_depth, depth)
+        if isinstance(value, dict):
+            for child in value.values():
+                if isinstance(child, dict):
+                    tables += 1
+                else:
+                    keys += 1
+                if isinstance(child, (dict, list)):
+                    stack.append((child, depth + 1))
+        else:
+            largest_array = max(largest_array, len(value))
+            for child in value:
+                if isinstance(child, dict):
+                    tables += 1
+                if isinstance(child, (dict, list)):
+                    stack.append((child, depth + 1))
+    return DocumentShape(tables, keys, max_depth, largest_array)
+
+
+class Recorder:
+    """Records the phases of processing one file, and the text read."""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.text: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time of the block to the phase name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+@dataclass
+class FileReport:
+    """The record of one file in a report.
+
+    violation is where the file first differed from its sorted form,
+    and error the message of a file that could not be parsed.
+    """
+
+    path: str
+    status: str
+    seconds: float
+    phases: Dict[str, float] = field(default_factory=dict)
+    size: Optional[int] = None
+    shape: Optional[DocumentShape] = None
+    violation: Optional[Violation] = None
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The record as JSON types."""
+        return {
+            "path": self.path,
+            "status": self.status,
+            "seconds": self.seconds,
+            "phases": self.phases,
+            "size": self.size,
+            "shape": None if self.shape is None else self.shape._asdict(),
+            "violation": None if self.violation is None else str(self.violation),
+            "error": self.error,
+        }
+
+
+def summary(reports: List[FileReport], slowest: int = SLOWEST) -> Dict[str, Any]:
+    """Totals over reports, with the slowest files, as JSON types."""
+    statuses: Dict[str, int] = {}
+    phases: Dict[str, float] = {}
+    for report in reports:
+        statuses[report.status] = statuses.get(report.status, 0) + 1
+        for name, seconds in report.phases.items():
+            phases[name] = phases.get(name, 0.0) + seconds
+    ranked = sorted(reports, key=lambda report: report.seconds, reverse=True)
+    return {
+        "count": len(reports),
+        "statuses": statuses,
+        "seconds": sum(report.seconds for report in reports),
+        "phases": phases,
+        "slowest": [
+            {"path": report.path, "seconds": report.seconds}
+            for report in ranked[:slowest]
+        ],
+    }
+
+
+def write_report(
+    reports: Iterable[FileReport], file: IO[str], fmt: str
+) -> List[FileReport]:
+    """Write reports and their summary to file, returning the reports.
+
+    With fmt json, the report is one object with the records in files
+    and the summary in summary, written once every report is in. With
+    ndjson, each record is a line, written and flushed as soon as
+    reports yields it, and so is the summary, last, with "summary" in
+    its type field.
+    """
+    if fmt == "json":
+        written = list(reports)
+        records = [report.as_dict() for report in written]
+        json.dump({"files": records, "summary": summary(written)}, file, indent=2)
+        file.write("\n")
+        return written
+    written = []
+    for report in reports:
+        file.write(json.dumps({"type": "file", **report.as_dict()}) + "\n")
+        file.flush()
+        written.append(report)
+    file.write(json.dumps({"type": "summary", **summary(written)}) + "\n")
+    return written
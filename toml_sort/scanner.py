@@ -0,0 +1,234 @@
+"""Line oriented scanner for TOML text.
+
+The scanner splits TOML text into logical lines (a key/value pair whose
+value spans several physical lines is one logical line) and classifies
+them without building a document. It tracks multiline strings, arrays
+and inline tables so that a line starting with "[" inside a value is
+never mistaken for a table header.
+
+It does not validate TOML: malformed input is classified on a best
+effort basis and callers are expected to fall back to tomlkit whenever
+they need more than the classification.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+__all__ = ["LineScanner", "scan_lines", "parse_key_path"]
+
+BLANK = "blank"
+COMMENT = "comment"
+TABLE = "table"
+AOT = "aot"
+KEYVALUE = "keyvalue"
+
+_BARE_KEY = r"[A-Za-z0-9_-]+"
+_BASIC_KEY = r'"(?:[^"\\\n]|\\.)*"'
+_LITERAL_KEY = r"'[^'\n]*'"
+KEY = rf"(?:{_BARE_KEY}|{_BASIC_KEY}|{_LITERAL_KEY})"
+_KEY_PATH = rf"{KEY}(?:[ \t]*\.[ \t]*{KEY})*"
+
+_HEADER = re.compile(rf"[ \t]*(\[\[?)[ \t]*({_KEY_PATH})[ \t]*(\]\]?)[ \t]*(#.*)?$")
+KEY_PREFIX = re.compile(rf"[ \t]*({_KEY_PATH})[ \t]*=")
+_BARE_KEY_PATH = re.compile(rf"{_BARE_KEY}(?:\.{_BARE_KEY})*")
+_KEY_SEGMENT = re.compile(rf"[ \t]*({KEY})[ \t]*(?:\.|$)")
+_SPECIAL = re.compile(r"[\"'\[\]{}#]")
+BASIC_STRING_END = re.compile(r'(?:[^"\\\n]|\\.)*"')
+LITERAL_STRING_END = re.compile(r"[^'\n]*'")
+_ESCAPE = re.compile(r'\\(?:([btnfre"\\])|u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8}))')
+_ESCAPES = {
+    "b": "\b",
+    "t": "\t",
+    "n": "\n",
+    "f": "\f",
+    "r": "\r",
+    "e": "\x1b",
+    '"': '"',
+    "\\": "\\",
+}
+
+
+class Line(NamedTuple):
+    """A logical line of TOML text.
+
+    keys is the key path of a header or key/value line, or None if the
+    line has none or it could not be parsed. offset is the position of
+    the line in the text fed to the scanner, or -1 if it has none.
+    """
+
+    kind: str
+    text: str
+    lineno: int
+    keys: Optional[Tuple[str, ...]] = None
+    offset: int = -1
+
+
+def _unescape(match: re.Match[str]) -> str:
+    simple, short, long = match.groups()
+    if simple is not None:
+        return _ESCAPES[simple]
+    return chr(int(short or long, 16))
+
+
+def parse_key_path(text: str) -> Optional[Tuple[str, ...]]:
+    """Parse a dotted TOML key into its (unquoted) components.
+
+    Returns None if text is not a valid key.
+    """
+    text = text.strip()
+    if _BARE_KEY_PATH.fullmatch(text):
+        return tuple(text.split("."))
+    keys = []
+    position = 0
+    while position < len(text):
+        match = _KEY_SEGMENT.match(text, position)
+        if match is None:
+            return None
+        segment = match.group(1)
+        if segment[0] == '"':
+            if "\\" in _ESCAPE.sub("", segment[1:-1]):
+                return None
+            segment = _ESCAPE.sub(_unescape, segment[1:-1])
+        elif segment[0] == "'":
+            segment = segment[1:-1]
+        keys.append(segment)
+        position = match.end()
+    if not keys or text.endswith("."):
+        return None
+    return tuple(keys)
+
+
+def multiline_end(line: str, position: int, delimiter: str) -> int:
+    """Position just past the closing delimiter of a multiline string.
+
+    Returns -1 if the string does not end on this line.
+    """
+    while True:
+        index = line.find(delimiter, position)
+        if index < 0:
+            return -1
+        if delimiter == '"""':
+            backslashes = 0
+            while index - backslashes > 0 and line[index - backslashes - 1] == "\\":
+                backslashes += 1
+            if backslashes % 2:
+                position = index + 1
+                continue
+        end = index + 3
+        # Up to two quotes may directly precede the closing delimiter
+        for _ in range(2):
+            if end < len(line) and line[end] == delimiter[0]:
+                end += 1
+        return end
+
+
+class LineScanner:
+    """Incrementally split physical lines into logical lines.
+
+    Feed physical lines (with their line endings) to feed(); it returns
+    a Line each time a logical line is complete.
+    """
+
+    def __init__(self) -> None:
+        self._lines: List[str] = []
+        self._kind = BLANK
+        self._keys: Optional[Tuple[str, ...]] = None
+        self._lineno = 0
+        self._start = 0
+        self._offset = 0
+        self._start_offset = 0
+        self._depth = 0
+        self._string: Optional[str] = None
+
+    @property
+    def pending(self) -> bool:
+        """True if a logical line has been started but not completed."""
+        return bool(self._lines)
+
+    def _scan_value(self, line: str, position: int) -> None:
+        """Track strings and brackets from position to the end of line."""
+        while position < len(line):
+            if self._string is not None:
+                end = multiline_end(line, position, self._string)
+                if end < 0:
+                    return
+                self._string = None
+                position = end
+            match = _SPECIAL.search(line, position)
+            if match is None:
+                return
+            char = match.group()
+            position = match.end()
+            if char == "#":
+                return
+            if char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth = max(0, self._depth - 1)
+            elif line.startswith(char * 2, position):
+                self._string = char * 3
+                position += 2
+            else:
+                end_pattern = BASIC_STRING_END if char == '"' else LITERAL_STRING_END
+                string_end = end_pattern.match(line, position)
+                position = len(line) if string_end is None else string_end.end()
+
+    def feed(self, line: str) -> Optional[Line]:
+        """Consume one physical line, returning a completed logical line."""
+        self._lineno += 1
+        if not self._lines:
+            self._start = self._lineno
+            self._start_offset = self._offset
+            stripped = line.strip()
+            self._keys = None
+            if not stripped:
+                self._kind = BLANK
+            elif stripped[0] == "#":
+                self._kind = COMMENT
+            elif stripped[0] == "[":
+                header = _HEADER.match(line.rstrip("\r\n"))
+                self._kind = AOT if stripped.startswith("[[") else TABLE
+                if header is not None and len(header.group(1)) == len(header.group(3)):
+                    self._keys = parse_key_path(header.group(2))
+            else:
+                self._kind = KEYVALUE
+                prefix = KEY_PREFIX.match(line)
+                position = 0
+                if prefix is not None:
+                    self._keys = parse_key_path(prefix.group(1))
+                    position = prefix.end()
+                self._scan_value(line, position)
+        else:
+            self._scan_value(line, 0)
+        self._lines.append(line)
+        self._offset += len(line)
+        if self._string is not None or self._depth > 0:
+            return None
+        return self._complete()
+
+    def _complete(self) -> Line:
+        text = "".join(self._lines)
+        self._lines = []
+        return Line(self._kind, text, self._start, self._keys, self._start_offset)
+
+    def close(self) -> Optional[Line]:
+        """Return the unterminated logical line at the end of input, if any."""
+        if not self._lines:
+            return None
+        self._string = None
+        self._depth = 0
+        return self._complete()
+
+
+def scan_lines(lines: Iterable[str]) -> Iterator[Line]:
+    """Split physical lines into logical lines."""
+    scanner = LineScanner()
+    for physical in lines:
+        logical = scanner.feed(physical)
+        if logical is not None:
+            yield logical
+    logical = scanner.close()
+    if logical is not None:
+        yield logical
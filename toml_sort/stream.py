@@ -0,0 +1,458 @@
+"""Bounded-memory sorting for TOML files too large to sort at once.
+
+Sorting tables only ever reorders whole top-level groups (a top-level key
+and every table below it) and never moves anything between groups, so a
+document can be sorted group by group:
+
+1. The input is scanned line by line and cut into units at table and
+   array of tables headers, keeping the comments attached to a header
+   with its unit, exactly as TomlSort.body_to_tomlsortitems attaches them.
+   Only the byte span of each unit is kept in memory; the text stays in
+   the input file, or in a temporary spill file for unseekable input.
+2. Groups are ordered by their top-level key and each one is sorted with
+   TomlSort on its own. A group that is a large array of tables is sorted
+   in batches of whole elements that fit in the memory budget. When the
+   array is sorted by aot_sort_keys, the values of those keys are read
+   from each element into a column first, and the elements are put in
+   order before they are cut into batches.
+
+The output is identical to TomlSort.sorted() over the whole document.
+Documents that cannot be split safely (a top-level dotted key that
+defines a table, say) are sorted in memory instead.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import io
+import shutil
+import tempfile
+from array import array
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import tomlkit
+
+from .configuration import (
+    MISSING_SORT_VALUE,
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+    SortPlan,
+)
+from .scanner import AOT, BLANK, COMMENT, KEYVALUE, TABLE, LineScanner
+from .tomlsort import TomlSort
+from .verify import line_sort_value
+
+__all__ = ["Split", "sort_stream", "split_groups"]
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+class _Unsplittable(Exception):
+    """Raised when a document cannot be sorted group by group."""
+
+
+class _Group:
+    """Byte spans of the units that make up a top-level group."""
+
+    __slots__ = ("key", "offsets", "lengths", "elements", "size", "splittable")
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.offsets = array("q")
+        self.lengths = array("q")
+        # 1 where a unit starts a new element of a top-level array of tables
+        self.elements = array("b")
+        self.size = 0
+        # TomlSort attaches the comments of every element of an array of
+        # tables to its first element, so one with comments on a later
+        # element must be sorted in one piece to give the same output.
+        self.splittable = True
+
+    def add(self, start: int, end: int, element: bool) -> None:
+        self.offsets.append(start)
+        self.lengths.append(end - start)
+        self.elements.append(element)
+        self.size += end - start
+
+    @property
+    def is_aot(self) -> bool:
+        return bool(self.elements) and bool(self.elements[0])
+
+
+class _Index:
+    """Result of scanning a document into units."""
+
+    def __init__(self) -> None:
+        self.root_end = 0
+        self.footer: Tuple[int, int] = (0, 0)
+        self.groups: Dict[str, _Group] = {}
+        self.root_keys: List[str] = []
+        self.dotted_root_keys = False
+
+
+def _header_key(text: str) -> str:
+    """Top-level key of a header the scanner could not parse."""
+    try:
+        document = tomlkit.parse(text)
+    except Exception as error:  # pylint: disable=broad-except
+        raise _Unsplittable(str(error)) from error
+    if len(document) != 1:
+        raise _Unsplittable(f"unexpected header: {text!r}")
+    return next(iter(document))
+
+
+def _lines(infile: IO[bytes], spill: Optional[IO[bytes]]) -> Iterator[Tuple[str, int]]:
+    """Decoded physical lines with their length in bytes."""
+    for raw in infile:
+        if spill is not None:
+            spill.write(raw)
+        line = raw.decode("utf-8")
+        if line.endswith("\r\n"):
+            line = line[:-2] + "\n"
+        if "\r" in line:
+            raise _Unsplittable("carriage return line endings")
+        yield line, len(raw)
+
+
+def _scan(
+    infile: IO[bytes],
+    spill: Optional[IO[bytes]],
+    header_comments: bool,
+) -> _Index:
+    """Scan a document into an index of units grouped by top-level key."""
+    index = _Index()
+    scanner = LineScanner()
+    position = 0
+    line_start = 0
+    leading = header_comments
+    header_seen = False
+    unit: Optional[Tuple[_Group, int, bool]] = None
+    pending: Optional[int] = None
+    # Trailing blank lines are stripped before sorting, so the footer is
+    # whatever was pending when the final run of blank lines started.
+    footer: Optional[int] = None
+    blank_run = False
+
+    def close(end: int) -> None:
+        if unit is None:
+            index.root_end = end
+        else:
+            group, start, element = unit
+            group.add(start, end, element)
+
+    for physical, size in _lines(infile, spill):
+        position += size
+        line = scanner.feed(physical)
+        if line is None:
+            continue
+        start, line_start = line_start, position
+        if leading:
+            # The first block of comments is the document header and always
+            # stays at the top of the document.
+            if line.kind == COMMENT:
+                header_seen = True
+                continue
+            if line.kind == BLANK and not header_seen:
+                continue
+            leading = False
+        if line.kind != BLANK:
+            blank_run = False
+        if line.kind == COMMENT:
+            if pending is None:
+                pending = start
+        elif line.kind == BLANK:
+            if not blank_run:
+                footer = pending
+                blank_run = True
+            pending = None
+        elif line.kind == KEYVALUE:
+            pending = None
+            if unit is None:
+                if line.keys is None:
+                    raise _Unsplittable(f"unexpected line: {line.text!r}")
+                index.root_keys.append(line.keys[0])
+                index.dotted_root_keys |= len(line.keys) > 1
+        elif line.kind in (TABLE, AOT):
+            key = line.keys[0] if line.keys else _header_key(line.text)
+            boundary = start if pending is None else pending
+            close(boundary)
+            group = index.groups.get(key)
+            element = line.kind == AOT and line.keys is not None and len(line.keys) == 1
+            if group is None:
+                group = index.groups[key] = _Group(key)
+            elif unit is not None and unit[0] is not group:
+                # tomlkit merges the tables of an interrupted group, which
+                # changes where the comments around them attach.
+                raise _Unsplittable(f"tables under {key!r} are not contiguous")
+            if element and pending is not None and group.offsets:
+                group.splittable = False
+            unit = (group, boundary, element)
+            pending = None
+    if scanner.pending:
+        raise _Unsplittable("unterminated value at end of document")
+    if blank_run:
+        pending = footer
+    end = position if pending is None else pending
+    close(end)
+    index.footer = (end, position)
+    for key in index.root_keys:
+        if key in index.groups:
+            raise _Unsplittable(f"top-level key {key!r} is also a table")
+    return index
+
+
+class Split(NamedTuple):
+    """TOML text cut into the parts that are sorted independently.
+
+    Each part is stripped of the blank lines around it; groups are pairs
+    of a top-level key and its text, in the order of the document.
+    """
+
+    root: str
+    groups: List[Tuple[str, str]]
+    footer: str
+    root_keys: List[str]
+
+
+def split_groups(text: str, header_comments: bool, footer: bool) -> Optional[Split]:
+    """Cut TOML text into its root, top-level groups and footer.
+
+    The root includes the header comments if header_comments. Comments
+    at the end of the text are the footer if footer, and otherwise stay
+    with the table before them. Returns None for documents that
+    sort_stream would sort as a whole, and for dotted keys in the root,
+    which tomlkit may move out of it.
+    """
+    if "\r" in text:
+        return None
+    data = text.encode("utf-8")
+    try:
+        index = _scan(io.BytesIO(data), None, header_comments)
+    except _Unsplittable:
+        return None
+    if index.dotted_root_keys:
+        return None
+    footer_start, footer_end = index.footer
+    if not footer:
+        footer_start = footer_end
+    spans = [
+        (group.key, group.offsets[0], group.offsets[-1] + group.lengths[-1])
+        for group in index.groups.values()
+    ]
+    root_end = index.root_end
+    if spans:
+        key, start, _ = spans[-1]
+        spans[-1] = (key, start, footer_start)
+    else:
+        root_end = footer_start
+
+    def part(start: int, end: int) -> str:
+        return data[start:end].decode("utf-8").strip()
+
+    return Split(
+        part(0, root_end),
+        [(key, part(start, end)) for key, start, end in spans],
+        part(footer_start, footer_end),
+        index.root_keys,
+    )
+
+
+class _Reader:
+    """Read unit text back from the input or spill file."""
+
+    def __init__(self, fileobj: IO[bytes], base: int) -> None:
+        self.fileobj = fileobj
+        self.base = base
+
+    def read(self, start: int, length: int) -> str:
+        self.fileobj.seek(self.base + start)
+        text = self.fileobj.read(length).decode("utf-8").replace("\r\n", "\n")
+        if text and not text.endswith("\n"):
+            text += "\n"
+        return text
+
+
+def _splits(group: _Group, budget: int) -> bool:
+    """True if a group is sorted in more than one batch."""
+    return group.size > budget and group.is_aot and group.splittable
+
+
+def _sort_values(
+    group: _Group, reader: _Reader, sort_keys: List[str], ignore_case: bool
+) -> Optional[List[Tuple[Tuple[int, Any], ...]]]:
+    """The values of sort_keys in each element of an array of tables.
+
+    Returns None if only TomlSort can order the elements. The keys of an
+    element are in the first unit of the element, which is read one at a
+    time.
+    """
+    column = []
+    scanner = LineScanner()
+    for unit, element in enumerate(group.elements):
+        if not element:
+            continue
+        values: Dict[str, Tuple[int, Any]] = {}
+        text = reader.read(group.offsets[unit], group.lengths[unit])
+        for physical in text.splitlines(keepends=True):
+            line = scanner.feed(physical)
+            if line is None or line.kind != KEYVALUE:
+                continue
+            if line.keys is None or len(line.keys) != 1:
+                return None
+            if line.keys[0] in sort_keys:
+                value = line_sort_value(line, ignore_case)
+                if value is None:
+                    return None
+                values[line.keys[0]] = value
+        column.append(tuple(values.get(key, MISSING_SORT_VALUE) for key in sort_keys))
+    return column
+
+
+def _batches(
+    group: _Group,
+    budget: int,
+    sort_values: Optional[List[Tuple[Tuple[int, Any], ...]]] = None,
+) -> Iterator[List[int]]:
+    """Indexes of units in a group, split into batches within budget.
+
+    Batches only ever split before an element of an array of tables, so
+    that an element is always sorted together with its sub-tables. With
+    sort_values, the values of aot_sort_keys in each element, elements
+    are batched in the order of their values.
+    """
+    if not _splits(group, budget):
+        yield list(range(len(group.offsets)))
+        return
+    starts = array(
+        "q", (unit for unit, element in enumerate(group.elements) if element)
+    )
+    order: Iterator[int] = iter(range(len(starts)))
+    if sort_values is not None:
+        order = iter(sorted(range(len(starts)), key=sort_values.__getitem__))
+    batch: List[int] = []
+    size = 0
+    for element in order:
+        start = starts[element]
+        end = starts[element + 1] if element + 1 < len(starts) else len(group.offsets)
+        length = sum(group.lengths[start:end])
+        if batch and size + length > budget:
+            yield batch
+            batch = []
+            size = 0
+        batch.extend(range(start, end))
+        size += length
+    if batch:
+        yield batch
+
+
+def sort_stream(  # pylint: disable=too-many-arguments,too-many-locals
+    infile: IO[bytes],
+    write: Callable[[str], object],
+    comment_config: Optional[CommentConfiguration] = None,
+    sort_config: Optional[SortConfiguration] = None,
+    format_config: Optional[FormattingConfiguration] = None,
+    sort_config_overrides: Optional[Dict[str, SortOverrideConfiguration]] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+) -> None:
+    """Sort TOML from a binary file, passing the output to write in chunks.
+
+    At most about memory_budget bytes of TOML text are sorted at once,
+    unless a single top-level table (other than an array of tables) is
+    larger than that. The output is the same as TomlSort.sorted().
+    """
+    comment_config = comment_config or CommentConfiguration()
+    sort_config = sort_config or SortConfiguration()
+    format_config = format_config or FormattingConfiguration()
+    sort_config_overrides = sort_config_overrides or {}
+
+    def sort_text(text: str, config: CommentConfiguration) -> str:
+        return TomlSort(
+            text,
+            comment_config=config,
+            sort_config=sort_config,
+            format_config=format_config,
+            sort_config_overrides=sort_config_overrides,
+        ).sorted()
+
+    with tempfile.TemporaryFile() as spill:
+        seekable = infile.seekable()
+        if seekable:
+            start = infile.tell()
+            source: IO[bytes] = infile
+        else:
+            start = 0
+            source = spill
+        try:
+            index = _scan(infile, None if seekable else spill, comment_config.header)
+            if index.dotted_root_keys:
+                # tomlkit may move them out of the root, see split_groups
+                raise _Unsplittable("dotted keys in the root")
+        except _Unsplittable:
+            if seekable:
+                infile.seek(start)
+            else:
+                shutil.copyfileobj(infile, spill)
+                spill.seek(0)
+            write(sort_text(source.read().decode("utf-8"), comment_config))
+            return
+        reader = _Reader(source, start)
+
+        plan = SortPlan(sort_config, sort_config_overrides)
+        groups = list(index.groups.values())
+        if sort_config.tables:
+            key_order = plan.key_order(sort_config)
+            groups.sort(key=lambda group: key_order(group.key))
+
+        parts: List[Tuple[Optional[_Group], List[int]]] = [(None, [])]
+        for group in groups:
+            budget = memory_budget
+            sort_values = None
+            sort_keys = plan.resolve(group.key).aot_sort_keys
+            if sort_keys and _splits(group, budget):
+                sort_values = _sort_values(
+                    group, reader, sort_keys, sort_config.ignore_case
+                )
+                if sort_values is None:
+                    # The group is sorted in one piece
+                    budget = group.size
+            parts.extend(
+                (group, batch) for batch in _batches(group, budget, sort_values)
+            )
+
+        root_config = dataclasses.replace(comment_config, footer=False)
+        inner_config = dataclasses.replace(comment_config, header=False, footer=False)
+        footer_config = dataclasses.replace(comment_config, header=False)
+        separator = ""
+        for part, batch in parts:
+            if part is None:
+                sorted_text = sort_text(reader.read(0, index.root_end), root_config)
+            else:
+                text = "".join(
+                    reader.read(part.offsets[unit], part.lengths[unit])
+                    for unit in batch
+                )
+                sorted_text = sort_text(text, inner_config)
+            sorted_text = sorted_text.strip()
+            if sorted_text:
+                write(separator + sorted_text)
+                separator = "\n\n"
+        footer_start, footer_end = index.footer
+        if footer_end > footer_start:
+            footer = sort_text(
+                reader.read(footer_start, footer_end - footer_start), footer_config
+            ).strip()
+            if footer:
+                write(separator + footer)
+        write("\n")
@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
-import fnmatch
 import itertools
 import re
-from dataclasses import asdict, dataclass, field
+import sys
+import time
+from dataclasses import dataclass, field
 from typing import (
+    IO,
     Any,
     Dict,
+    Generator,
     Iterable,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -37,12 +41,42 @@ from tomlkit.items import (
 from tomlkit.items import item as tomlkit_item
 from tomlkit.toml_document import TOMLDocument
 
-__all__ = ["TomlSort"]
+from . import linesort
+from .configuration import (
+    MISSING_SORT_VALUE,
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+    SortPlan,
+    aot_sort_value,
+    format_comment,
+)
+from .verify import SortVerifier, Violation
+
+__all__ = [
+    "CommentConfiguration",
+    "FormattingConfiguration",
+    "SortConfiguration",
+    "SortOverrideConfiguration",
+    "TomlSort",
+    "TomlSorter",
+]
+
+
+BLANK_LINES = re.compile(r"[\r\n][\r\n]{2,}")
+
+
+def _add_time(phases: Dict[str, float], name: str, start: float) -> float:
+    """Add the time since start to phases[name], returning the time now."""
+    now = time.perf_counter()
+    phases[name] = phases.get(name, 0.0) + now - start
+    return now
 
 
 def clean_toml_text(input_toml: str) -> str:
     """Clean input toml, increasing the chance for beautiful output."""
-    cleaned = re.sub(r"[\r\n][\r\n]{2,}", "\n\n", input_toml)
+    cleaned = BLANK_LINES.sub("\n\n", input_toml)
     return "\n" + cleaned.strip() + "\n"
 
 
@@ -78,11 +112,6 @@ def attach_comments(item: TomlSortItem, previous_item: Table | TOMLDocument) ->
 T = TypeVar("T", bound=Item)
 
 
-def format_comment(comment: str) -> str:
-    """Reformats a comment string removing extra whitespace."""
-    return f"# {comment[1:].strip()}".strip()
-
-
 def normalize_trivia(
     item: T, include_comments: bool = True, comment_spaces: int = 2
 ) -> T:
@@ -104,6 +133,70 @@ def normalize_trivia(
     return item
 
 
+# Sorting a value or table: a generator that yields the steps of the
+# values or tables inside it, is sent back each of them sorted, and
+# returns the value or table sorted
+Steps = Generator[Any, Item, Item]
+
+R = TypeVar("R")
+
+
+def run_steps(steps: Generator[Any, Any, R]) -> R:
+    """Run steps and every step they yield, returning what steps returns.
+
+    Each step yields the steps of the values or tables nested in its
+    own, and is sent back what they return. The steps are run from an
+    explicit stack instead of by recursion, so that deep nesting costs
+    no Python frames and cannot raise RecursionError.
+    """
+    stack: List[Generator[Any, Any, Any]] = [steps]
+    result: Any = None
+    while True:
+        try:
+            nested = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            if not stack:
+                return cast(R, stop.value)
+            result = stop.value
+        else:
+            stack.append(nested)
+            result = None
+
+
+def has_newline(item: Item) -> bool:
+    """True if item.as_string() has a newline, without building it.
+
+    Arrays and inline tables are scanned part by part, stopping at the
+    first newline, instead of being serialized with everything in them.
+    """
+    stack = [item]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Array):
+            # pylint: disable=protected-access
+            if item._multiline and item._value:
+                return True
+            for group in item._value:
+                for part in (group.indent, group.comma, group.comment):
+                    if part is not None and "\n" in part.as_string():
+                        return True
+                if group.value is not None:
+                    stack.append(group.value)
+        elif isinstance(item, InlineTable):
+            for key, value in item.value.body:
+                if key is None:
+                    if "\n" in value.as_string():
+                        return True
+                elif "\n" in value.trivia.indent or "\n" in value.trivia.comment:
+                    return True
+                else:
+                    stack.append(value)
+        elif "\n" in item.as_string():
+            return True
+    return False
+
+
 def coalesce_tables(
     tables: Iterable[TomlSortItem],
 ) -> Iterable[TomlSortItem]:
@@ -126,16 +219,48 @@ class TomlSortKeys:
     """Keeps track of the Keys for a particular TomlSortItem.
 
     We use this to keep track of the full path of an item so that we can
-    find the configuration overrides that apply to it.
+    find the configuration overrides that apply to it. Each path only
+    holds its last key and the path of its parent, so that extending a
+    path does not copy it, and the dotted string of the path is built
+    once, when it is first needed.
+
+    The list of keys is built the first time it is used and kept, so
+    that it can be changed in place as before: from then on, it is the
+    path, and the string is joined from it each time.
     """
 
-    keys: List[Key]
+    __slots__ = ("parent", "_base", "_string", "_keys")
+
+    def __init__(
+        self, keys: Union[List[Key], Key], parent: Optional[TomlSortKeys] = None
+    ):
+        self._keys: Optional[List[Key]] = None
+        if not isinstance(keys, Key):
+            if parent is None:
+                self._keys = keys
+            for key in keys[:-1]:
+                parent = TomlSortKeys(key, parent)
+            keys = keys[-1]
+        self.parent = parent
+        self._base = _interned(keys)
+        self._string: Optional[str] = None
 
-    def __init__(self, keys: Union[List[Key], Key]):
-        if isinstance(keys, Key):
-            self.keys = [keys]
-        else:
-            self.keys = keys
+    @property
+    def keys(self) -> List[Key]:
+        """The keys of the path, from the top."""
+        if self._keys is None:
+            keys = []
+            path: Optional[TomlSortKeys] = self
+            while path is not None:
+                keys.append(path.base)
+                path = path.parent
+            keys.reverse()
+            self._keys = keys
+        return self._keys
+
+    @keys.setter
+    def keys(self, value: List[Key]) -> None:
+        self._keys = value
 
     @property
     def base(self) -> Key:
@@ -143,31 +268,66 @@ class TomlSortKeys:
 
         For example: would return test for this.is.a.test
         """
-        return self.keys[-1]
+        if self._keys is not None:
+            return self._keys[-1]
+        return self._base
 
     @base.setter
     def base(self, value: Key) -> None:
-        """Setter for the base property."""
-        self.keys[-1] = value
+        """Setter for the base property.
+
+        Paths extending this one keep the string they were built with.
+        """
+        if self._keys is not None:
+            self._keys[-1] = value
+        self._base = _interned(value)
+        self._string = None
 
     def as_string(self) -> str:
         """Returns the full set of keys as a string."""
-        return ".".join(k.key for k in self.keys)
+        if self._keys is not None:
+            return ".".join(key.key for key in self._keys)
+        if self._string is not None:
+            return self._string
+        # Paths up to the nearest one with its string, built top down
+        unbuilt = []
+        path: Optional[TomlSortKeys] = self
+        while path is not None and path._string is None and path._keys is None:
+            unbuilt.append(path)
+            path = path.parent
+        prefix = None if path is None else path.as_string()
+        for path in reversed(unbuilt):
+            name = path._base.key
+            path._string = name if prefix is None else sys.intern(f"{prefix}.{name}")
+            prefix = path._string
+        return cast(str, self._string)
 
     def __add__(self, other: Union[TomlSortKeys, Key]) -> TomlSortKeys:
         """Combine TomlSortKeys object with either Key or TomlSortKeys."""
         if isinstance(other, Key):
-            keys = [other]
-        else:
-            keys = other.keys
-        return TomlSortKeys(self.keys + keys)
+            return TomlSortKeys(other, self)
+        return TomlSortKeys(other.keys, self)
 
     def __repr__(self) -> str:
         """Representation of TomlSortKeys."""
         return f"<{self.__class__.__name__}: {self.as_string()}>"
 
 
-@dataclass
+def _interned(key: Key) -> Key:
+    """Key, with its name interned.
+
+    The same names repeat in every table of an array of tables, and are
+    compared when sorting and looking up overrides.
+    """
+    key.key = sys.intern(key.key)
+    return key
+
+
+# Trees of items can have hundreds of thousands of nodes
+_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class TomlSortItem:
     """Track comments attached to sorted Toml Items."""
 
@@ -208,61 +368,22 @@ class TomlSortItem:
         return cast(AoT, self.value)
 
 
-@dataclass
-class CommentConfiguration:
-    """Configures how TomlSort handles comments."""
-
-    header: bool = True
-    footer: bool = True
-    inline: bool = True
-    block: bool = True
-
-
-@dataclass
-class SortConfiguration:
-    """Configures how TomlSort sorts the input toml."""
-
-    tables: bool = True
-    table_keys: bool = True
-    inline_tables: bool = False
-    inline_arrays: bool = False
-    ignore_case: bool = False
-    first: List[str] = field(default_factory=list)
-
+class TomlSorter:
+    """Sort any number of toml documents with one configuration.
 
-@dataclass
-class FormattingConfiguration:
-    """Configures how TomlSort formats its output."""
-
-    spaces_before_inline_comment: int = 2
-    spaces_indent_inline_array: int = 2
-    trailing_comma_inline_array: bool = False
-
-
-@dataclass
-class SortOverrideConfiguration:
-    """Configures overrides to sort configuration for a particular key."""
-
-    table_keys: Optional[bool] = None
-    inline_tables: Optional[bool] = None
-    inline_arrays: Optional[bool] = None
-    first: List[str] = field(default_factory=list)
-
-
-class TomlSort:
-    """API to manage sorting toml files."""
+    The configuration, including compiled override patterns, is set up
+    once, so that sorting many small documents costs no more than the
+    sorting itself. The configuration must not be mutated afterwards.
+    """
 
-    def __init__(  # pylint: disable=too-many-arguments
+    def __init__(
         self,
-        input_toml: str,
         comment_config: Optional[CommentConfiguration] = None,
         sort_config: Optional[SortConfiguration] = None,
         format_config: Optional[FormattingConfiguration] = None,
         sort_config_overrides: Optional[Dict[str, SortOverrideConfiguration]] = None,
     ) -> None:
         """Initializer."""
-        self.input_toml = input_toml
-
         if comment_config is None:
             comment_config = CommentConfiguration()
         self.comment_config = comment_config
@@ -278,6 +399,20 @@ class TomlSort:
         if sort_config_overrides is None:
             sort_config_overrides = {}
         self.sort_config_overrides = sort_config_overrides
+        self._sort_plan = SortPlan(sort_config, sort_config_overrides)
+        self._verifier: Optional[SortVerifier] = None
+
+    @property
+    def verifier(self) -> SortVerifier:
+        """SortVerifier with the same configuration, built on first use."""
+        if self._verifier is None:
+            self._verifier = SortVerifier(
+                self.comment_config,
+                self._sort_config,
+                self.format_config,
+                self.sort_config_overrides,
+            )
+        return self._verifier
 
     def _find_config_override(
         self, keys: Optional[TomlSortKeys]
@@ -292,49 +427,57 @@ class TomlSort:
         """
         if keys is None:
             return None
-
-        if keys.as_string() in self.sort_config_overrides:
-            return self.sort_config_overrides.get(keys.as_string())
-
-        matches = [
-            config
-            for pattern, config in self.sort_config_overrides.items()
-            if fnmatch.fnmatch(keys.as_string(), pattern)
-        ]
-
-        if len(matches) > 0:
-            return matches[0]
-
-        return None
+        pattern = self._sort_plan.find_pattern(keys.as_string())
+        if pattern is None:
+            return None
+        return self.sort_config_overrides[pattern]
 
     def sort_config(self, keys: Optional[TomlSortKeys] = None) -> SortConfiguration:
         """Returns the SortConfiguration to use for particular TomlSortKeys.
 
         This merges the global SortConfiguration with any matching
         SortOverrideConfiguration to give the full SortConfiguration
-        that applies to this Key.
+        that applies to this Key. Merged configurations are shared
+        between calls and must not be mutated.
         """
-        override = self._find_config_override(keys)
-        if override is None:
+        if keys is None:
             return self._sort_config
-
-        main_config = asdict(self._sort_config)
-        override_config = asdict(override)
-        merged_config = {}
-
-        for key, value in main_config.items():
-            if key in override_config and override_config[key] is not None:
-                merged_config[key] = override_config[key]
-            else:
-                merged_config[key] = value
-
-        return SortConfiguration(**merged_config)
+        return self._sort_plan.resolve(keys.as_string())
 
     def sort_array(
-        self, keys: TomlSortKeys, array: Array, indent_depth: int = 0
+        self,
+        keys: TomlSortKeys,
+        array: Array,
+        indent_depth: int = 0,
+        single_line: bool = False,
     ) -> Array:
-        """Sort and format an inline array item while preserving comments."""
-        multiline = "\n" in array.as_string()
+        """Sort and format an inline array item while preserving comments.
+
+        single_line tells that the array is known to have no newline,
+        because the array it is in has none.
+        """
+        return cast(
+            Array, run_steps(self.array_steps(keys, array, indent_depth, single_line))
+        )
+
+    def array_steps(
+        self,
+        keys: TomlSortKeys,
+        array: Array,
+        indent_depth: int = 0,
+        single_line: bool = False,
+        strings: Optional[Dict[int, str]] = None,
+    ) -> Steps:
+        """The steps of sort_array, see run_steps.
+
+        When arrays are sorted, each sorted array is serialized once,
+        into strings by id, so that the arrays it is in can sort it
+        without serializing it again at every level of nesting.
+        """
+        sort_inline_arrays = self.sort_config(keys).inline_arrays
+        if sort_inline_arrays and strings is None:
+            strings = {}
+        multiline = not single_line and has_newline(array)
         indent_size = self.format_config.spaces_indent_inline_array
         indent = "\n" + " " * indent_size * (indent_depth + 1) if multiline else ""
         comma = "," if multiline else ", "
@@ -377,14 +520,21 @@ class TomlSort:
                         array_item.comment = None
                 new_array_items.append((array_item, comments))
                 comments = []
-                array_item.value = self.sort_item(
+                steps = self.item_steps(
                     keys,
                     array_item.value,
                     indent_depth=indent_depth + 1 if multiline else indent_depth,
+                    single_line=not multiline,
+                    strings=strings,
                 )
+                if steps is not None:
+                    array_item.value = yield steps
 
-        if self.sort_config(keys).inline_arrays:
-            new_array_items = sorted(new_array_items, key=self.array_sort_func)
+        if sort_inline_arrays and len(new_array_items) > 1:
+            new_array_items = sorted(
+                new_array_items,
+                key=lambda value: self.array_sort_func(value, strings),
+            )
         new_array_value = []
         for array_item, comments in new_array_items:
             if comments and self.comment_config.block:
@@ -408,49 +558,107 @@ class TomlSort:
             include_comments=self.comment_config.inline,
             comment_spaces=self.format_config.spaces_before_inline_comment,
         )
+        # pylint: disable-next=protected-access
+        if strings is not None and not array._multiline:
+            # The same as array.as_string(), reusing the strings of arrays
+            parts = [
+                strings.get(id(part)) or part.as_string()
+                for group in new_array_value
+                for part in group
+            ]
+            strings[id(array)] = "[" + "".join(parts) + "]"
         return array
 
-    def sort_item(self, keys: TomlSortKeys, item: Item, indent_depth: int = 0) -> Item:
-        """Sort item, recursing down for inline tables and arrays."""
+    def sort_item(
+        self,
+        keys: TomlSortKeys,
+        item: Item,
+        indent_depth: int = 0,
+        single_line: bool = False,
+    ) -> Item:
+        """Sort item, with the inline tables and arrays inside it.
+
+        single_line tells that item is known to have no newline.
+        """
         if isinstance(item, Array):
-            return self.sort_array(keys, item, indent_depth=indent_depth)
+            return self.sort_array(
+                keys, item, indent_depth=indent_depth, single_line=single_line
+            )
 
         if isinstance(item, InlineTable):
-            return self.sort_inline_table(keys, item, indent_depth=indent_depth)
+            return self.sort_inline_table(
+                keys, item, indent_depth=indent_depth, single_line=single_line
+            )
 
         return item
 
+    def item_steps(
+        self,
+        keys: TomlSortKeys,
+        item: Item,
+        indent_depth: int = 0,
+        single_line: bool = False,
+        strings: Optional[Dict[int, str]] = None,
+    ) -> Optional[Steps]:
+        """The steps of sort_item, or None if item has nothing to sort.
+
+        strings holds the arrays already serialized, see array_steps.
+        """
+        if isinstance(item, Array):
+            return self.array_steps(keys, item, indent_depth, single_line, strings)
+
+        if isinstance(item, InlineTable):
+            return self.inline_table_steps(keys, item, indent_depth, single_line)
+
+        return None
+
     def sort_keys(
         self, items: Iterable[TomlSortItem], sort_config: SortConfiguration
     ) -> List[TomlSortItem]:
         """Sorts Iterable of Tomlsort item based on keys.
 
         The sort respects the sort_config.first setting which allows
-        overriding the sorted order of keys.
+        overriding the sorted order of keys. Each item gets a single
+        composite key, (position in first, key), so this is one sort.
         """
-
-        def sort_first(item: TomlSortItem) -> int:
-            for index, value in enumerate(sort_config.first):
-                if value == item.keys.base.key:
-                    return index
-            return len(sort_config.first)
-
-        items = sorted(items, key=self.key_sort_func)
-        items = sorted(items, key=sort_first)
-        return items
+        key_order = self._sort_plan.key_order(sort_config)
+        return sorted(items, key=lambda item: key_order(item.keys.base.key))
 
     def sort_inline_table(
-        self, keys: TomlSortKeys, item: Item, indent_depth: int = 0
+        self,
+        keys: TomlSortKeys,
+        item: Item,
+        indent_depth: int = 0,
+        single_line: bool = False,
     ) -> InlineTable:
-        """Sort an inline table, recursing into its items."""
-        tomlsort_items = [
-            TomlSortItem(
-                keys=keys + k,
-                value=self.sort_item(keys + k, v, indent_depth=indent_depth),
+        """Sort an inline table, with the items inside it.
+
+        single_line tells that the table is known to have no newline.
+        """
+        return cast(
+            InlineTable,
+            run_steps(self.inline_table_steps(keys, item, indent_depth, single_line)),
+        )
+
+    def inline_table_steps(
+        self,
+        keys: TomlSortKeys,
+        item: Item,
+        indent_depth: int = 0,
+        single_line: bool = False,
+    ) -> Steps:
+        """The steps of sort_inline_table, see run_steps."""
+        tomlsort_items = []
+        for k, v in item.value.body:
+            if isinstance(v, Whitespace) or k is None:
+                continue
+            item_keys = keys + k
+            steps = self.item_steps(
+                item_keys, v, indent_depth=indent_depth, single_line=single_line
             )
-            for k, v in item.value.body
-            if not isinstance(v, Whitespace) and k is not None
-        ]
+            if steps is not None:
+                v = yield steps
+            tomlsort_items.append(TomlSortItem(keys=item_keys, value=v))
         sort_config = self.sort_config(keys)
         if sort_config.inline_tables:
             tomlsort_items = self.sort_keys(tomlsort_items, sort_config)
@@ -499,19 +707,26 @@ class TomlSort:
         Respects the configured value for ignore_case.
         """
         key = value.keys.base.key
-        if self.sort_config().ignore_case:
+        if self._sort_config.ignore_case:
             key = key.lower()
         return key
 
-    def array_sort_func(self, value: Tuple[_ArrayItemGroup, Any]) -> str:
+    def array_sort_func(
+        self,
+        value: Tuple[_ArrayItemGroup, Any],
+        strings: Optional[Dict[int, str]] = None,
+    ) -> str:
         """Sorts on the .value member of an ArrayItemGroup.
 
-        Respects the class setting for ignore_case.
+        Respects the class setting for ignore_case. Arrays found in
+        strings are not serialized again.
         """
         if value[0].value is None:
             return ""
-        ret = value[0].value.as_string()
-        if self.sort_config().ignore_case:
+        ret = strings.get(id(value[0].value)) if strings else None
+        if ret is None:
+            ret = value[0].value.as_string()
+        if self._sort_config.ignore_case:
             ret = ret.lower()
         return ret
 
@@ -532,9 +747,7 @@ class TomlSort:
             else non_tables
         )
         tables_final = (
-            self.sort_keys(tables, sort_config)
-            if self.sort_config(parent_keys).tables
-            else tables
+            self.sort_keys(tables, sort_config) if sort_config.tables else tables
         )
         return itertools.chain(non_tables_final, tables_final)
 
@@ -546,58 +759,101 @@ class TomlSort:
         """Write header comment from the FROM doc to the TO doc.
 
         Only writes comments / whitespace from the beginning of a TOML
-        document.
+        document. Returns the rest of the body, leaving FROM unchanged.
         """
         # Discard leading whitespace
-        while len(from_doc_body) > 0 and isinstance(from_doc_body[0][1], Whitespace):
-            from_doc_body.pop(0)
+        start = 0
+        while start < len(from_doc_body) and isinstance(
+            from_doc_body[start][1], Whitespace
+        ):
+            start += 1
 
-        # Remove the header comment from the input document, adding it to
-        # the output document, followed by a newline.
+        # Skip the header comment of the input document, adding it to the
+        # output document, followed by a newline.
         spaces = self.format_config.spaces_before_inline_comment
-        while len(from_doc_body) > 0 and isinstance(from_doc_body[0][1], Comment):
-            _, value = from_doc_body.pop(0)
+        while start < len(from_doc_body) and isinstance(
+            from_doc_body[start][1], Comment
+        ):
+            _, value = from_doc_body[start]
             value = normalize_trivia(
                 value,
                 comment_spaces=spaces,
             )
             to_doc.add(value)
+            start += 1
 
         to_doc.add(ws("\n"))
-        return from_doc_body
+        return from_doc_body[start:]
 
     def toml_elements_sorted(
         self, original: TomlSortItem, parent: Table | TOMLDocument
     ) -> Item:
-        """Returns a sorted item, recursing collections to their base."""
+        """Returns a sorted item, with the collections inside it sorted."""
+        if not (original.is_table or original.is_aot):
+            return original.value
+        return run_steps(self.element_steps(original, parent))
+
+    def element_steps(
+        self, original: TomlSortItem, parent: Table | TOMLDocument
+    ) -> Steps:
+        """The steps of toml_elements_sorted for a table or AoT."""
         if original.is_table:
             new_table = original.table
 
             for item in self.sorted_children_table(original.keys, original.children):
                 previous_item = self.table_previous_item(new_table, parent)
                 attach_comments(item, previous_item)
-                new_table.add(
-                    item.keys.base,
-                    self.toml_elements_sorted(item, previous_item),
-                )
+                value = item.value
+                if item.is_table or item.is_aot:
+                    value = yield self.element_steps(item, previous_item)
+                new_table.add(item.keys.base, value)
             return new_table
 
-        if original.is_aot:
-            new_aot = normalize_trivia(
-                original.aot,
-                self.comment_config.inline,
-                self.format_config.spaces_before_inline_comment,
-            )
-            for table in original.children:
-                previous_item = next(iter(new_aot), parent)
+        new_aot = normalize_trivia(
+            original.aot,
+            self.comment_config.inline,
+            self.format_config.spaces_before_inline_comment,
+        )
+        if self.sort_config(original.keys).aot_sort_keys:
+            for table in self.sorted_aot_tables(original):
+                # Comments stay with their table, wherever it moves
+                previous_item = new_aot[-1] if new_aot else parent
                 attach_comments(table, previous_item)
-                new_aot.append(
-                    self.toml_elements_sorted(table, next(iter(new_aot), previous_item))
-                )
-
+                new_aot.append((yield self.element_steps(table, previous_item)))
             return new_aot
+        for table in original.children:
+            previous_item = next(iter(new_aot), parent)
+            attach_comments(table, previous_item)
+            new_aot.append(
+                (yield self.element_steps(table, next(iter(new_aot), previous_item)))
+            )
+
+        return new_aot
 
-        return original.value
+    def sorted_aot_tables(self, original: TomlSortItem) -> List[TomlSortItem]:
+        """The tables of an AoT, ordered by the values of aot_sort_keys.
+
+        The values are read once per table into a column of sort values,
+        see aot_sort_value, and the column is sorted stably, so that
+        tables with equal values keep their order.
+        """
+        sort_keys = self.sort_config(original.keys).aot_sort_keys
+        wanted = set(sort_keys)
+        ignore_case = self._sort_config.ignore_case
+        column = []
+        for table in original.children:
+            values = {}
+            for child in table.children:
+                key = child.keys.base.key
+                if key not in wanted or isinstance(child.value, (Table, AoT)):
+                    continue
+                value = aot_sort_value(child.value.unwrap(), ignore_case)
+                values[key] = (3, child.value.as_string()) if value is None else value
+            column.append(
+                tuple(values.get(key, MISSING_SORT_VALUE) for key in sort_keys)
+            )
+        order = sorted(range(len(column)), key=column.__getitem__)
+        return [original.children[index] for index in order]
 
     @staticmethod
     def table_previous_item(
@@ -646,6 +902,14 @@ class TomlSort:
         attaching the comments, then undo this process once everything is
         sorted.
         """
+        return run_steps(self.body_steps(parent, parent_key))
+
+    def body_steps(
+        self,
+        parent: List[Tuple[Optional[Key], Item]],
+        parent_key: Optional[TomlSortKeys] = None,
+    ) -> Generator[Any, Any, Tuple[List[TomlSortItem], List[Comment]]]:
+        """The steps of body_to_tomlsortitems, see run_steps."""
         items: List[TomlSortItem] = []
         comments: List[Comment] = []
         for key, value in parent:
@@ -670,10 +934,10 @@ class TomlSort:
             full_key = parent_key + key if parent_key else TomlSortKeys(key)
 
             if isinstance(value, Table):
-                comments, item = self.table_to_tomlsortitem(comments, full_key, value)
+                comments, item = yield self.table_steps(comments, full_key, value)
 
             elif isinstance(value, AoT):
-                comments, item = self.aot_to_tomlsortitem(comments, full_key, value)
+                comments, item = yield self.aot_steps(comments, full_key, value)
 
             elif isinstance(value, Item):
                 item = TomlSortItem(full_key, value, comments)
@@ -696,10 +960,16 @@ class TomlSort:
         Recurses down through its collections and attaching all the comments to
         the correct items.
         """
+        return run_steps(self.aot_steps(comments, keys, value))
+
+    def aot_steps(
+        self, comments: List[Comment], keys: TomlSortKeys, value: AoT
+    ) -> Generator[Any, Any, Tuple[List[Comment], TomlSortItem]]:
+        """The steps of aot_to_tomlsortitem, see run_steps."""
         new_aot = AoT([], parsed=True)
         children = []
         for table in value.body:
-            [first_child], trailing_comments = self.body_to_tomlsortitems(
+            [first_child], trailing_comments = yield self.body_steps(
                 [(keys.base, table)]
             )
             first_child.attached_comments = comments
@@ -716,7 +986,13 @@ class TomlSort:
         Recurses down through its collections and attaching all the comments to
         the correct items.
         """
-        children, trailing_comments = self.body_to_tomlsortitems(
+        return run_steps(self.table_steps(comments, keys, value))
+
+    def table_steps(
+        self, comments: List[Comment], keys: TomlSortKeys, value: Table
+    ) -> Generator[Any, Any, Tuple[List[Comment], TomlSortItem]]:
+        """The steps of table_to_tomlsortitem, see run_steps."""
+        children, trailing_comments = yield self.body_steps(
             value.value.body, parent_key=keys
         )
         new_table = Table(
@@ -775,9 +1051,87 @@ class TomlSort:
 
         return sorted_document
 
+    def sort_chunks(
+        self, input_toml: str, phases: Optional[Dict[str, float]] = None
+    ) -> Iterator[str]:
+        """Sort a TOML string, returning the output in chunks.
+
+        The chunks joined are the output of sort(). The input is sorted
+        before this returns, so errors are raised here and not while
+        iterating. The seconds spent parsing, sorting and dumping are
+        added to phases, under "parse", "sort" and "dump".
+
+        When only tables are sorted, the line scanner engine in
+        toml_sort.linesort is tried first: it gives the same output for
+        documents whose lines are already formatted, without tomlkit,
+        and its chunks are slices of the input.
+        """
+        if phases is None:
+            phases = {}
+        start = time.perf_counter()
+        clean_toml = clean_toml_text(input_toml)
+        if linesort.supports(self._sort_config, self.sort_config_overrides):
+            chunks = linesort.sort_tables_with(clean_toml, self.verifier)
+            if chunks is not None:
+                _add_time(phases, "sort", start)
+                return chunks
+        start = _add_time(phases, "sort", start)
+        toml_doc = tomlkit.parse(clean_toml)
+        start = _add_time(phases, "parse", start)
+        sorted_document = self.toml_doc_sorted(toml_doc)
+        start = _add_time(phases, "sort", start)
+        sorted_toml = tomlkit.dumps(sorted_document)
+        # The same as clean_toml_text(sorted_toml).strip() + "\n"
+        chunks = iter([BLANK_LINES.sub("\n\n", sorted_toml).strip() + "\n"])
+        _add_time(phases, "dump", start)
+        return chunks
+
+    def sort(self, input_toml: str) -> str:
+        """Sort a TOML string."""
+        return "".join(self.sort_chunks(input_toml))
+
+    def sort_many(self, documents: Iterable[str]) -> Iterator[str]:
+        """Sort TOML strings one after the other, as they are consumed."""
+        for document in documents:
+            yield self.sort(document)
+
+    def check(self, input_toml: str) -> Optional[Violation]:
+        """None if a TOML string is sorted, otherwise its first difference.
+
+        Sorted documents are recognized without sorting them; see
+        toml_sort.verify.
+        """
+        return self.verifier.verify(input_toml)
+
+
+class TomlSort(TomlSorter):
+    """API to manage sorting toml files."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        input_toml: str,
+        comment_config: Optional[CommentConfiguration] = None,
+        sort_config: Optional[SortConfiguration] = None,
+        format_config: Optional[FormattingConfiguration] = None,
+        sort_config_overrides: Optional[Dict[str, SortOverrideConfiguration]] = None,
+    ) -> None:
+        """Initializer."""
+        super().__init__(
+            comment_config, sort_config, format_config, sort_config_overrides
+        )
+        self.input_toml = input_toml
+
+    def sorted_chunks(self) -> Iterator[str]:
+        """Sort the TOML string, returning the output in chunks.
+
+        See TomlSorter.sort_chunks.
+        """
+        return self.sort_chunks(self.input_toml)
+
     def sorted(self) -> str:
         """Sort a TOML string."""
-        clean_toml = clean_toml_text(self.input_toml)
-        toml_doc = tomlkit.parse(clean_toml)
-        sorted_toml = self.toml_doc_sorted(toml_doc)
-        return clean_toml_text(tomlkit.dumps(sorted_toml)).strip() + "\n"
+        return "".join(self.sorted_chunks())
+
+    def write(self, fileobj: IO[str]) -> None:
+        """Sort a TOML string, writing the output to a text file object."""
+        fileobj.writelines(self.sorted_chunks())
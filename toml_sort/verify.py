@@ -0,0 +1,764 @@
+"""Check whether TOML text is already sorted without sorting it.
+
+TomlSort.sorted() parses the whole document with tomlkit, rebuilds it
+and serializes it again, which is wasted work for a document that is
+already sorted. SortVerifier instead walks the logical lines of the
+text once and checks the properties every sorted document has:
+
+- keys and tables are in the configured order,
+- blank lines and comments are where TomlSort puts them, and
+- every line is formatted the way normalize_trivia, format_key and
+  sort_array format it.
+
+It stops at the first line that breaks one of them. The checks only
+cover the common shapes of TOML; whenever a document contains
+something they do not understand (dotted keys, a table defined in
+pieces, comments that TomlSort moves around, ...) the verifier falls
+back to sorting the document and comparing, so its verdict is always
+the same as comparing with TomlSort.sorted().
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Pattern, Set, Tuple
+
+from .configuration import (
+    MISSING_SORT_VALUE,
+    CommentConfiguration,
+    FormattingConfiguration,
+    SortConfiguration,
+    SortOverrideConfiguration,
+    SortPlan,
+    aot_sort_value,
+    format_comment,
+)
+from .scanner import (
+    AOT,
+    BASIC_STRING_END,
+    BLANK,
+    COMMENT,
+    KEY,
+    KEY_PREFIX,
+    KEYVALUE,
+    LITERAL_STRING_END,
+    Line,
+    LineScanner,
+    multiline_end,
+    parse_key_path,
+)
+
+__all__ = ["SortVerifier", "Violation", "first_difference", "line_sort_value"]
+
+_HEADER = re.compile(
+    rf"(\[\[?)({KEY}(?:\.{KEY})*)(\]\]?)(?:([ \t]*)(#[^\n]*))?\n", re.ASCII
+)
+_DATETIME = re.compile(
+    r"\d{4}-\d\d-\d\d[Tt ]\d\d:\d\d(?::\d\d(?:\.\d+)?)?(?:[Zz]|[+-]\d\d:\d\d)?"
+)
+_BARE_VALUE = re.compile(r"[A-Za-z0-9_+\-.:]+")
+# A key/value line with a plain value and no comment, which needs no
+# formatting
+_PLAIN_KEYVALUE = re.compile(
+    rf"""{KEY} = (?:"(?:[^"\\\n]|\\.)*"|'[^'\n]*'|[A-Za-z0-9_+\-.:]+)\n"""
+)
+# Key/value lines whose value aot_sort_value can take from the text
+_PLAIN_STRING = re.compile(rf'{KEY} = "([^"\\\n]*)"\n')
+_PLAIN_INTEGER = re.compile(rf"{KEY} = ([+-]?(?:0|[1-9][0-9]*))\n")
+_INLINE_WS = re.compile(r"[ \t]*")
+_WS = re.compile(r"[ \t\n]*")
+
+Path = Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Violation:
+    """The first place where a document differs from its sorted form."""
+
+    line: int
+    column: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.line}:{self.column}: {self.message}"
+
+
+def first_difference(original: str, sorted_toml: str) -> Optional[Violation]:
+    """Violation at the first character where two texts differ, if any."""
+    if original == sorted_toml:
+        return None
+    index = 0
+    for index, (left, right) in enumerate(zip(original, sorted_toml)):
+        if left != right:
+            break
+    else:
+        index = min(len(original), len(sorted_toml))
+    line = original.count("\n", 0, index) + 1
+    column = index - (original.rfind("\n", 0, index) + 1) + 1
+    return Violation(line, column, "differs from sorted output")
+
+
+def is_valid(text: str) -> bool:
+    """True if text is valid TOML, checked with tomllib where available."""
+    # Both are imported here, to keep importing this module cheap
+    # pylint: disable=import-outside-toplevel
+    try:
+        if sys.version_info >= (3, 11):
+            import tomllib
+
+            tomllib.loads(text)
+        else:  # pragma: no cover
+            import tomlkit
+
+            tomlkit.parse(text)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def line_sort_value(line: Line, ignore_case: bool) -> Optional[Tuple[int, Any]]:
+    """aot_sort_value of the value of a key/value line with one key.
+
+    None if only TomlSort can order the value, which is also the case
+    for every value that needs parsing before Python 3.11.
+    """
+    match = _PLAIN_STRING.fullmatch(line.text)
+    if match is not None:
+        return aot_sort_value(match.group(1), ignore_case)
+    match = _PLAIN_INTEGER.fullmatch(line.text)
+    if match is not None:
+        return aot_sort_value(int(match.group(1)), ignore_case)
+    if sys.version_info >= (3, 11):
+        import tomllib  # pylint: disable=import-outside-toplevel
+
+        try:
+            (value,) = tomllib.loads(line.text).values()
+        except (tomllib.TOMLDecodeError, ValueError):
+            return None
+        return aot_sort_value(value, ignore_case)
+    return None  # pragma: no cover
+
+
+class _Uncertain(Exception):
+    """Raised when the verifier cannot decide without sorting."""
+
+
+class _Value:
+    """A value parsed from TOML text: a scalar, array or inline table."""
+
+    __slots__ = ("kind", "raw", "entries", "multiline")
+
+    def __init__(self, kind: str, raw: str, entries: List[Any], multiline: bool):
+        self.kind = kind
+        self.raw = raw
+        self.entries = entries
+        self.multiline = multiline
+
+
+def _skip(pattern: Pattern[str], text: str, position: int) -> int:
+    """Position after the whitespace matched by pattern at position."""
+    match = pattern.match(text, position)
+    return position if match is None else match.end()
+
+
+def _parse_value(text: str, position: int) -> Tuple[_Value, int]:
+    """Parse a value starting at position, returning it and its end."""
+    char = text[position : position + 1]
+    if char == "[":
+        return _parse_array(text, position)
+    if char == "{":
+        return _parse_inline_table(text, position)
+    for delimiter in ('"""', "'''"):
+        if text.startswith(delimiter, position):
+            end = multiline_end(text, position + 3, delimiter)
+            if end < 0:
+                raise _Uncertain()
+            return _Value("scalar", text[position:end], [], False), end
+    if char in "\"'":
+        pattern = BASIC_STRING_END if char == '"' else LITERAL_STRING_END
+        match = pattern.match(text, position + 1)
+    else:
+        match = _DATETIME.match(text, position) or _BARE_VALUE.match(text, position)
+    if match is None:
+        raise _Uncertain()
+    return _Value("scalar", text[position : match.end()], [], False), match.end()
+
+
+def _parse_array(text: str, start: int) -> Tuple[_Value, int]:
+    """Parse an array into ("comment", text) and ("value", value, comment)."""
+    entries: List[Any] = []
+    position = start + 1
+    expect_value = True
+    while True:
+        whitespace_end = _skip(_WS, text, position)
+        newline = "\n" in text[position:whitespace_end]
+        position = whitespace_end
+        char = text[position : position + 1]
+        if char == "]":
+            position += 1
+            break
+        if char == "#":
+            if not newline:
+                # TomlSort keeps the indentation of a comment following
+                # the opening bracket
+                raise _Uncertain()
+            end = text.find("\n", position)
+            if end < 0:
+                raise _Uncertain()
+            entries.append(("comment", text[position:end]))
+            position = end
+            continue
+        if not expect_value or not char:
+            raise _Uncertain()
+        value, position = _parse_value(text, position)
+        position = _skip(_INLINE_WS, text, position)
+        comment = None
+        if text.startswith(",", position):
+            position = _skip(_INLINE_WS, text, position + 1)
+        else:
+            expect_value = False
+        if text.startswith("#", position):
+            end = text.find("\n", position)
+            if end < 0:
+                raise _Uncertain()
+            comment = text[position:end]
+            position = end
+        elif not expect_value and not text.startswith(("\n", "]"), position):
+            raise _Uncertain()
+        entries.append(("value", value, comment))
+    raw = text[start:position]
+    return _Value("array", raw, entries, "\n" in raw), position
+
+
+def _parse_inline_table(text: str, start: int) -> Tuple[_Value, int]:
+    """Parse an inline table into (key text, key, value) entries."""
+    entries: List[Any] = []
+    position = _skip(_INLINE_WS, text, start + 1)
+    if text.startswith("}", position):
+        return _Value("table", text[start : position + 1], entries, False), position + 1
+    while True:
+        match = KEY_PREFIX.match(text, position)
+        if match is None:
+            raise _Uncertain()
+        key_text = match.group(1)
+        position = _skip(_INLINE_WS, text, match.end())
+        value, position = _parse_value(text, position)
+        entries.append((key_text, _unquote(key_text), value))
+        position = _skip(_INLINE_WS, text, position)
+        char = text[position : position + 1]
+        if char == "}":
+            position += 1
+            break
+        if char != ",":
+            raise _Uncertain()
+        position = _skip(_INLINE_WS, text, position + 1)
+    raw = text[start:position]
+    if "\n" in raw:
+        raise _Uncertain()
+    return _Value("table", raw, entries, False), position
+
+
+def _unquote(key_text: str) -> str:
+    keys = parse_key_path(key_text)
+    if keys is None or len(keys) != 1:
+        raise _Uncertain()
+    return keys[0]
+
+
+class SortVerifier:
+    """Decide whether TOML text is already sorted.
+
+    Takes the same configuration as TomlSort, and verify(text) returns
+    None exactly when TomlSort(text, ...).sorted() == text.
+    """
+
+    def __init__(
+        self,
+        comment_config: Optional[CommentConfiguration] = None,
+        sort_config: Optional[SortConfiguration] = None,
+        format_config: Optional[FormattingConfiguration] = None,
+        sort_config_overrides: Optional[Dict[str, SortOverrideConfiguration]] = None,
+    ) -> None:
+        self.comment_config = comment_config or CommentConfiguration()
+        self.sort_config = sort_config or SortConfiguration()
+        self.format_config = format_config or FormattingConfiguration()
+        self.sort_config_overrides = sort_config_overrides or {}
+        self._plan = SortPlan(self.sort_config, self.sort_config_overrides)
+        self._comment_ws = " " * self.format_config.spaces_before_inline_comment
+
+    def verify(self, text: str) -> Optional[Violation]:
+        """Return None if text is sorted, otherwise its first violation."""
+        try:
+            violation = _Walk(self, text).run()
+        except _Uncertain:
+            return first_difference(text, self._sorted(text))
+        if violation is not None:
+            # TOML that TomlSort cannot sort, invalid or with keys that
+            # clash once sorted, must fail with the same error
+            self._sorted(text)
+        elif not is_valid(text):
+            return first_difference(text, self._sorted(text))
+        return violation
+
+    def proves_sorted(self, text: str) -> bool:
+        """True if text is sorted, decided without tomlkit.
+
+        Unlike verify(), this never parses or sorts with tomlkit: it is
+        False both when text breaks a rule and when the checks do not
+        cover it, for callers that sort text anyway when it is not proven
+        sorted.
+        """
+        try:
+            return _Walk(self, text).run() is None and is_valid(text)
+        except _Uncertain:
+            return False
+
+    def accepts(self, lines: List[Line]) -> bool:
+        """True if the logical lines of a document are sorted as they are.
+
+        Unlike verify(), this never sorts: it is False both when the lines
+        break a rule and when the checks do not cover them. Validity of
+        the TOML is not checked either.
+        """
+        if not lines or lines[0].kind == BLANK or lines[-1].kind == BLANK:
+            return False
+        walk = _Walk(self, "".join(line.text for line in lines))
+        try:
+            return walk.walk(lines) is None
+        except _Uncertain:
+            return False
+
+    def _sorted(self, text: str) -> str:
+        from .tomlsort import TomlSort  # pylint: disable=import-outside-toplevel
+
+        return TomlSort(
+            text,
+            comment_config=self.comment_config,
+            sort_config=self.sort_config,
+            format_config=self.format_config,
+            sort_config_overrides=self.sort_config_overrides,
+        ).sorted()
+
+    def config(self, path: Path) -> SortConfiguration:
+        """The SortConfiguration for the table or value at path."""
+        if not path:
+            return self.sort_config
+        return self._plan.resolve(".".join(path))
+
+    def format_inline_comment(self, comment: Optional[str]) -> str:
+        """An inline comment as TomlSort formats it."""
+        if comment is None or not self.comment_config.inline:
+            return ""
+        return self._comment_ws + format_comment(comment)
+
+    def format_value(self, value: _Value, path: Path, depth: int = 0) -> str:
+        """A value as TomlSort formats it, mirroring TomlSort.sort_item."""
+        if value.kind == "array":
+            return self._format_array(value, path, depth)
+        if value.kind == "table":
+            return self._format_inline_table(value, path, depth)
+        return value.raw
+
+    def _format_array(self, value: _Value, path: Path, depth: int) -> str:
+        indent_size = self.format_config.spaces_indent_inline_array
+        indent = "\n" + " " * indent_size * (depth + 1) if value.multiline else ""
+        comma = "," if value.multiline else ", "
+        items: List[Tuple[str, Optional[str], List[str]]] = []
+        comments: List[str] = []
+        for entry in value.entries:
+            if entry[0] == "comment":
+                comments.append(format_comment(entry[1]))
+                continue
+            item_depth = depth + 1 if value.multiline else depth
+            items.append(
+                (self.format_value(entry[1], path, item_depth), entry[2], comments)
+            )
+            comments = []
+        if self.config(path).inline_arrays:
+            ignore_case = self.sort_config.ignore_case
+            items.sort(key=lambda item: item[0].lower() if ignore_case else item[0])
+        trailing = value.multiline and self.format_config.trailing_comma_inline_array
+        parts = ["["]
+        for index, (formatted, comment, item_comments) in enumerate(items):
+            if self.comment_config.block:
+                parts.extend(indent + item_comment for item_comment in item_comments)
+            last = index == len(items) - 1
+            parts.append(indent + formatted + (comma if trailing or not last else ""))
+            parts.append(self.format_inline_comment(comment))
+        if value.multiline:
+            parts.append("\n" + " " * indent_size * depth)
+        parts.append("]")
+        return "".join(parts)
+
+    def _format_inline_table(self, value: _Value, path: Path, depth: int) -> str:
+        entries = value.entries
+        sort_config = self.config(path)
+        if sort_config.inline_tables:
+            key_order = self._plan.key_order(sort_config)
+            entries = sorted(entries, key=lambda entry: key_order(entry[1]))
+        return (
+            "{"
+            + ", ".join(
+                f"{key_text} = {self.format_value(item, path + (key,), depth)}"
+                for key_text, key, item in entries
+            )
+            + "}"
+        )
+
+    def key_order(self, path: Path) -> Callable[[str], Tuple[int, str]]:
+        """Sort key function for the children of the table at path."""
+        return self._plan.key_order(self.config(path))
+
+
+class _Table:
+    """Verification state of the table whose lines are being read."""
+
+    __slots__ = (
+        "path",
+        "config_path",
+        "config",
+        "keys",
+        "previous",
+        "key_order",
+        "sort_keys",
+        "sort_values",
+    )
+
+    def __init__(self, verifier: SortVerifier, path: Path, config_path: Path) -> None:
+        self.path = path
+        self.config_path = config_path
+        self.config = verifier.config(config_path)
+        self.key_order = verifier.key_order(config_path)
+        self.keys: Set[str] = set()
+        self.previous: Optional[str] = None
+        # The aot_sort_keys of the array of tables this is an element
+        # of, and their values read so far, if they sort the elements
+        self.sort_keys: Tuple[str, ...] = ()
+        self.sort_values: Optional[Dict[str, Tuple[int, Any]]] = None
+
+
+class _Walk:  # pylint: disable=too-many-instance-attributes
+    """A single pass over the logical lines of a document."""
+
+    def __init__(self, verifier: SortVerifier, text: str) -> None:
+        self.verifier = verifier
+        self.text = text
+        self.comment_config = verifier.comment_config
+        self.table = _Table(verifier, (), ())
+        self.tables: Dict[Path, _Table] = {(): self.table}
+        self.kinds: Dict[Path, str] = {}
+        self.closed: Set[Path] = set()
+        self.previous_path: Path = ()
+        # Elements seen of each array of tables, since its parent began
+        self.elements: Dict[Path, int] = {}
+        # Path of the last header if it had comments and no keys yet
+        self.commented_header: Optional[Path] = None
+        # Sort values and header of the last element of each array of
+        # tables sorted by aot_sort_keys
+        self.last_elements: Dict[Path, Tuple[Tuple[Tuple[int, Any], ...], Line]] = {}
+        self.header: Optional[Line] = None
+
+    def run(self) -> Optional[Violation]:
+        text = self.text
+        if "\r" in text or not text.strip():
+            raise _Uncertain()
+        if text[0].isspace():
+            return Violation(1, 1, "leading whitespace")
+        violations = [self.walk(self.logical_lines())]
+        if not text.endswith("\n"):
+            violations.append(self.at_offset(len(text), "no newline at end of file"))
+        elif text.endswith("\n\n"):
+            violations.append(
+                self.at_offset(len(text) - 1, "blank line at end of file")
+            )
+        index = text.find("\n\n\n")
+        if index >= 0:
+            violations.append(self.at_offset(index + 2, "more than one blank line"))
+        found = [violation for violation in violations if violation is not None]
+        if not found:
+            return None
+        return min(found, key=lambda violation: (violation.line, violation.column))
+
+    def config_path(self, path: Path, aot: bool = False) -> Path:
+        """The path TomlSort looks up the configuration of path by.
+
+        TomlSort names an element of an array of tables, and everything
+        in it, from the key of the array alone, and names an array of
+        tables (aot=True) from the element it is in.
+        """
+        for depth in range(len(path) - aot, 0, -1):
+            if self.kinds.get(path[:depth]) == AOT:
+                return path[depth - 1 :]
+        return path
+
+    def at_offset(self, offset: int, message: str) -> Violation:
+        return Violation(
+            self.text.count("\n", 0, offset) + 1,
+            offset - (self.text.rfind("\n", 0, offset) + 1) + 1,
+            message,
+        )
+
+    def logical_lines(self) -> List[Line]:
+        scanner = LineScanner()
+        lines = []
+        # The missing final newline is reported separately
+        text = self.text if self.text.endswith("\n") else self.text + "\n"
+        for physical in text.splitlines(keepends=True):
+            line = scanner.feed(physical)
+            if line is not None:
+                lines.append(line)
+        if scanner.pending:
+            raise _Uncertain()
+        return lines
+
+    def walk(self, lines: List[Line]) -> Optional[Violation]:
+        """Check blank lines, comments and each line in document order."""
+        position = 0
+        # What came before the current line: None (nothing), "header"
+        # (the header comments) or "body"
+        previous: Optional[str] = None
+        if self.comment_config.header and lines[0].kind == COMMENT:
+            while position < len(lines) and lines[position].kind == COMMENT:
+                violation = self.check_comment(lines[position])
+                if violation is not None:
+                    return violation
+                position += 1
+            if position < len(lines) and lines[position].kind != BLANK:
+                return self.at_line(lines[position], "expected a blank line")
+            previous = "header"
+        blank = False
+        group: List[Line] = []
+        group_blank = False
+        for line in lines[position:]:
+            if line.kind == BLANK:
+                if group:
+                    return self.at_line(group[0], "comment is not attached to anything")
+                blank = True
+                continue
+            if line.kind == COMMENT:
+                if not group:
+                    group_blank, blank = blank, False
+                if not self.comment_config.block:
+                    return self.at_line(line, "comments are removed")
+                violation = self.check_comment(line)
+                if violation is not None:
+                    return violation
+                group.append(line)
+                continue
+            lead_blank = group_blank if group else blank
+            first = group[0] if group else line
+            if line.kind == KEYVALUE:
+                if lead_blank != (previous == "header"):
+                    return self.blank_violation(first, lead_blank)
+                violation = self.check_keyvalue(line)
+            else:
+                if lead_blank != (previous is not None):
+                    return self.blank_violation(first, lead_blank)
+                violation = self.check_header(line, bool(group))
+            if violation is not None:
+                return violation
+            previous = "body"
+            group = []
+            blank = False
+        if group:
+            if not (self.comment_config.footer and self.comment_config.block):
+                return self.at_line(group[0], "comments are removed")
+            if group_blank != (previous is not None):
+                return self.blank_violation(group[0], group_blank)
+        return self.end_element()
+
+    def at_line(self, line: Line, message: str, column: int = 1) -> Violation:
+        return Violation(line.lineno, column, message)
+
+    def blank_violation(self, line: Line, blank: bool) -> Violation:
+        if blank:
+            return Violation(line.lineno - 1, 1, "unexpected blank line")
+        return self.at_line(line, "expected a blank line")
+
+    def mismatch(self, line: Line, expected: str, message: str) -> Violation:
+        """Violation at the first character where line differs from expected."""
+        difference = first_difference(line.text, expected)
+        assert difference is not None
+        return Violation(line.lineno + difference.line - 1, difference.column, message)
+
+    def end_element(self) -> Optional[Violation]:
+        """Compare the element that ends here with the one before it.
+
+        Only applies when the current table is an element of an array of
+        tables sorted by aot_sort_keys, whose keys have all been read.
+        """
+        table = self.table
+        if table.sort_values is None:
+            return None
+        assert self.header is not None
+        values = tuple(
+            table.sort_values.get(key, MISSING_SORT_VALUE) for key in table.sort_keys
+        )
+        table.sort_values = None
+        last = self.last_elements.get(table.path)
+        self.last_elements[table.path] = (values, self.header)
+        if last is not None and values < last[0]:
+            return self.at_line(
+                self.header,
+                f"table of {'.'.join(table.path)!r} should come before the one "
+                f"at line {last[1].lineno}",
+            )
+        return None
+
+    def check_comment(self, line: Line) -> Optional[Violation]:
+        expected = format_comment(line.text.strip()) + "\n"
+        if line.text != expected:
+            return self.mismatch(line, expected, "comment is not formatted")
+        return None
+
+    def check_keyvalue(self, line: Line) -> Optional[Violation]:
+        if line.keys is None or len(line.keys) != 1:
+            # Dotted keys define tables, which TomlSort moves after values
+            raise _Uncertain()
+        self.commented_header = None
+        key = line.keys[0]
+        table = self.table
+        if key in table.keys:
+            raise _Uncertain()
+        table.keys.add(key)
+        if table.config.table_keys:
+            if table.previous is not None and table.key_order(key) < table.key_order(
+                table.previous
+            ):
+                return self.at_line(
+                    line, f"key {key!r} should come before {table.previous!r}"
+                )
+            table.previous = key
+        if table.sort_values is not None and key in table.sort_keys:
+            sort_value = line_sort_value(line, self.verifier.sort_config.ignore_case)
+            if sort_value is None:
+                raise _Uncertain()
+            table.sort_values[key] = sort_value
+        if _PLAIN_KEYVALUE.fullmatch(line.text):
+            return None
+        match = KEY_PREFIX.match(line.text)
+        assert match is not None
+        text = line.text
+        position = _skip(_INLINE_WS, text, match.end())
+        value, position = _parse_value(text, position)
+        position = _skip(_INLINE_WS, text, position)
+        comment = None
+        if text.startswith("#", position):
+            comment = text[position:].rstrip("\n")
+        elif text[position:] != "\n":
+            raise _Uncertain()
+        expected = (
+            f"{match.group(1)} = "
+            + self.verifier.format_value(value, table.config_path + (key,))
+            + self.verifier.format_inline_comment(comment)
+            + "\n"
+        )
+        if text != expected:
+            return self.mismatch(line, expected, "line is not formatted")
+        return None
+
+    def check_header(self, line: Line, commented: bool) -> Optional[Violation]:
+        match = _HEADER.fullmatch(line.text)
+        if (
+            match is None
+            or line.keys is None
+            or len(match.group(1)) != len(match.group(3))
+        ):
+            raise _Uncertain()
+        violation = self.end_element()
+        if violation is not None:
+            return violation
+        path = line.keys
+        kind = AOT if len(match.group(1)) == 2 else "table"
+        if kind == AOT and path[:-1] == self.commented_header:
+            # TomlSort moves the comments of a table whose first child is
+            # an array of tables to the first element of that array.
+            raise _Uncertain()
+        if (
+            kind == AOT
+            and commented
+            and path[:-1] == self.previous_path
+            and not self.table.keys
+        ):
+            # and drops the comments of that element if the table has
+            # no keys of its own.
+            raise _Uncertain()
+        previous = self.previous_path
+        common = 0
+        while (
+            common < min(len(path), len(previous)) and path[common] == previous[common]
+        ):
+            common += 1
+        if common == len(path):
+            # Only a new element of an array of tables may repeat a path
+            if kind != AOT or self.kinds.get(path) != AOT:
+                raise _Uncertain()
+            for known in list(self.kinds):
+                if known[: len(path)] == path and len(known) > len(path):
+                    del self.kinds[known]
+                    self.tables.pop(known, None)
+                    self.elements.pop(known, None)
+                    self.last_elements.pop(known, None)
+            self.closed = {
+                closed for closed in self.closed if closed[: len(path)] != path
+            }
+        else:
+            if common < len(previous):
+                parent = self.tables.get(path[:common]) or _Table(
+                    self.verifier, path[:common], self.config_path(path[:common])
+                )
+                if parent.config.tables and parent.key_order(
+                    path[common]
+                ) < parent.key_order(previous[common]):
+                    return self.at_line(
+                        line,
+                        f"table {'.'.join(path)!r} should come before "
+                        f"{'.'.join(previous[: common + 1])!r}",
+                    )
+            for depth in range(common + 1, len(path) + 1):
+                if path[:depth] in self.closed:
+                    raise _Uncertain()
+            for depth in range(common + 1, len(previous) + 1):
+                self.closed.add(previous[:depth])
+            for depth in range(common, len(path)):
+                owner = self.tables.get(path[:depth])
+                if owner is not None and path[depth] in owner.keys:
+                    raise _Uncertain()
+                if depth > common and self.kinds.get(path[:depth]) is None:
+                    if commented and kind == AOT:
+                        raise _Uncertain()
+                    self.kinds[path[:depth]] = "super"
+            self.kinds[path] = kind
+        self.commented_header = path if commented else None
+        sort_keys: Tuple[str, ...] = ()
+        if kind == AOT:
+            sort_keys = tuple(
+                self.verifier.config(self.config_path(path, aot=True)).aot_sort_keys
+            )
+        sorted_elements = bool(sort_keys)
+        if kind == AOT:
+            self.elements[path] = self.elements.get(path, 0) + 1
+            if commented and self.elements[path] > 2 and not sorted_elements:
+                # TomlSort adds the comments of every element to the end
+                # of the first one, which is only right for the second,
+                # unless it sorts the elements by aot_sort_keys.
+                raise _Uncertain()
+        self.previous_path = path
+        self.table = self.tables[path] = _Table(
+            self.verifier, path, self.config_path(path)
+        )
+        self.header = line
+        if sorted_elements:
+            self.table.sort_keys = sort_keys
+            self.table.sort_values = {}
+        comment = match.group(5)
+        expected = (
+            f"{match.group(1)}{match.group(2)}{match.group(3)}"
+            + self.verifier.format_inline_comment(comment)
+            + "\n"
+        )
+        if line.text != expected:
+            return self.mismatch(line, expected, "header is not formatted")
+        return None
@@ -0,0 +1,256 @@
+"""Find the TOML files in directory trees.
+
+Directories are walked with os.scandir, and files are yielded as they
+are found, so that processing can start before the walk ends. Which
+files are TOML files is decided by include and exclude globs, compiled
+into one regular expression each: by default, the files the pre-commit
+hooks of toml-sort would sort.
+
+Files and directories ignored by git are skipped, and ignored
+directories are never entered. The rules come from the .gitignore files
+in the directories walked and in their parents up to the top of the git
+repository, and from its .git/info/exclude. Global excludes files
+configured in git are not read.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from .git import TOML_NAMES
+
+__all__ = ["DEFAULT_EXCLUDE", "DEFAULT_INCLUDE", "GitIgnore", "compile_globs", "walk"]
+
+DEFAULT_INCLUDE = ("*.toml", *sorted(TOML_NAMES))
+
+# The lock files skipped by the pre-commit hooks
+DEFAULT_EXCLUDE = ("uv.lock", "poetry.lock", "Cargo.lock")
+
+
+def compile_globs(globs: Iterable[str]) -> Pattern[str]:
+    """One expression for globs, matching paths with / separators.
+
+    A glob without a slash matches file names, and a glob with one
+    matches whole paths. Without globs, the expression matches nothing.
+    """
+    expressions = []
+    for glob in globs:
+        expression = fnmatch.translate(glob)
+        if "/" not in glob:
+            expression = f"(?:.*/)?{expression}"
+        expressions.append(expression)
+    if not expressions:
+        return re.compile("(?!)")
+    return re.compile("|".join(expressions))
+
+
+def _translate(pattern: str) -> str:
+    """Regular expression for a gitignore pattern, matching whole paths."""
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index) and (
+            index == 0 or pattern[index - 1] == "/"
+        ):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index) and (
+            index > 0 and pattern[index - 1] == "/" and index + 2 == len(pattern)
+        ):
+            parts.append(".*")
+            break
+        if char == "*":
+            parts.append("[^/]*")
+            while index + 1 < len(pattern) and pattern[index + 1] == "*":
+                index += 1
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        elif char == "[":
+            end = pattern.find("]", index + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                members = pattern[index + 1 : end].replace("\\", "\\\\")
+                if members[0] in "!^":
+                    members = "^" + members[1:]
+                parts.append(f"[{members}]")
+                index = end
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+class _Rule(NamedTuple):
+    expression: Pattern[str]
+    negated: bool
+    directory_only: bool
+
+
+def _parse_rules(text: str) -> List[_Rule]:
+    rules = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        # Trailing spaces are ignored unless escaped
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        negated = stripped.startswith("!")
+        if negated:
+            stripped = stripped[1:]
+        directory_only = stripped.endswith("/")
+        stripped = stripped.rstrip("/")
+        if not stripped:
+            continue
+        if "/" in stripped:
+            # A pattern with a slash is relative to the .gitignore
+            expression = _translate(stripped.lstrip("/"))
+        else:
+            expression = "(?:.*/)?" + _translate(stripped)
+        rules.append(
+            _Rule(re.compile(f"(?s:{expression})\\Z"), negated, directory_only)
+        )
+    return rules
+
+
+class _RuleSet(NamedTuple):
+    """The rules of one ignore file.
+
+    Rules match the path of an entry relative to the directory walked,
+    with base removed from its start, or prefix added to it for ignore
+    files above the directory walked.
+    """
+
+    base: str
+    prefix: str
+    rules: List[_Rule]
+
+
+def _read_rules(path: str) -> List[_Rule]:
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as file:
+            return _parse_rules(file.read())
+    except OSError:
+        return []
+
+
+class GitIgnore:
+    """The ignore rules in force in a directory being walked."""
+
+    def __init__(self, rule_sets: Tuple[_RuleSet, ...] = ()) -> None:
+        """Rule sets are ordered from the top directory down."""
+        self._rule_sets = rule_sets
+
+    @classmethod
+    def above(cls, directory: str) -> GitIgnore:
+        """The rules for directory from the directories above it.
+
+        The rules of directory itself are added by entering it.
+        """
+        current = os.path.abspath(directory)
+        while not os.path.exists(os.path.join(current, ".git")):
+            parent = os.path.dirname(current)
+            if parent == current:
+                return cls()
+            current = parent
+        top = current
+        relative = os.path.relpath(os.path.abspath(directory), top)
+        parts = [] if relative == os.curdir else relative.split(os.sep)
+        rule_sets = [
+            _RuleSet(
+                "",
+                "".join(f"{part}/" for part in parts),
+                _read_rules(os.path.join(top, ".git", "info", "exclude")),
+            )
+        ]
+        for depth in range(len(parts)):
+            rule_sets.append(
+                _RuleSet(
+                    "",
+                    "".join(f"{part}/" for part in parts[depth:]),
+                    _read_rules(os.path.join(top, *parts[:depth], ".gitignore")),
+                )
+            )
+        return cls(tuple(rule_set for rule_set in rule_sets if rule_set.rules))
+
+    def enter(self, directory: str, relative: str) -> GitIgnore:
+        """The rules inside directory, at path relative in the walk."""
+        rules = _read_rules(os.path.join(directory, ".gitignore"))
+        if not rules:
+            return self
+        base = f"{relative}/" if relative else ""
+        return GitIgnore((*self._rule_sets, _RuleSet(base, "", rules)))
+
+    def ignores(self, relative: str, is_directory: bool) -> bool:
+        """True if git ignores the entry at path relative in the walk."""
+        for base, prefix, rules in reversed(self._rule_sets):
+            path = prefix + relative[len(base) :]
+            for rule in reversed(rules):
+                if rule.directory_only and not is_directory:
+                    continue
+                if rule.expression.match(path):
+                    return not rule.negated
+        return False
+
+
+def walk(
+    directory: str,
+    include: Optional[Pattern[str]] = None,
+    exclude: Optional[Pattern[str]] = None,
+) -> Iterator[str]:
+    """Yield the paths of the TOML files below directory.
+
+    include and exclude come from compile_globs and default to the
+    globs of DEFAULT_INCLUDE and DEFAULT_EXCLUDE. Excluded directories
+    are not entered. Paths start with directory and are yielded in
+    sorted order, each directory's entries sorted by name. Symbolic
+    links to directories are not followed.
+    """
+    if include is None:
+        include = compile_globs(DEFAULT_INCLUDE)
+    if exclude is None:
+        exclude = compile_globs(DEFAULT_EXCLUDE)
+    # Each directory entered, with its entries still to be visited
+    stack: List[Tuple[str, GitIgnore, Iterator[os.DirEntry[str]]]] = []
+
+    def enter(path: str, relative: str, ignore: GitIgnore) -> None:
+        try:
+            with os.scandir(path) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError:
+            return
+        if any(entry.name == ".gitignore" for entry in entries):
+            ignore = ignore.enter(path, relative)
+        stack.append((relative, ignore, iter(entries)))
+
+    enter(directory, "", GitIgnore.above(directory))
+    while stack:
+        relative, ignore, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        if entry.name == ".git":
+            continue
+        path = f"{relative}/{entry.name}" if relative else entry.name
+        try:
+            is_directory = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+        if exclude.match(path):
+            continue
+        if ignore.ignores(path, is_directory):
+            continue
+        if is_directory:
+            enter(entry.path, path, ignore)
+        elif include.match(path) and entry.is_file():
+            yield entry.path